@@ -1,11 +1,13 @@
 # fmt: off
 import sys
 import os
+import tempfile
 import numpy as np
 sys.path.append("../")  # lets us access sibling directory `sir`
 from sir.smartagent import *
+from sir.trajectory import Trajectory
+from sir.render import plot_snapshots
 import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
 # fmt: on
 
 
@@ -21,9 +23,11 @@ def sim_agent(
     fear_distance=0,
     prob_infect=None,
     initial_infect=None,
+    path=None,
 ):
     """
-    returns simulation information with infected agents placed randomly around the population
+    returns simulation information with infected agents placed randomly around the population;
+    the agents' positions and statuses are recorded to the directory `path`
     """
     sim = SmartAgentModel2D(
         p=p,
@@ -37,7 +41,7 @@ def sim_agent(
         prob_infect=prob_infect,
         initial_infect=initial_infect,
     )
-    vals = sim.step_t_days(t)
+    vals = sim.record_t_days(t, path)
     return vals
 
 
@@ -55,42 +59,26 @@ PI = 1
 II = 5
 
 # simulation with no learning
-X = sim_agent(
-    p=P,
-    q=Q,
-    k=K,
-    size=Size,
-    t=T,
-    knowledge_threshold=KT,
-    fear_threshold=FT,
-    knowledge_distance=KD,
-    fear_distance=FD,
-    prob_infect=PI,
-    initial_infect=II,
-)
+with tempfile.TemporaryDirectory() as run:
+    X = sim_agent(
+        p=P,
+        q=Q,
+        k=K,
+        size=Size,
+        t=T,
+        knowledge_threshold=KT,
+        fear_threshold=FT,
+        knowledge_distance=KD,
+        fear_distance=FD,
+        prob_infect=PI,
+        initial_infect=II,
+        path=run,
+    )
 
-figfull = plt.figure(figsize=(10, 10))
-count = 1
-for t in [0, 66, 133, 199]:
-    plt.subplot(2, 2, count)
-    for ii in range(len(X[3][t])):
-        if X[3][t][ii] == 0:
-            color = "blue"
-        elif X[3][t][ii] == 1:
-            color = "red"
-        else:
-            color = "green"
-        x, y = X[1][t][ii], X[2][t][ii]
-        plt.scatter(x, y, c=color, alpha=0.5, edgecolors="none")
-        plt.title("state at t = {}".format(t + 1))
-    count = count + 1
-blue_patch = mpatches.Patch(color="blue", label="susceptible")
-red_patch = mpatches.Patch(color="red", label="infected")
-green_patch = mpatches.Patch(color="green", label="recovered")
-figfull.legend(handles=[blue_patch, red_patch, green_patch])
-figfull.suptitle("p = 0.01, q = 0.01, k = 0.05, size = 10000, I0 = 5, no learning")
-plt.savefig("../doc/final/plots/nolearn.png")
-print(X[0])
+    figfull = plot_snapshots(Trajectory(run), [0, 66, 133, 199])
+    figfull.suptitle("p = 0.01, q = 0.01, k = 0.05, size = 10000, I0 = 5, no learning")
+    plt.savefig("../doc/final/plots/nolearn.png")
+print(X)
 
 # parameters for simulation with learning
 P = 0.01
@@ -106,41 +94,25 @@ PI = 1
 II = 5
 
 # simulation with no learning
-X = sim_agent(
-    p=P,
-    q=Q,
-    k=K,
-    size=Size,
-    t=T,
-    knowledge_threshold=KT,
-    fear_threshold=FT,
-    knowledge_distance=KD,
-    fear_distance=FD,
-    prob_infect=PI,
-    initial_infect=II,
-)
+with tempfile.TemporaryDirectory() as run:
+    X = sim_agent(
+        p=P,
+        q=Q,
+        k=K,
+        size=Size,
+        t=T,
+        knowledge_threshold=KT,
+        fear_threshold=FT,
+        knowledge_distance=KD,
+        fear_distance=FD,
+        prob_infect=PI,
+        initial_infect=II,
+        path=run,
+    )
 
-figfull = plt.figure(figsize=(10, 10))
-count = 1
-for t in [0, 66, 133, 199]:
-    plt.subplot(2, 2, count)
-    for ii in range(len(X[3][t])):
-        if X[3][t][ii] == 0:
-            color = "blue"
-        elif X[3][t][ii] == 1:
-            color = "red"
-        else:
-            color = "green"
-        x, y = X[1][t][ii], X[2][t][ii]
-        plt.scatter(x, y, c=color, alpha=0.5, edgecolors="none")
-        plt.title("state at t = {}".format(t + 1))
-    count = count + 1
-blue_patch = mpatches.Patch(color="blue", label="susceptible")
-red_patch = mpatches.Patch(color="red", label="infected")
-green_patch = mpatches.Patch(color="green", label="recoverd")
-figfull.legend(handles=[blue_patch, red_patch, green_patch])
-figfull.suptitle(
-    "p = 0.01, q = 0.01, k = 0.05, size = 10000, I0 = 5, kt = ft = 1000, kd = fd = 0.1"
-)
-plt.savefig("../doc/final/plots/yeslearn.png")
-print(X[0])
+    figfull = plot_snapshots(Trajectory(run), [0, 66, 133, 199])
+    figfull.suptitle(
+        "p = 0.01, q = 0.01, k = 0.05, size = 10000, I0 = 5, kt = ft = 1000, kd = fd = 0.1"
+    )
+    plt.savefig("../doc/final/plots/yeslearn.png")
+print(X)
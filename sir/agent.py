@@ -1,14 +1,65 @@
 """
-Definitions for `DiscreteAgentModel` class, and the `Agent` class
+Definitions for `DiscreteAgentModel` and `ArrayAgentModel` classes, and the `Agent` class
 """
 
-import random
 import math
+from collections.abc import Sequence
 import numpy as np
 
+try:
+    from compartments import IndexSet
+except ImportError:  # imported as part of the `sir` package
+    from .compartments import IndexSet
 
-class DiscreteAgentModel:
-    def __init__(self, b, k, size, prob_infect=None, initial_infect=None):
+try:
+    from streaming import StreamingMixin
+except ImportError:  # imported as part of the `sir` package
+    from .streaming import StreamingMixin
+
+# Status codes used by the array-backed engine
+SUSCEPTIBLE, INFECTED, RECOVERED = 0, 1, 2
+
+
+def sample_contacts(rng, num_infectors, size, b):
+    """
+    Draw `b` distinct contacts, out of `size` agents, for each of `num_infectors` agents.
+    Uses Floyd's sampling algorithm, vectorized across the infectors: all random numbers
+    come from a single call to `rng`, and only the duplicate fix-ups loop over the `b` columns
+    :param rng: `numpy.random.Generator` to draw from
+    :param num_infectors: number of agents who make contacts
+    :param size: number of agents who can be contacted
+    :param b: number of contacts per agent
+    :return: `num_infectors` by `b` numpy array of agent indices
+    """
+    if not 0 <= b <= size:
+        raise ValueError("Sample larger than population or is negative")
+    # Column `col` is a uniform draw from [0, size - b + col]
+    contacts = rng.integers(
+        0, np.arange(size - b + 1, size + 1), size=(num_infectors, b)
+    )
+    for col in range(1, b):
+        # Floyd: if the draw was already taken, take the upper end of the range instead
+        taken = np.any(contacts[:, :col] == contacts[:, col : col + 1], axis=1)
+        contacts[taken, col] = size - b + col
+    return contacts
+
+
+def infect_contacts(rng, contacts, susceptible, prob_infect):
+    """
+    Decide which contacts result in an infection
+    :param rng: `numpy.random.Generator` to draw from
+    :param contacts: array of agent indices that were contacted by infected agents
+    :param susceptible: boolean mask of the susceptible agents
+    :param prob_infect: probability that contact with a susceptible agent infects them
+    :return: sorted array of the (unique) indices of newly infected agents
+    """
+    hits = contacts[susceptible[contacts]]
+    hits = hits[rng.random(len(hits)) < prob_infect]
+    return np.unique(hits)
+
+
+class DiscreteAgentModel(StreamingMixin):
+    def __init__(self, b, k, size, prob_infect=None, initial_infect=None, rng=None):
         """
         Initialize an `DiscreteAgentModel` class
         :param b: number of interactions per day, per agent, which could result in infection
@@ -17,14 +68,17 @@ class DiscreteAgentModel:
         :param prob_infect: (optional) probability that an interaction between a susceptible
         agent and an infected agent results in the susceptible agent's infection
         :param initial_infect: (optional) if supplied, start with `initial_infect` agents already infected
+        :param rng: (optional) `numpy.random.Generator`, or seed for one, used for all of
+        the model's randomness
         :return: None
         """
         self.b, self.k, self.size = b, k, size
         self.agents = [Agent(ii) for ii in range(size)]
-        self.susceptible = [agent.id for agent in self.agents]
-        self.infected = []
-        self.recovered = []
+        self.susceptible = IndexSet(size, np.arange(size))
+        self.infected = IndexSet(size)
+        self.recovered = IndexSet(size)
         self.days_passed = 0
+        self.rng = np.random.default_rng(rng)
         self.initial_infect = initial_infect
         self.prob_infect = 1 if prob_infect is None else prob_infect
         if self.initial_infect is not None:
@@ -39,20 +93,20 @@ class DiscreteAgentModel:
         """
         if n is not None:
             if n <= len(self.susceptible):
-                infected = sorted(random.sample(self.susceptible, k=n))
+                infected = np.sort(
+                    self.rng.choice(self.susceptible.to_array(), size=n, replace=False)
+                )
                 for agent_id in infected:
-                    self.agents[agent_id].infect()
-                    self.categorize_agents()
+                    self._infect(agent_id)
             else:
                 print(
                     "DiscreteAgentModel.exogenous_infect: `n` greater than the number of susceptible agents"
                 )
 
         if indices is not None:
-            if set(indices).issubset(set(self.susceptible)):
+            if all(agent_id in self.susceptible for agent_id in indices):
                 for agent_id in indices:
-                    self.agents[agent_id].infect()
-                    self.categorize_agents()
+                    self._infect(agent_id)
             else:
                 print(
                     "DiscreteAgentModel.exogenous_infect: `indices` contains non-susceptible agents"
@@ -71,56 +125,85 @@ class DiscreteAgentModel:
         for agent in self.agents:
             agent.reset()
 
-        self.susceptible = list(range(self.size))
-        self.infected = []
-        self.recovered = []
+        self.susceptible.add_many(np.arange(self.size))
+        self.infected.clear()
+        self.recovered.clear()
         self.days_passed = 0
 
+    def _infect(self, agent_id):
+        """
+        Infect a susceptible agent, and move its `id` to `self.infected`
+        :return: None
+        """
+        self.agents[agent_id].infect()
+        self.susceptible.remove(agent_id)
+        self.infected.add(agent_id)
+
+    def _recover(self, agent_id):
+        """
+        Recover an infected agent, and move its `id` to `self.recovered`
+        :return: None
+        """
+        self.agents[agent_id].recover()
+        self.infected.remove(agent_id)
+        self.recovered.add(agent_id)
+
     def categorize_agents(self):
         """
-        Iterate through the agents, and append their `id` to the appropriate list
-        based off their current status
+        Iterate through the agents, and rebuild the sets of `id`s in each compartment
+        from scratch, based off their current status. The compartments are kept up to
+        date as agents change status, so this is only needed if agents were modified
+        directly
         :return: None
         """
-        self.susceptible = []
-        self.infected = []
-        self.recovered = []
+        self.susceptible = IndexSet(self.size)
+        self.infected = IndexSet(self.size)
+        self.recovered = IndexSet(self.size)
         for agent in self.agents:
             s, i, r = agent.status()
             if s:
-                self.susceptible.append(agent.id)
+                self.susceptible.add(agent.id)
             elif i:
-                self.infected.append(agent.id)
+                self.infected.add(agent.id)
             else:
-                self.recovered.append(agent.id)
+                self.recovered.add(agent.id)
+
+    def check_compartments(self):
+        """
+        Debugging aid: rescan every agent, and check that the compartments agree with
+        the agents' statuses
+        :return: True if they agree
+        """
+        for agent in self.agents:
+            if agent.status() != (
+                agent.id in self.susceptible,
+                agent.id in self.infected,
+                agent.id in self.recovered,
+            ):
+                return False
+        return True
 
     def step(self):
         """
         Simulate one day according to SIR model parameters
         :return: None
         """
-        agent_ids = [agent.id for agent in self.agents]
-
         # Recover k proportion of the infected
         num_recover = math.ceil(len(self.infected) * self.k)
-        ids_recover = random.sample(self.infected, k=num_recover)
+        ids_recover = self.rng.choice(
+            self.infected.to_array(), size=num_recover, replace=False
+        )
         for r_id in ids_recover:
-            self.agents[r_id].recover()
-            self.categorize_agents()
-
-        # Infect susceptible agents, if they meet an infected agent
-        for i_id in self.infected:
-            meet = random.sample(agent_ids, k=self.b)
-            # If there is intersection between `meet` and `self.infected`, the agent
-            # has met someone who is infected -- so they will be infected
-            for id in meet:
-                if id in self.susceptible:
-                    # This allows us to change the probability of infection occuring
-                    infect = random.random()
-                    if infect < self.prob_infect:
-                        self.agents[id].infect()
-
-        self.categorize_agents()
+            self._recover(r_id)
+
+        # Infect susceptible agents, if they meet an infected agent. All of the
+        # contacts for the day are drawn at once, see `sample_contacts`
+        susceptible = np.zeros(self.size, dtype=bool)
+        susceptible[self.susceptible.to_array()] = True
+        contacts = sample_contacts(self.rng, len(self.infected), self.size, self.b)
+        for id in infect_contacts(self.rng, contacts, susceptible, self.prob_infect):
+            self._infect(id)
+
         self.days_passed += 1
 
     def step_t_days(self, days):
@@ -160,6 +243,354 @@ class DiscreteAgentModel:
         )
 
 
+class ArrayAgentModel(DiscreteAgentModel):
+    def __init__(self, b, k, size, prob_infect=None, initial_infect=None, rng=None):
+        """
+        Initialize an `ArrayAgentModel` class. This is an alternative engine for
+        `DiscreteAgentModel` with the same parameters and methods, but the state of
+        every agent is stored in a single int8 numpy array (`self.status`) instead of
+        one `Agent` object per person. `Agent` objects are only created on request,
+        through `self.agents`
+        :param b: number of interactions per day, per agent, which could result in infection
+        :param k: proportion of infected who recover/removed each day
+        :param size: number of agents to generate
+        :param prob_infect: (optional) probability that an interaction between a susceptible
+        agent and an infected agent results in the susceptible agent's infection
+        :param initial_infect: (optional) if supplied, start with `initial_infect` agents already infected
+        :param rng: (optional) `numpy.random.Generator`, or seed for one, used for all of
+        the model's randomness
+        :return: None
+        """
+        self.b, self.k, self.size = b, k, size
+        self.status = np.full(size, SUSCEPTIBLE, dtype=np.int8)
+        self.infected = IndexSet(size)
+        self.num_recovered = 0
+        self.rng = np.random.default_rng(rng)
+        self.days_passed = 0
+        self.initial_infect = initial_infect
+        self.prob_infect = 1 if prob_infect is None else prob_infect
+        if self.initial_infect is not None:
+            self.exogenous_infect(n=initial_infect)
+
+    @property
+    def agents(self):
+        """
+        Lazy sequence of `AgentView`s; an `Agent` is only built when it is indexed
+        """
+        return AgentViews(self)
+
+    @property
+    def susceptible(self):
+        """
+        Indices of the susceptible agents
+        """
+        return np.flatnonzero(self.status == SUSCEPTIBLE)
+
+    @property
+    def recovered(self):
+        """
+        Indices of the recovered agents
+        """
+        return np.flatnonzero(self.status == RECOVERED)
+
+    def exogenous_infect(self, n=None, indices=None):
+        """
+        Infect `n` of the individuals in `self.status` exogenously (i.e., outside model parameters)
+        :param n: Number of agents to infect
+        :param indices: Alternative to `n`, specify the indices in `self.status` to infect
+        :return: None
+        """
+        if n is not None:
+            susceptible = self.susceptible
+            if n <= len(susceptible):
+                self._infect_many(self.rng.choice(susceptible, size=n, replace=False))
+            else:
+                print(
+                    "ArrayAgentModel.exogenous_infect: `n` greater than the number of susceptible agents"
+                )
+
+        if indices is not None:
+            indices = np.asarray(indices, dtype=np.int64)
+            if np.all(self.status[indices] == SUSCEPTIBLE):
+                self._infect_many(np.unique(indices))
+            else:
+                print(
+                    "ArrayAgentModel.exogenous_infect: `indices` contains non-susceptible agents"
+                )
+
+        if n is None and indices is None:
+            print(
+                "ArrayAgentModel.exogenous_infect: supply either `n` or `indices`. No action was taken"
+            )
+
+    def reset(self):
+        """
+        Reset the model to a "clean slate"
+        :return: None
+        """
+        self.status[:] = SUSCEPTIBLE
+        self.infected.clear()
+        self.num_recovered = 0
+        self.days_passed = 0
+
+    def _infect_many(self, ids):
+        """
+        Infect an array of distinct susceptible agents
+        :return: None
+        """
+        self.status[ids] = INFECTED
+        self.infected.add_many(ids)
+
+    def _recover_many(self, ids):
+        """
+        Recover an array of distinct infected agents
+        :return: None
+        """
+        self.status[ids] = RECOVERED
+        self.infected.remove_many(ids)
+        self.num_recovered += len(ids)
+
+    def _make_susceptible(self, ids):
+        """
+        Return an array of distinct agents to the susceptible state
+        :return: None
+        """
+        self.num_recovered -= np.count_nonzero(self.status[ids] == RECOVERED)
+        self.infected.remove_many(ids)
+        self.status[ids] = SUSCEPTIBLE
+
+    def categorize_agents(self):
+        """
+        Rebuild `self.infected` and the recovered count from a full scan of `self.status`
+        :return: None
+        """
+        self.infected = IndexSet(self.size, np.flatnonzero(self.status == INFECTED))
+        self.num_recovered = np.count_nonzero(self.status == RECOVERED)
+
+    def check_compartments(self):
+        """
+        Debugging aid: check that `self.infected` and the recovered count agree with
+        a full scan of `self.status`
+        :return: True if they agree
+        """
+        infected = np.flatnonzero(self.status == INFECTED)
+        return (
+            len(infected) == len(self.infected)
+            and all(self.infected.position[infected] >= 0)
+            and self.num_recovered == np.count_nonzero(self.status == RECOVERED)
+        )
+
+    def step(self):
+        """
+        Simulate one day according to SIR model parameters
+        :return: None
+        """
+        # Recover k proportion of the infected
+        num_recover = math.ceil(len(self.infected) * self.k)
+        ids_recover = self.rng.choice(
+            self.infected.to_array(), size=num_recover, replace=False
+        )
+        self._recover_many(ids_recover)
+
+        # Infect susceptible agents, if they meet an infected agent. Whether a
+        # contact is susceptible is decided by the status at the start of the
+        # infection phase, as in `DiscreteAgentModel`
+        susceptible = self.status == SUSCEPTIBLE
+        contacts = sample_contacts(self.rng, len(self.infected), self.size, self.b)
+        new_infect = infect_contacts(self.rng, contacts, susceptible, self.prob_infect)
+        self._infect_many(new_infect)
+        self.days_passed += 1
+
+    def summarize_model(self):
+        """
+        Summarize the current state of the `ArrayAgentModel` object
+        :return: A tuple summarizing the state of the model
+        """
+        num_i = len(self.infected)
+        return (
+            self.days_passed,
+            self.size - num_i - self.num_recovered,
+            num_i,
+            self.num_recovered,
+        )
+
+
+class EnsembleAgentModel(StreamingMixin):
+    def __init__(
+        self, b, k, size, replicates, prob_infect=None, initial_infect=None, rng=None
+    ):
+        """
+        Initialize an `EnsembleAgentModel` class: `replicates` independent copies of
+        `DiscreteAgentModel`, advanced together. The status of every agent in every
+        replicate is stored in a `replicates` by `size` int8 numpy array
+        :param b: number of interactions per day, per agent, which could result in infection
+        :param k: proportion of infected who recover/removed each day
+        :param size: number of agents to generate, in each replicate
+        :param replicates: number of independent replicates
+        :param prob_infect: (optional) probability that an interaction between a susceptible
+        agent and an infected agent results in the susceptible agent's infection
+        :param initial_infect: (optional) if supplied, start with `initial_infect` agents
+        already infected, in each replicate
+        :param rng: (optional) `numpy.random.Generator`, or seed for one, used for all of
+        the model's randomness
+        :return: None
+        """
+        self.b, self.k, self.size, self.replicates = b, k, size, replicates
+        self.status = np.full((replicates, size), SUSCEPTIBLE, dtype=np.int8)
+        # Number of susceptible, infected and recovered agents in each replicate
+        self.counts = np.zeros((replicates, 3), dtype=np.int64)
+        self.counts[:, SUSCEPTIBLE] = size
+        self.rng = np.random.default_rng(rng)
+        self.days_passed = 0
+        self.initial_infect = initial_infect
+        self.prob_infect = 1 if prob_infect is None else prob_infect
+        if self.initial_infect is not None:
+            self.exogenous_infect(n=initial_infect)
+
+    def _pick(self, state, num):
+        """
+        Pick `num[r]` agents uniformly at random, without replacement, out of the agents
+        in replicate `r` with status `state`
+        :return: tuple of row and column indices of the picked agents
+        """
+        rows, cols = np.nonzero(self.status == state)
+        # Shuffle the candidates within each replicate (`rows` is already sorted), then
+        # keep the first `num` of each replicate
+        order = np.argsort(rows + self.rng.random(len(rows)))
+        rows, cols = rows[order], cols[order]
+        start = np.searchsorted(rows, np.arange(self.replicates))
+        keep = np.arange(len(rows)) - start[rows] < num[rows]
+        return rows[keep], cols[keep]
+
+    def _set_status(self, rows, cols, state):
+        """
+        Move the (distinct) agents at `rows`, `cols` into `state`, updating `self.counts`
+        :return: None
+        """
+        np.subtract.at(self.counts, (rows, self.status[rows, cols]), 1)
+        np.add.at(self.counts, (rows, state), 1)
+        self.status[rows, cols] = state
+
+    def exogenous_infect(self, n=None, indices=None):
+        """
+        Infect `n` of the individuals in each replicate exogenously (i.e., outside model parameters)
+        :param n: Number of agents to infect
+        :param indices: Alternative to `n`, specify the indices to infect in every replicate
+        :return: None
+        """
+        if n is not None:
+            if n <= self.counts[:, SUSCEPTIBLE].min():
+                num = np.full(self.replicates, n)
+                self._set_status(*self._pick(SUSCEPTIBLE, num), INFECTED)
+            else:
+                print(
+                    "EnsembleAgentModel.exogenous_infect: `n` greater than the number of susceptible agents"
+                )
+
+        if indices is not None:
+            indices = np.unique(indices)
+            if np.all(self.status[:, indices] == SUSCEPTIBLE):
+                rows = np.repeat(np.arange(self.replicates), len(indices))
+                cols = np.tile(indices, self.replicates)
+                self._set_status(rows, cols, INFECTED)
+            else:
+                print(
+                    "EnsembleAgentModel.exogenous_infect: `indices` contains non-susceptible agents"
+                )
+
+        if n is None and indices is None:
+            print(
+                "EnsembleAgentModel.exogenous_infect: supply either `n` or `indices`. No action was taken"
+            )
+
+    def reset(self):
+        """
+        Reset every replicate to a "clean slate"
+        :return: None
+        """
+        self.status[:] = SUSCEPTIBLE
+        self.counts[:] = 0
+        self.counts[:, SUSCEPTIBLE] = self.size
+        self.days_passed = 0
+
+    def step(self):
+        """
+        Simulate one day in every replicate, according to the same procedure as
+        `DiscreteAgentModel.step`
+        :return: None
+        """
+        # Recover k proportion of the infected
+        num_recover = np.ceil(self.counts[:, INFECTED] * self.k).astype(np.int64)
+        self._set_status(*self._pick(INFECTED, num_recover), RECOVERED)
+
+        # Infect susceptible agents, if they meet an infected agent of their replicate
+        rows, cols = np.nonzero(self.status == INFECTED)
+        contacts = sample_contacts(self.rng, len(rows), self.size, self.b)
+        rows = np.repeat(rows, self.b)
+        contacts = contacts.ravel()
+        hits = self.status[rows, contacts] == SUSCEPTIBLE
+        hits[hits] = self.rng.random(np.count_nonzero(hits)) < self.prob_infect
+        new_infect = np.zeros((self.replicates, self.size), dtype=bool)
+        new_infect[rows[hits], contacts[hits]] = True
+        self.status[new_infect] = INFECTED
+        num_infect = np.count_nonzero(new_infect, axis=1)
+        self.counts[:, SUSCEPTIBLE] -= num_infect
+        self.counts[:, INFECTED] += num_infect
+
+        self.days_passed += 1
+
+    def step_t_days(self, days):
+        """
+        Simulate infections for `days` in every replicate
+        :param days: Number of days to step
+        :return: `replicates` by `days` by `4` numpy array; each replicate has the same
+        columns as the output of `DiscreteAgentModel.step_t_days`
+        """
+        result = np.zeros((self.replicates, days, 4), dtype=np.int64)
+        result[:, 0] = self.summarize_model()
+        for ii in np.arange(1, days):
+            self.step()
+            result[:, ii] = self.summarize_model()
+        return result
+
+    def summarize_model(self):
+        """
+        Summarize the current state of every replicate
+        :return: `replicates` by `4` numpy array with columns day, number susceptible,
+        number infected and number recovered
+        """
+        summary = np.empty((self.replicates, 4), dtype=np.int64)
+        summary[:, 0] = self.days_passed
+        summary[:, 1:] = self.counts
+        return summary
+
+
+class AgentViews(Sequence):
+    """
+    Read-through sequence of the agents of an `ArrayAgentModel`
+    """
+
+    def __init__(self, model):
+        """
+        Wrap `model`; no `Agent` objects are created until they are indexed
+        """
+        self.model = model
+
+    def __len__(self):
+        return self.model.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [
+                AgentView(self.model, ii) for ii in range(*index.indices(len(self)))
+            ]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("agent index out of range")
+        return AgentView(self.model, index)
+
+
 class Agent:
     def __init__(self, agent_id):
         """
@@ -208,3 +639,52 @@ class Agent:
         :return: Tuple
         """
         return self.s, self.i, self.r
+
+
+class AgentView(Agent):
+    """
+    `Agent` whose state is read from, and written to, the `status` array of an
+    `ArrayAgentModel`
+    """
+
+    def __init__(self, model, agent_id):
+        """
+        Initialize a view onto agent `agent_id` of `model`
+        """
+        self.model = model
+        self.id = agent_id
+
+    @property
+    def s(self):
+        return bool(self.model.status[self.id] == SUSCEPTIBLE)
+
+    @property
+    def i(self):
+        return bool(self.model.status[self.id] == INFECTED)
+
+    @property
+    def r(self):
+        return bool(self.model.status[self.id] == RECOVERED)
+
+    def reset(self):
+        """
+        Make the agent susceptible again
+        :return: None
+        """
+        self.model._make_susceptible([self.id])
+
+    def infect(self):
+        """
+        Infect the agent, if it is susceptible
+        :return: None
+        """
+        if self.s:
+            self.model._infect_many([self.id])
+
+    def recover(self):
+        """
+        Recover the agent, if it is infected
+        :return: None
+        """
+        if self.i:
+            self.model._recover_many([self.id])
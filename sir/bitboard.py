@@ -0,0 +1,365 @@
+"""
+Definition of the `BitboardConwayModel` class: the `ConwayModel` game, with every layer
+of the board stored as bits, 64 cells per uint64 word
+
+A board of `m` rows and `n` columns is an `m` by `ceil(n / 64)` array of words; cell
+(r, c) is bit `c % 64` of word (r, c // 64), and the bits past column `n` are always 0.
+Neighbor counts are computed for 64 cells at a time with bit-sliced adders, and boards
+are processed in bands of rows, so memory use is about 3 bits per cell (alive, infected,
+recovered) plus a small working space; a 10^5 by 10^5 board takes under 4 GB
+"""
+
+import math
+import numpy as np
+
+try:
+    from streaming import StreamingMixin
+except ImportError:  # imported as part of the `sir` package
+    from .streaming import StreamingMixin
+
+try:
+    from conway_agent import DEAD, SUSCEPTIBLE, INFECTED, RECOVERED
+except ImportError:  # imported as part of the `sir` package
+    from .conway_agent import DEAD, SUSCEPTIBLE, INFECTED, RECOVERED
+
+# Words processed at once by the banded loops; bounds the working memory
+BAND_WORDS = 2**18
+
+_ONE, _TOP = np.uint64(1), np.uint64(63)
+
+
+def words_per_row(n):
+    """
+    Number of uint64 words holding a row of `n` cells
+    """
+    return -(-n // 64)
+
+
+def pack(cells):
+    """
+    Pack a boolean `m` by `n` array into words
+    :return: `m` by `words_per_row(n)` uint64 numpy array
+    """
+    cells = np.asarray(cells, dtype=bool)
+    m, n = cells.shape
+    padded = np.zeros((m, 64 * words_per_row(n)), dtype=bool)
+    padded[:, :n] = cells
+    return unpacked_to_words(padded)
+
+
+def unpacked_to_words(bits):
+    """
+    Pack a boolean array whose rows are a whole number of words long
+    :return: uint64 numpy array
+    """
+    packed = np.packbits(bits, axis=-1, bitorder="little")
+    return np.ascontiguousarray(packed).view("<u8").astype(np.uint64, copy=False)
+
+
+def unpack(words, n=None):
+    """
+    Unpack words into a boolean array, with `n` columns (default: every bit)
+    :return: boolean numpy array
+    """
+    words = np.ascontiguousarray(words, dtype="<u8")
+    bits = np.unpackbits(words.view(np.uint8), axis=-1, bitorder="little")
+    return bits[..., :n].astype(bool)
+
+
+def set_bits(words):
+    """
+    Flat indices of the set bits of `words`, as cells of the unpacked array; only the
+    nonzero words are unpacked
+    :return: sorted int64 numpy array
+    """
+    flat = words.ravel()
+    nonzero = np.flatnonzero(flat)
+    bits = unpack(flat[nonzero][:, None])
+    word, bit = np.nonzero(bits)
+    return nonzero[word] * 64 + bit
+
+
+def from_bits(cells, shape):
+    """
+    Words of the given `shape` with only the bits at flat indices `cells` set
+    :return: uint64 numpy array
+    """
+    words = np.zeros(int(np.prod(shape)), dtype=np.uint64)
+    cells = np.asarray(cells, dtype=np.int64)
+    np.bitwise_or.at(words, cells // 64, _ONE << (cells % 64).astype(np.uint64))
+    return words.reshape(shape)
+
+
+def popcount(words):
+    """
+    Total number of set bits in `words`
+    :return: int
+    """
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+    # SWAR popcount, for numpy < 2.0
+    x = words - ((words >> _ONE) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + (
+        (x >> np.uint64(2)) & np.uint64(0x3333333333333333)
+    )
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return int(((x * np.uint64(0x0101010101010101)) >> np.uint64(56)).sum())
+
+
+def row_mask(n):
+    """
+    Mask of the bits of a row which are cells of a board with `n` columns
+    :return: uint64 numpy array of length `words_per_row(n)`
+    """
+    mask = np.full(words_per_row(n), np.iinfo(np.uint64).max, dtype=np.uint64)
+    if n % 64:
+        mask[-1] = (_ONE << np.uint64(n % 64)) - _ONE
+    return mask
+
+
+def _sides(rows):
+    """
+    The left and right neighbor of every cell, as words
+    """
+    left = rows << _ONE
+    left[:, 1:] |= rows[:, :-1] >> _TOP
+    right = rows >> _ONE
+    right[:, :-1] |= rows[:, 1:] << _TOP
+    return left, right
+
+
+def _add(a, b):
+    """
+    Bit-sliced addition of two numbers given as lists of bit planes, least significant
+    first
+    :return: list of bit planes of the sum
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    total, carry = [], None
+    for ii, x in enumerate(a):
+        y = b[ii] if ii < len(b) else carry
+        if ii < len(b) and carry is not None:
+            # Full adder
+            total.append(x ^ y ^ carry)
+            carry = x & y | carry & (x ^ y)
+        elif y is not None:
+            # Half adder
+            total.append(x ^ y)
+            carry = x & y
+        else:
+            total.append(x)
+            carry = None
+    if carry is not None:
+        total.append(carry)
+    return total
+
+
+def neighbor_planes(block):
+    """
+    Count the neighbors of every cell of the rows `block[1:-1]`, whose neighbors above
+    and below are the first and last rows of `block`
+    :param block: (number of rows + 2) by (words per row) uint64 numpy array
+    :return: list of 4 bit planes (least significant first) of the counts, 0 to 8,
+    each (number of rows) by (words per row)
+    """
+    left, right = _sides(block)
+    # Sum of each row's cell and its left and right neighbors, 0 to 3
+    line = [left ^ block ^ right, left & block | right & (left ^ block)]
+    above = [plane[:-2] for plane in line]
+    below = [plane[2:] for plane in line]
+    sides = [left[1:-1] ^ right[1:-1], left[1:-1] & right[1:-1]]
+    counts = _add(_add(above, below), sides)
+    zero = np.zeros_like(counts[0])
+    return (counts + [zero] * 4)[:4]
+
+
+def _bands(m, n):
+    """
+    Row ranges of the bands of an `m` by `n` board
+    :return: list of (first row, last row + 1) pairs
+    """
+    rows = max(1, BAND_WORDS // words_per_row(n))
+    return [(r0, min(r0 + rows, m)) for r0 in range(0, m, rows)]
+
+
+def _blocks(board, m, n):
+    """
+    Walk over the bands of `board`, yielding each band's rows with one extra row above
+    and below (zeros past the edges). The rows above are copies taken before the band
+    above was yielded, so the band above may be overwritten in the meantime
+    :return: generator of (first row, last row + 1, block) tuples
+    """
+    above = np.zeros(words_per_row(n), dtype=np.uint64)
+    for r0, r1 in _bands(m, n):
+        below = board[r1] if r1 < m else np.zeros_like(above)
+        block = np.concatenate([above[None], board[r0:r1], below[None]])
+        above = board[r1 - 1].copy()
+        yield r0, r1, block
+
+
+def life_step(board, n):
+    """
+    Advance the packed board `board` one generation of Conway's game of life, in place;
+    cells past the edges are dead
+    :param board: `m` by `words_per_row(n)` uint64 numpy array
+    :param n: number of columns
+    :return: `board`
+    """
+    mask = row_mask(n)
+    for r0, r1, block in _blocks(board, len(board), n):
+        c0, c1, c2, c3 = neighbor_planes(block)
+        # Born with 3 neighbors, survive with 2 or 3
+        alive = block[1:-1]
+        board[r0:r1] = c1 & ~c2 & ~c3 & (c0 | alive) & mask
+    return board
+
+
+class BitboardConwayModel(StreamingMixin):
+    def __init__(self, m, n, k, p, grid, rng=None):
+        """
+        Initialize a `BitboardConwayModel`: the same model as `ConwayModel`, but each
+        layer of the board is stored as bits. Random numbers are only drawn for the
+        cells that need them, so seeded runs match `ConwayModel` in distribution rather
+        than number for number
+        :param m: number of rows on the grid
+        :param n: number of columns on the grid
+        :param k: proportion of infected who recover each day
+        :param p: probability of infection, if a susceptible agent and an infected agent interact
+        :param grid: `m` x `n` status grid in the layout of `ConwayModel.grid`, or a
+        tuple of packed (alive, infected, recovered) boards
+        :param rng: (optional) `numpy.random.Generator`, or seed for one, used for all of
+        the model's randomness
+        """
+        self.m, self.n, self.k, self.p = m, n, k, p
+        self.rng = np.random.default_rng(rng)
+        if isinstance(grid, tuple):
+            self.alive, self.infected, self.recovered = (
+                np.array(board, dtype=np.uint64) for board in grid
+            )
+        else:
+            grid = np.asarray(grid).reshape(m, n)
+            self.alive = pack(grid > DEAD)
+            self.infected = pack(np.abs(grid) == INFECTED)
+            self.recovered = pack(np.abs(grid) == RECOVERED)
+        self.days_passed = 0
+
+    @property
+    def grid(self):
+        """
+        The board as an `m` x `n` int8 grid, in the layout of `ConwayModel.grid`;
+        only sensible for boards that fit in memory unpacked
+        """
+        codes = np.full((self.m, self.n), SUSCEPTIBLE, dtype=np.int8)
+        codes[unpack(self.infected, self.n)] = INFECTED
+        codes[unpack(self.recovered, self.n)] = RECOVERED
+        return np.where(unpack(self.alive, self.n), codes, -codes).astype(np.int8)
+
+    @property
+    def agent_grid(self):
+        """
+        `m` x `n` grid of agent statuses, as `ConwayModel.agent_grid`
+        """
+        return np.maximum(self.grid, DEAD)
+
+    def step_conway(self):
+        """
+        The first part of every 'turn': Conway moves
+        """
+        life_step(self.alive, self.n)
+
+    def step_agents(self):
+        """
+        The second part of every 'turn': agent moves. Living susceptible agents with
+        `c` infected neighbors are infected with probability `p ** (1 / c)`, as in
+        `ConwayModel.step_agents`, then `ceil(k * I)` of the `I` agents who were
+        infected at the start of the turn recover
+        """
+        bands = _bands(self.m, self.n)
+        infectious = [
+            popcount(self.alive[r0:r1] & self.infected[r0:r1]) for r0, r1 in bands
+        ]
+        num_recover = math.ceil(self.k * sum(infectious))
+        # Spread the recoveries over the bands as a uniform draw without replacement
+        recover = self.rng.multivariate_hypergeometric(infectious, num_recover)
+
+        # Infected neighbors are counted from the rows as they were at the start of the
+        # turn, so the last row of each band is kept before the band is updated
+        above = np.zeros(words_per_row(self.n), dtype=np.uint64)
+        for (r0, r1), num in zip(bands, recover):
+            rows = slice(r0, r1)
+            middle = self.alive[rows] & self.infected[rows]
+            if r1 < self.m:
+                below = self.alive[r1] & self.infected[r1]
+            else:
+                below = np.zeros_like(above)
+            block = np.concatenate([above[None], middle, below[None]])
+            above = middle[-1].copy()
+
+            susceptible = self.alive[rows] & ~(
+                self.infected[rows] | self.recovered[rows]
+            )
+            if self.p >= 1:
+                infect = susceptible
+            elif not block.any():
+                infect = np.zeros_like(susceptible)
+            else:
+                planes = neighbor_planes(block)
+                exposed = planes[0] | planes[1] | planes[2] | planes[3]
+                infect = self._draw_infections(susceptible & exposed, planes)
+
+            if num > 0:
+                chosen = self.rng.choice(set_bits(middle), size=num, replace=False)
+                healed = from_bits(chosen, middle.shape)
+                self.infected[rows] &= ~healed
+                self.recovered[rows] |= healed
+            self.infected[rows] |= infect
+
+    def _draw_infections(self, candidates, planes):
+        """
+        Infect each of the `candidates` with probability `p ** (1 / c)`, where `c` is
+        its number of infected neighbors
+        :param candidates: packed band of the cells to draw for
+        :param planes: bit planes of the infected neighbor counts of the band
+        :return: packed band of the cells infected
+        """
+        cells = set_bits(candidates)
+        words, shifts = cells // 64, (cells % 64).astype(np.uint64)
+        counts = sum(
+            ((plane.ravel()[words] >> shifts) & _ONE).astype(np.int64) << ii
+            for ii, plane in enumerate(planes)
+        )
+        uniform = self.rng.random(len(cells))
+        return from_bits(cells[np.power(uniform, counts) <= self.p], candidates.shape)
+
+    def step(self):
+        """
+        Simulate one day: Conway moves, then agent moves
+        :return: None
+        """
+        self.step_conway()
+        self.step_agents()
+        self.days_passed += 1
+
+    def step_t_days(self, days):
+        """
+        Simulate infections for `days` according to the procedure defined in `step`
+        :param days: Number of days to step
+        :return: `days` by `4` numpy array, with columns day number, number
+        susceptible, number infected and number recovered
+        """
+        return self.run_days(days)
+
+    def summarize_model(self):
+        """
+        Return the number of susceptible, infected, and recovered "alive" agents,
+        as well as the number of days passed, in a tuple
+        """
+        num_s = num_i = num_r = 0
+        for r0, r1 in _bands(self.m, self.n):
+            alive = self.alive[r0:r1]
+            infected, recovered = self.infected[r0:r1], self.recovered[r0:r1]
+            num_s += popcount(alive & ~infected & ~recovered)
+            num_i += popcount(alive & infected)
+            num_r += popcount(alive & recovered)
+        return self.days_passed, num_s, num_i, num_r
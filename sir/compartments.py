@@ -0,0 +1,115 @@
+"""
+Definition of the `IndexSet` class, used to track which agents are in each compartment
+"""
+
+from collections.abc import Sequence
+import numpy as np
+
+
+class IndexSet(Sequence):
+    """
+    A set of agent ids in `range(capacity)`, stored as a dense array of members plus a
+    map from each id to its position in that array. Adding, removing and membership
+    tests are O(1); removal swaps the last member into the freed slot
+    """
+
+    def __init__(self, capacity, ids=()):
+        """
+        Initialize an `IndexSet`
+        :param capacity: ids must lie in `range(capacity)`
+        :param ids: (optional) ids that start out in the set
+        :return: None
+        """
+        self.capacity = capacity
+        dtype = np.int32 if capacity <= np.iinfo(np.int32).max else np.int64
+        self.members = np.zeros(capacity, dtype=dtype)
+        self.position = np.full(capacity, -1, dtype=dtype)
+        self.n = 0
+        self.add_many(ids)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.members[: self.n][index].tolist()
+        if index < 0:
+            index += self.n
+        if not 0 <= index < self.n:
+            raise IndexError("IndexSet index out of range")
+        return int(self.members[index])
+
+    def __contains__(self, agent_id):
+        return 0 <= agent_id < self.capacity and self.position[agent_id] >= 0
+
+    def __iter__(self):
+        return iter(self.members[: self.n].tolist())
+
+    def __repr__(self):
+        return "IndexSet({})".format(self.members[: self.n].tolist())
+
+    def add(self, agent_id):
+        """
+        Add `agent_id` to the set, if it is not already a member
+        :return: None
+        """
+        if self.position[agent_id] < 0:
+            self.members[self.n] = agent_id
+            self.position[agent_id] = self.n
+            self.n += 1
+
+    def remove(self, agent_id):
+        """
+        Remove `agent_id` from the set, if it is a member
+        :return: None
+        """
+        pos = self.position[agent_id]
+        if pos >= 0:
+            self.n -= 1
+            last = self.members[self.n]
+            self.members[pos] = last
+            self.position[last] = pos
+            self.position[agent_id] = -1
+
+    def add_many(self, ids):
+        """
+        Vectorized `add` for an array of distinct ids
+        :return: None
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        ids = ids[self.position[ids] < 0]
+        self.members[self.n : self.n + len(ids)] = ids
+        self.position[ids] = np.arange(self.n, self.n + len(ids))
+        self.n += len(ids)
+
+    def remove_many(self, ids):
+        """
+        Vectorized `remove` for an array of distinct ids. The slots they free up below
+        the new end of the array are filled by the surviving members above it
+        :return: None
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        ids = ids[self.position[ids] >= 0]
+        end = self.n - len(ids)
+        holes = self.position[ids]
+        holes = holes[holes < end]
+        tail = self.members[end : self.n]
+        self.position[ids] = -1
+        survivors = tail[self.position[tail] >= 0]
+        self.members[holes] = survivors
+        self.position[survivors] = holes
+        self.n = end
+
+    def clear(self):
+        """
+        Remove every member
+        :return: None
+        """
+        self.position[self.members[: self.n]] = -1
+        self.n = 0
+
+    def to_array(self):
+        """
+        Return a copy of the members as a numpy array
+        """
+        return self.members[: self.n].copy()
@@ -2,18 +2,24 @@
 Class definitions for `ConwayAgent` and `ConwayModel` classes
 """
 
-import random
 import math
+from collections.abc import Sequence
 import numpy as np
-from scipy import sparse as sp
 from matplotlib import colors
 from matplotlib import pyplot as plt
 from matplotlib.animation import FuncAnimation
 from agent import Agent, DiscreteAgentModel
+from cycles import CycleCache
+from streaming import StreamingMixin
 
+# Codes of `ConwayAgent.status()`. `ConwayModel.grid` stores the code of each living
+# agent, and minus the code it would have if alive for each dead one, since dead agents
+# keep their susceptible / infected / recovered state until they are born again
+DEAD, SUSCEPTIBLE, INFECTED, RECOVERED = 0, 1, 2, 3
 
-class ConwayModel:
-    def __init__(self, m, n, k, p, agents):
+
+class ConwayModel(StreamingMixin):
+    def __init__(self, m, n, k, p, agents=None, rng=None, grid=None, max_period=64):
         """
         Initalize a `ConwayModel` class.
         :param m: number of rows on the grid
@@ -21,151 +27,156 @@ class ConwayModel:
         :param k: proportion of infected who recover each day
         :param p: probability of infection, if a susceptible agent and an infected agent interact
         :param agents: a list of m * n `ConwayAgent`s set to the desired initial state
-        """
-        self.m, self.n, self.k, self.p, self.agents = m, n, k, p, agents
-        self.alive_agents = self.get_alive_agents()
-        self.set_agent_grid()
-        self.set_conway_grid()
+        :param rng: (optional) `numpy.random.Generator`, or seed for one, used for all of
+        the model's randomness
+        :param grid: (optional) instead of `agents`, an `m` x `n` int8 array of
+        statuses in the layout of `self.grid`; much faster for large boards
+        :param max_period: longest cycle of the Life layer to detect and replay from
+        `self.cycle_cache`; 0 turns the cache off. Up to twice this many alive grids
+        are kept, at one bit per cell
+        """
+        self.m, self.n, self.k, self.p = m, n, k, p
+        self.rng = np.random.default_rng(rng)
+        if grid is None:
+            grid = np.zeros(m * n, dtype=np.int8)
+            for agent in agents:
+                code = 1 if agent.s else 2 if agent.i else 3
+                grid[agent.id] = code if agent.is_alive else -code
+        # The whole state of the model: the only copy
+        self.grid = np.array(grid, dtype=np.int8).reshape(m, n)
         self.days_passed = 0
+        self.cycle_cache = CycleCache(max_period)
 
-    def get_alive_agents(self):
+    @property
+    def agents(self):
         """
-        Filter the agent list to only those which are 'alive' (according to Conway's definition of alive)
+        Lazy sequence of `ConwayAgentView`s, in row-major order; an agent is only built
+        when it is indexed
         """
-        return [agent for agent in self.agents if agent.is_alive]
+        return ConwayAgentViews(self)
 
-    def set_alive_agents(self, born_list):
+    @property
+    def alive_agents(self):
         """
-        Set all agents as being alive or dead, based on membership in a list of ids
+        `ConwayAgentView`s of the living agents
         """
-        for agent in self.agents:
-            if agent.id in born_list:
-                agent.born()
-            else:
-                agent.kill()
-
-        self.alive_agents = self.get_alive_agents()
+        return self.get_alive_agents()
 
-    def set_agent_grid(self, update=False):
+    @property
+    def agent_grid(self):
         """
-        Create an `m` x `n` grid of agent statuses. Can also update `self.alive_agents` if desired
+        `m` x `n` grid of agent statuses
         0 = dead agent
         1 = susceptible agent
         2 = infected agent
         3 = removed agent (but alive)
         """
-        if update:
-            self.alive_agents = self.get_alive_agents()
-
-        data = []
-        ids = []
-        for agent in self.alive_agents:
-            data.append(agent.status())
-            ids.append(agent.id)
+        return np.maximum(self.grid, DEAD)
 
-        rows, cols = np.unravel_index(ids, shape=(self.m, self.n))
-        self.agent_grid = sp.csr_matrix(
-            (data, (rows, cols)), shape=(self.m, self.n), dtype=np.int8
-        ).toarray()
+    @property
+    def conway_grid(self):
+        """
+        `m` x `n` grid indicating which agents are alive
+        """
+        return self.grid > DEAD
 
-    def set_conway_grid(self, update=False):
+    def get_alive_agents(self):
         """
-        Create an `m` x `n` grid indicating which agents are alive
+        Filter the agent list to only those which are 'alive' (according to Conway's definition of alive)
         """
-        if update:
-            self.alive_agents = self.get_alive_agents()
+        return [
+            ConwayAgentView(self, agent_id)
+            for agent_id in np.flatnonzero(self.grid > DEAD)
+        ]
 
-        data = []
-        ids = []
-        for agent in self.alive_agents:
-            data.append(1)
-            ids.append(agent.id)
+    def set_alive_agents(self, born_list):
+        """
+        Set all agents as being alive or dead, based on membership in a list of ids
+        """
+        alive = np.zeros(self.m * self.n, dtype=bool)
+        alive[np.asarray(born_list, dtype=np.int64)] = True
+        self.set_alive(alive.reshape(self.m, self.n))
 
-        rows, cols = np.unravel_index(ids, shape=(self.m, self.n))
-        self.conway_grid = sp.csr_matrix(
-            (data, (rows, cols)), shape=(self.m, self.n)
-        ).toarray()
+    def set_alive(self, alive):
+        """
+        Set all agents as being alive or dead, from an `m` x `n` boolean grid. Agents
+        keep their susceptible / infected / recovered state either way
+        """
+        magnitude = np.abs(self.grid)
+        self.grid = np.where(alive, magnitude, -magnitude).astype(np.int8)
 
     def count_neighbors(self, grid):
         """
-        Count the number of neighbors at every point on a certain grid of 0s and 1s
+        Count the number of neighbors at every point on a certain grid of 0s and 1s,
+        as the sum over each 3 x 3 block (computed one axis at a time) minus the center
         """
-        counts = np.zeros(grid.shape)
-        counts[1:, :] += grid[:-1, :]
-        counts[:, 1:] += grid[:, :-1]
-        counts[:-1, :] += grid[1:, :]
-        counts[:, :-1] += grid[:, 1:]
-        counts[1:, 1:] += grid[:-1, :-1]
-        counts[1:, :-1] += grid[:-1, 1:]
-        counts[:-1, 1:] += grid[1:, :-1]
-        counts[:-1, :-1] += grid[1:, 1:]
-        return counts
+        grid = np.asarray(grid, dtype=np.int8)
+        padded = np.zeros((grid.shape[0] + 2, grid.shape[1] + 2), dtype=np.int8)
+        padded[1:-1, 1:-1] = grid
+        rows = padded[:, :-2] + padded[:, 1:-1] + padded[:, 2:]
+        return rows[:-2] + rows[1:-1] + rows[2:] - grid
 
     def step_conway(self):
         """
         The first part of every 'turn': Conway moves.
-        Need to update the killed/born agents
-        """
-        self.set_conway_grid(True)
-        prior = self.conway_grid.copy()
-        counts = self.count_neighbors(prior)
-        post = np.logical_or(np.logical_and(counts == 2, prior), counts == 3)
-
-        born_rows, born_cols = np.where(post == 1)
-        born_ids = np.ravel_multi_index((born_rows, born_cols), (self.m, self.n))
-
-        self.set_alive_agents(born_ids)
-        self.conway_grid = post
+        Need to update the killed/born agents. Once the alive grid repeats itself, the
+        next grids are read from the cycle kept by `self.cycle_cache`
+        """
+        prior = self.grid > DEAD
+        cached = self.cycle_cache.lookup(np.packbits(prior))
+        if cached is None:
+            counts = self.count_neighbors(prior)
+            post = (counts == 3) | ((counts == 2) & prior)
+            if self.cycle_cache.max_period > 0:
+                self.cycle_cache.store(np.packbits(post))
+        else:
+            post = np.unpackbits(cached, count=prior.size).reshape(prior.shape)
+        self.set_alive(post)
 
     def step_agents(self):
         """
         The second part of every 'turn': agent moves.
         Need to update the susceptible / infect / recovered
         """
-        self.set_agent_grid(True)
         # Determine who is infected
-        infected_ids = [agent.id for agent in self.agents if (agent.status() == 2)]
-
-        # Find susceptible and infected agents
-        s_grid = np.array(self.agent_grid == 1, dtype=np.int8)
-        i_grid = np.array(self.agent_grid == 2, dtype=np.int8)
+        i_grid = self.grid == INFECTED
+        infected_ids = np.flatnonzero(i_grid)
 
         # Find the number of nearby infected agents
         num_infected_nearby = self.count_neighbors(i_grid)
 
         # We incorporate randomness drawn from standard uniform
-        uniform = np.random.random(i_grid.shape)
+        uniform = self.rng.random(i_grid.shape)
 
         # Incoroporate the probability of being infected, based on `self.p`,
         # randomness from the uniform distribution, and the number of nearby infected
-        # agents. This can only apply to agents who are currently susceptible, so we
-        # also compare against s_grid
-        infect_ids = np.ravel_multi_index(
-            np.where(
-                np.logical_and(
-                    np.array(
-                        np.power(uniform, num_infected_nearby) <= self.p,
-                        dtype=np.int8,
-                    ),
-                    s_grid,
-                )
-            ),
-            (self.m, self.n),
-        )
+        # agents. This can only apply to agents who are currently susceptible.
+        # `uniform ** 0` is 1, so agents with no infected neighbors are only infected
+        # if `p >= 1`, and the power need only be taken where there are some
+        infect = self.grid == SUSCEPTIBLE
+        if self.p < 1:
+            infect &= num_infected_nearby > 0
+            cells = np.flatnonzero(infect)
+            power = np.power(uniform.ravel()[cells], num_infected_nearby.ravel()[cells])
+            infect.ravel()[cells[power > self.p]] = False
 
         # Infect those agents
-        for i_id in infect_ids:
-            self.agents[i_id].infect()
+        self.grid[infect] = INFECTED
 
         # Recover `self.k` proportion of the infected agents
-        recover_ids = np.array(
-            random.sample(infected_ids, k=math.ceil(self.k * len(infected_ids)))
+        recover_ids = self.rng.choice(
+            infected_ids, size=math.ceil(self.k * len(infected_ids)), replace=False
         )
-        for r_id in recover_ids:
-            self.agents[r_id].recover()
+        self.grid.flat[recover_ids] = RECOVERED
 
-        # Set the new `self.agent_grid` and we are done
-        self.set_agent_grid(True)
+    def step(self):
+        """
+        Simulate one day: Conway moves, then agent moves
+        :return: None
+        """
+        self.step_conway()
+        self.step_agents()
+        self.days_passed += 1
 
     def step_t_days(self, days):
         """
@@ -186,23 +197,19 @@ class ConwayModel:
         num_d[0], num_s[0], num_i[0], num_r[0] = self.summarize_model()
 
         for ii in np.arange(1, days):
-            self.step_conway()
-            self.step_agents()
-            self.days_passed += 1
+            self.step()
             num_d[ii], num_s[ii], num_i[ii], num_r[ii] = self.summarize_model()
 
         return np.array([num_d, num_s, num_i, num_r]).T
 
     def summarize_model(self):
         """
-        Return the number of infected, susceptible, and recovered "alive" agents,
+        Return the number of susceptible, infected, and recovered "alive" agents,
         as well as the number of days passed, in a tuple
         """
-        agent_status = np.array([agent.status() for agent in self.alive_agents])
-        num_i = np.sum(agent_status == 1)
-        num_s = np.sum(agent_status == 2)
-        num_r = np.sum(agent_status == 3)
-        return self.days_passed, num_i, num_s, num_r
+        counts = np.bincount(self.grid.ravel() + 3, minlength=7)
+        num_s, num_i, num_r = counts[3 + SUSCEPTIBLE : 3 + RECOVERED + 1]
+        return self.days_passed, num_s, num_i, num_r
 
     def plot_t_days(self, days, filename):
         """
@@ -322,3 +329,99 @@ class ConwayAgent(Agent):
                 return 2
             return 3
         return 0
+
+
+class ConwayAgentView(ConwayAgent):
+    """
+    `ConwayAgent` whose state is read from, and written to, the `grid` of a
+    `ConwayModel`
+    """
+
+    def __init__(self, model, agent_id):
+        """
+        Initialize a view onto agent `agent_id` of `model`
+        """
+        self.model = model
+        self.id = int(agent_id)
+
+    @property
+    def _code(self):
+        return int(self.model.grid.flat[self.id])
+
+    def _set(self, code):
+        self.model.grid.flat[self.id] = code
+
+    @property
+    def is_alive(self):
+        return self._code > DEAD
+
+    @property
+    def s(self):
+        return abs(self._code) == SUSCEPTIBLE
+
+    @property
+    def i(self):
+        return abs(self._code) == INFECTED
+
+    @property
+    def r(self):
+        return abs(self._code) == RECOVERED
+
+    def reset(self):
+        """
+        Make the agent susceptible again
+        """
+        self._set(SUSCEPTIBLE if self.is_alive else -SUSCEPTIBLE)
+
+    def infect(self):
+        """
+        If the agent is alive and susceptible, infect the agent
+        """
+        if self.is_alive and self.s:
+            self._set(INFECTED)
+
+    def recover(self):
+        """
+        If the agent is alive and infected, recover the agent
+        """
+        if self.is_alive and self.i:
+            self._set(RECOVERED)
+
+    def born(self):
+        """
+        Bring the agent to life, keeping its state
+        """
+        self._set(abs(self._code))
+
+    def kill(self):
+        """
+        Kill the agent, keeping its state
+        """
+        self._set(-abs(self._code))
+
+
+class ConwayAgentViews(Sequence):
+    """
+    Read-through sequence of the agents of a `ConwayModel`
+    """
+
+    def __init__(self, model):
+        """
+        Wrap `model`; no agents are created until they are indexed
+        """
+        self.model = model
+
+    def __len__(self):
+        return self.model.m * self.model.n
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [
+                ConwayAgentView(self.model, ii)
+                for ii in range(*index.indices(len(self)))
+            ]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("agent index out of range")
+        return ConwayAgentView(self.model, index)
@@ -0,0 +1,304 @@
+"""
+Definitions for `GillespieModel` and `ChainBinomialModel` classes: stochastic SIR
+models for well-mixed populations which only track the number of agents in each
+compartment
+"""
+
+import math
+import numpy as np
+
+try:
+    from streaming import StreamingMixin
+except ImportError:  # imported as part of the `sir` package
+    from .streaming import StreamingMixin
+
+
+class GillespieModel(StreamingMixin):
+    def __init__(
+        self,
+        b,
+        k,
+        size,
+        prob_infect=None,
+        initial_infect=None,
+        method="ssa",
+        epsilon=0.03,
+        rng=None,
+    ):
+        """
+        Initialize a `GillespieModel` class. It uses the same parameters as
+        `DiscreteAgentModel`, taken as continuous-time rates (as in `OdeSir`):
+        infections happen at rate `b * prob_infect * S * I / size`, and
+        recoveries at rate `k * I`
+        :param b: number of interactions per day, per agent, which could result in infection
+        :param k: proportion of infected who recover/removed each day
+        :param size: number of agents
+        :param prob_infect: (optional) probability that an interaction between a susceptible
+        agent and an infected agent results in the susceptible agent's infection
+        :param initial_infect: (optional) if supplied, start with `initial_infect` agents already infected
+        :param method: "ssa" to simulate every event exactly, or "tau" for adaptive
+        tau-leaping, whose cost depends on the number of leaps rather than events
+        :param epsilon: (optional) tau-leaping error control; the expected relative
+        change in each compartment per leap is kept below `epsilon`
+        :param rng: (optional) `numpy.random.Generator`, or seed for one, used for all of
+        the model's randomness
+        :return: None
+        """
+        if method not in ("ssa", "tau"):
+            raise ValueError("method must be 'ssa' or 'tau', not {}".format(method))
+        self.b, self.k, self.size = b, k, size
+        self.method, self.epsilon = method, epsilon
+        self.rng = np.random.default_rng(rng)
+        self.prob_infect = 1 if prob_infect is None else prob_infect
+        self.initial_infect = initial_infect
+        self.reset()
+        if self.initial_infect is not None:
+            self.exogenous_infect(n=initial_infect)
+
+    def exogenous_infect(self, n):
+        """
+        Infect `n` susceptible agents exogenously (i.e., outside model parameters)
+        :param n: Number of agents to infect
+        :return: None
+        """
+        if n <= self.S:
+            self.S -= n
+            self.I += n
+        else:
+            print(
+                "GillespieModel.exogenous_infect: `n` greater than the number of susceptible agents"
+            )
+
+    def reset(self):
+        """
+        Reset the model to a "clean slate"
+        :return: None
+        """
+        self.S, self.I, self.R = self.size, 0, 0
+        self.time = 0.0
+        self.days_passed = 0
+        self.events = 0
+        self.leaps = 0
+
+    def rates(self):
+        """
+        Propensities of the two reactions, infection and recovery
+        :return: tuple of floats
+        """
+        beta = self.b * self.prob_infect / self.size
+        return beta * self.S * self.I, self.k * self.I
+
+    def _ssa(self, t_end, max_events=None):
+        """
+        Gillespie's direct method: simulate every event until `t_end`, or until
+        `max_events` events have happened
+        :return: None
+        """
+        events = 0
+        while max_events is None or events < max_events:
+            infect, recover = self.rates()
+            total = infect + recover
+            if total == 0:
+                self.time = t_end
+                return
+            dt = self.rng.exponential(1 / total)
+            if self.time + dt > t_end:
+                # Memorylessness: the next event is simply redrawn from `t_end`
+                self.time = t_end
+                return
+            self.time += dt
+            if self.rng.random() * total < infect:
+                self.S -= 1
+                self.I += 1
+            else:
+                self.I -= 1
+                self.R += 1
+            events += 1
+            self.events += 1
+
+    def _leap_size(self, infect, recover):
+        """
+        Choose the largest leap which keeps the expected relative change of S and I
+        below `self.epsilon` (Cao, Gillespie and Petzold, 2006)
+        :return: float
+        """
+        # Mean and variance of the change in S and I per unit time. Infection is a
+        # second order reaction, hence the factor of 2 in the bound
+        changes = [
+            (self.S, -infect, infect),
+            (self.I, infect - recover, infect + recover),
+        ]
+        tau = math.inf
+        for x, mean, var in changes:
+            bound = max(self.epsilon * x / 2, 1)
+            if mean != 0:
+                tau = min(tau, bound / abs(mean))
+            if var != 0:
+                tau = min(tau, bound * bound / var)
+        return tau
+
+    def _tau_leap(self, t_end):
+        """
+        Adaptive tau-leaping until `t_end`. Falls back to exact steps when a leap
+        would only cover a handful of events
+        :return: None
+        """
+        while self.time < t_end:
+            infect, recover = self.rates()
+            total = infect + recover
+            if total == 0:
+                self.time = t_end
+                return
+            tau = min(self._leap_size(infect, recover), t_end - self.time)
+            if tau * total < 10:
+                self._ssa(t_end, max_events=100)
+                continue
+            # A leap that would make a compartment negative is retried at half the size
+            while True:
+                num_infect = self.rng.poisson(infect * tau)
+                num_recover = self.rng.poisson(recover * tau)
+                if num_infect <= self.S and num_recover <= self.I:
+                    break
+                tau /= 2
+            self.S -= num_infect
+            self.I += num_infect - num_recover
+            self.R += num_recover
+            self.time += tau
+            self.leaps += 1
+
+    def step(self):
+        """
+        Simulate one day
+        :return: None
+        """
+        t_end = self.days_passed + 1
+        if self.method == "ssa":
+            self._ssa(t_end)
+        else:
+            self._tau_leap(t_end)
+        self.time = t_end
+        self.days_passed += 1
+
+    def step_t_days(self, days):
+        """
+        Simulate infections for `days`
+        :param days: Number of days to step
+        :return: `days` by `4` numpy array, with the same columns as
+        `DiscreteAgentModel.step_t_days`
+        """
+        result = np.zeros((days, 4), dtype=np.int64)
+        result[0] = self.summarize_model()
+        for ii in np.arange(1, days):
+            self.step()
+            result[ii] = self.summarize_model()
+        return result
+
+    def summarize_model(self):
+        """
+        Summarize the current state of the `GillespieModel` object
+        :return: A tuple summarizing the state of the model
+        """
+        return self.days_passed, self.S, self.I, self.R
+
+
+class ChainBinomialModel(StreamingMixin):
+    def __init__(
+        self,
+        b,
+        k,
+        size,
+        prob_infect=None,
+        initial_infect=None,
+        replicates=None,
+        rng=None,
+    ):
+        """
+        Initialize a `ChainBinomialModel` class: a discrete-time model which draws the
+        number of recoveries and infections each day from binomial distributions, whose
+        means match the daily rules of `DiscreteAgentModel`. The parameters may be
+        scalars or numpy arrays, which are broadcast together to run many parameter
+        sets at once
+        :param b: number of interactions per day, per agent, which could result in infection
+        :param k: proportion of infected who recover/removed each day
+        :param size: number of agents
+        :param prob_infect: (optional) probability that an interaction between a susceptible
+        agent and an infected agent results in the susceptible agent's infection
+        :param initial_infect: (optional) if supplied, start with `initial_infect` agents already infected
+        :param replicates: (optional) if supplied, run `replicates` independent copies of
+        every parameter set; they are indexed by a new first axis
+        :param rng: (optional) `numpy.random.Generator`, or seed for one, used for all of
+        the model's randomness
+        :return: None
+        """
+        self.b, self.k, self.size = np.asarray(b), np.asarray(k), np.asarray(size)
+        self.prob_infect = np.asarray(1 if prob_infect is None else prob_infect)
+        self.initial_infect = initial_infect
+        self.replicates = replicates
+        self.rng = np.random.default_rng(rng)
+        shape = np.broadcast_shapes(
+            self.b.shape,
+            self.k.shape,
+            self.size.shape,
+            self.prob_infect.shape,
+            np.shape(initial_infect),
+        )
+        self.shape = shape if replicates is None else (replicates,) + shape
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the model to its initial state
+        :return: None
+        """
+        initial_infect = 0 if self.initial_infect is None else self.initial_infect
+        self.I = np.broadcast_to(initial_infect, self.shape).astype(np.int64)
+        self.S = np.broadcast_to(self.size, self.shape) - self.I
+        self.R = np.zeros(self.shape, dtype=np.int64)
+        self.days_passed = 0
+
+    def step(self):
+        """
+        Simulate one day
+        :return: None
+        """
+        # `DiscreteAgentModel` recovers ceil(k * I) of the infected; recovering each
+        # infected agent with probability ceil(k * I) / I has the same mean
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p_recover = np.where(
+                self.I > 0, np.minimum(np.ceil(self.k * self.I) / self.I, 1), 0
+            )
+        num_recover = self.rng.binomial(self.I, p_recover)
+        self.I = self.I - num_recover
+        self.R = self.R + num_recover
+
+        # Each remaining infected agent meets a given susceptible agent with
+        # probability b / size, and infects them with probability `prob_infect`
+        p_escape = 1 - np.minimum(self.b / self.size, 1) * self.prob_infect
+        num_infect = self.rng.binomial(self.S, 1 - np.power(p_escape, self.I))
+        self.S = self.S - num_infect
+        self.I = self.I + num_infect
+        self.days_passed += 1
+
+    def step_t_days(self, days):
+        """
+        Simulate infections for `days`
+        :param days: Number of days to step
+        :return: `days` by `4` numpy array, with the same columns as
+        `DiscreteAgentModel.step_t_days`; with array parameters or replicates, the
+        array has shape `self.shape + (days, 4)`
+        """
+        result = np.zeros(self.shape + (days, 4), dtype=np.int64)
+        result[..., 0, :] = self.summarize_model()
+        for ii in np.arange(1, days):
+            self.step()
+            result[..., ii, :] = self.summarize_model()
+        return result
+
+    def summarize_model(self):
+        """
+        Summarize the current state of the `ChainBinomialModel` object
+        :return: numpy array of shape `self.shape + (4,)`, with the number of days
+        passed and the number susceptible, infected and recovered
+        """
+        days = np.full(self.shape, self.days_passed)
+        return np.stack([days, self.S, self.I, self.R], axis=-1)
@@ -0,0 +1,122 @@
+"""
+Definition of the `CycleCache` class, which memoizes a deterministic process, such as
+the Life half of `ConwayModel`, once it falls into a cycle
+
+The last states whose successors were computed are kept, packed and keyed by a hash,
+along with those successors. Only pairs handed over by the caller are stored, so a state
+edited from outside between two steps is never taken for the successor of the state
+before it. When a known state comes back and its successors lead back to it, they form
+a cycle, and the process is served from that buffer instead of being recomputed, for
+as long as it stays on it
+"""
+
+import hashlib
+import numpy as np
+
+
+def _digest(state):
+    """
+    Hash of a packed state
+    """
+    return hashlib.blake2b(state.tobytes(), digest_size=16).digest()
+
+
+class CycleCache:
+    def __init__(self, max_period=64):
+        """
+        Initialize a `CycleCache`
+        :param max_period: longest cycle that can be detected; this many pairs of a
+        state and its successor are kept
+        :return: None
+        """
+        self.max_period = max_period
+        self.hits, self.misses = 0, 0
+        # Number of lookups before the cycle was found, and its length, once found
+        self.start, self.period = None, None
+        self._generation = 0
+        # Hash of a state -> (state, successor), oldest first
+        self._pairs = {}
+        self._pending = None
+        self._cycle, self._position = None, 0
+
+    def lookup(self, state):
+        """
+        The state following `state`, if it is known. On a miss, the caller is expected
+        to compute the next state itself and hand it to `store`
+        :param state: packed numpy array, e.g. the output of `numpy.packbits`
+        :return: packed numpy array, or None
+        """
+        generation = self._generation
+        self._generation += 1
+        self._pending = None
+        if self.max_period == 0:
+            self.misses += 1
+            return None
+        if self._cycle is not None:
+            if np.array_equal(state, self._cycle[self._position]):
+                self._position = (self._position + 1) % self.period
+                self.hits += 1
+                return self._cycle[self._position]
+            # The state was changed from outside, so the process left the cycle; the
+            # pairs kept are still right
+            self._cycle, self.start, self.period = None, None, None
+
+        digest = _digest(state)
+        pair = self._pairs.get(digest)
+        if pair is not None and np.array_equal(pair[0], state):
+            self.hits += 1
+            self._find_cycle(pair, generation)
+            return pair[1]
+
+        self.misses += 1
+        self._pending = (digest, np.array(state))
+        return None
+
+    def store(self, successor):
+        """
+        Remember `successor` as the state following the state of the last lookup, if
+        that lookup missed
+        :param successor: packed numpy array
+        :return: None
+        """
+        if self._pending is None:
+            return
+        digest, state = self._pending
+        self._pending = None
+        self._pairs[digest] = (state, np.array(successor))
+        if len(self._pairs) > self.max_period:
+            del self._pairs[next(iter(self._pairs))]
+
+    def _find_cycle(self, pair, generation):
+        """
+        Follow the known successors of the state of `pair`; if they lead back to it,
+        serve the process from the states on the way
+        """
+        state, current = pair
+        cycle = [state]
+        for _ in range(self.max_period):
+            if np.array_equal(current, state):
+                self._cycle = cycle
+                self.start, self.period = generation, len(cycle)
+                self._position = 1 % self.period
+                return
+            pair = self._pairs.get(_digest(current))
+            if pair is None or not np.array_equal(pair[0], current):
+                return
+            cycle.append(current)
+            current = pair[1]
+
+    def stats(self):
+        """
+        Summary of the cache's use
+        :return: dict with the number of hits and misses, the share of lookups that
+        hit, and the start and period of the cycle (None before one is found)
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "start": self.start,
+            "period": self.period,
+        }
@@ -0,0 +1,164 @@
+"""
+Definition of the `EventLog` class: a compact record of every change of status in a
+run, from which the status of every agent on any day can be rebuilt
+"""
+
+import numpy as np
+
+try:
+    from agent import SUSCEPTIBLE, INFECTED, RECOVERED
+except ImportError:  # imported as part of the `sir` package
+    from .agent import SUSCEPTIBLE, INFECTED, RECOVERED
+
+# Infector recorded when it is unknown, e.g. for exogenous infections and recoveries
+UNKNOWN = -1
+
+
+class EventLog:
+    def __init__(self, initial_status, start_day=0):
+        """
+        Initialize an `EventLog`. Each agent changes status at most twice in an SIR
+        run, so the log takes O(number of agents) memory, however long the run
+        :param initial_status: numpy array with the status code of every agent on
+        `start_day` (see `SmartAgentModel2D.status_codes`)
+        :param start_day: (optional) the day the log starts on
+        :return: None
+        """
+        self.initial_status = np.array(initial_status, dtype=np.uint8)
+        self.size = len(self.initial_status)
+        self.start_day = start_day
+        self.id_dtype = np.int32 if self.size <= np.iinfo(np.int32).max else np.int64
+        self._pending = []
+        self._arrays = {
+            "day": np.zeros(0, dtype=np.int32),
+            "agent": np.zeros(0, dtype=self.id_dtype),
+            "state": np.zeros(0, dtype=np.uint8),
+            "infector": np.zeros(0, dtype=self.id_dtype),
+        }
+
+    def __len__(self):
+        return len(self.day)
+
+    def record(self, day, agents, state, infectors=None):
+        """
+        Record that `agents` moved to `state` on `day`. Events must be recorded in the
+        order they happen
+        :param day: day number
+        :param agents: numpy array of agent ids
+        :param state: the new status code of all of `agents`
+        :param infectors: (optional) numpy array with the id of the agent who infected
+        each of `agents`
+        :return: None
+        """
+        agents = np.asarray(agents, dtype=self.id_dtype)
+        if infectors is None:
+            infectors = np.full(len(agents), UNKNOWN, dtype=self.id_dtype)
+        self._pending.append(
+            (
+                np.full(len(agents), day, dtype=np.int32),
+                agents,
+                np.full(len(agents), state, dtype=np.uint8),
+                np.asarray(infectors, dtype=self.id_dtype),
+            )
+        )
+
+    def _consolidate(self):
+        """
+        Append the pending batches to the event arrays
+        :return: None
+        """
+        if self._pending:
+            for name, parts in zip(
+                ("day", "agent", "state", "infector"), zip(*self._pending)
+            ):
+                self._arrays[name] = np.concatenate([self._arrays[name], *parts])
+            self._pending = []
+
+    @property
+    def day(self):
+        self._consolidate()
+        return self._arrays["day"]
+
+    @property
+    def agent(self):
+        self._consolidate()
+        return self._arrays["agent"]
+
+    @property
+    def state(self):
+        self._consolidate()
+        return self._arrays["state"]
+
+    @property
+    def infector(self):
+        self._consolidate()
+        return self._arrays["infector"]
+
+    def status_on(self, day):
+        """
+        Rebuild the status of every agent at the end of `day`
+        :return: uint8 numpy array of status codes
+        """
+        status = self.initial_status.copy()
+        upto = np.flatnonzero(self.day <= day)
+        # The latest event of each agent wins
+        agents = self.agent[upto][::-1]
+        _, last = np.unique(agents, return_index=True)
+        status[agents[last]] = self.state[upto][::-1][last]
+        return status
+
+    def counts(self, days=None):
+        """
+        Number susceptible, infected and recovered at the end of every day
+        :param days: (optional) number of days, counting from `start_day`; defaults to
+        the last day with an event
+        :return: `days` by `4` numpy array, with the same columns as `step_t_days`
+        """
+        if days is None:
+            days = (int(self.day.max()) if len(self) else self.start_day) + 1
+            days -= self.start_day
+        # Each event moves an agent out of its previous state: the initial one for the
+        # agent's first event, or else the state of its previous event
+        order = np.lexsort((np.arange(len(self)), self.agent))
+        agents, states = self.agent[order], self.state[order]
+        previous = self.initial_status[agents]
+        repeat = np.zeros(len(agents), dtype=bool)
+        repeat[1:] = agents[1:] == agents[:-1]
+        previous[1:][repeat[1:]] = states[:-1][repeat[1:]]
+
+        offsets = self.day[order] - self.start_day
+        keep = offsets < days
+        change = np.zeros((days, 3), dtype=np.int64)
+        np.subtract.at(change, (offsets[keep], previous[keep]), 1)
+        np.add.at(change, (offsets[keep], states[keep]), 1)
+        change[0] += np.bincount(self.initial_status, minlength=3)[:3]
+
+        result = np.zeros((days, 4), dtype=np.int64)
+        result[:, 0] = np.arange(self.start_day, self.start_day + days)
+        result[:, 1:] = np.cumsum(change, axis=0)
+        return result
+
+    def save(self, path):
+        """
+        Save the log to the `.npz` file `path`
+        :return: None
+        """
+        self._consolidate()
+        np.savez_compressed(
+            path,
+            initial_status=self.initial_status,
+            start_day=self.start_day,
+            **self._arrays
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a log saved by `save`
+        :return: `EventLog`
+        """
+        with np.load(path) as data:
+            log = cls(data["initial_status"], int(data["start_day"]))
+            for name in log._arrays:
+                log._arrays[name] = data[name].astype(log._arrays[name].dtype)
+        return log
@@ -0,0 +1,116 @@
+"""
+Particle-mesh sums over disks: the weights of points are deposited onto a grid over the
+unit square, convolved with a disk by FFT, and read back at query points. This costs
+O(points + grid cells log grid cells), however many points each disk holds
+"""
+
+import math
+import numpy as np
+from scipy.signal import fftconvolve
+
+
+def bin_counts(positions, status, bins):
+    """
+    Count the agents of each status in every cell of a `bins` by `bins` grid of the unit
+    square, with a single `numpy.bincount`
+    :param positions: (number of agents) by 2 numpy array of positions in [0, 1]
+    :param status: numpy array of status codes (0, 1 or 2)
+    :param bins: number of cells along each side
+    :return: 3 by `bins` by `bins` numpy array; entry [s, y, x] counts the agents with
+    status `s` in row `y` and column `x`
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    cells = np.clip((positions * bins).astype(np.int64), 0, bins - 1)
+    flat = (np.asarray(status, dtype=np.int64) * bins + cells[:, 1]) * bins
+    flat += cells[:, 0]
+    return np.bincount(flat, minlength=3 * bins * bins).reshape(3, bins, bins)
+
+
+def disk_kernel(r, size, oversample=4):
+    """
+    Share of each grid cell, around a cell at the origin, that lies within `r` of it
+    :param r: radius of the disk
+    :param size: number of cells along each side of the unit square
+    :param oversample: number of sample points along each side of a cell
+    :return: square numpy array, centered on the origin cell
+    """
+    reach = math.ceil(r * size + 0.5)
+    offsets = np.arange(-reach, reach + 1)
+    sub = (np.arange(oversample) + 0.5) / oversample - 0.5
+    points = (offsets[:, None] + sub[None, :]).ravel() / size
+    inside = points[:, None] ** 2 + points[None, :] ** 2 <= r * r
+    share = inside.reshape(len(offsets), oversample, len(offsets), oversample)
+    return share.mean(axis=(1, 3))
+
+
+class DiskMesh:
+    """
+    Approximate sums over the points within `r` of query points, on a `size` by `size`
+    grid. Points are spread over the four nearest grid nodes (cloud-in-cell), and
+    queries read back from the same four nodes, so errors shrink as `size` grows
+    """
+
+    def __init__(self, r, size):
+        """
+        Initialize a `DiskMesh`
+        :param r: radius of the disks
+        :param size: number of grid cells along each side of the unit square
+        :return: None
+        """
+        self.r, self.size = r, size
+        self.kernel = disk_kernel(r, size)
+
+    def _stencil(self, positions):
+        """
+        Flat grid index of the lower left of the four nodes around each point, and the
+        point's weights on the four nodes. The grid has a border of one node, so that
+        points on the edge of the square have four nodes too
+        :return: numpy array of indices, and list of (index offset, weights) pairs
+        """
+        nodes = np.asarray(positions, dtype=np.float64) * self.size - 0.5
+        corner = np.clip(np.floor(nodes), -1, self.size - 1)
+        frac = nodes - corner
+        corner = corner.astype(np.int64) + 1
+        width = self.size + 2
+        index = corner[:, 1] * width + corner[:, 0]
+        fx, fy = frac[:, 0], frac[:, 1]
+        return index, [
+            (0, (1 - fx) * (1 - fy)),
+            (1, fx * (1 - fy)),
+            (width, (1 - fx) * fy),
+            (width + 1, fx * fy),
+        ]
+
+    def deposit(self, positions, weights=None):
+        """
+        Spread the `weights` of the points `positions` onto the grid
+        :param weights: (optional) numpy array of weights, by default all 1
+        :return: (size + 2) by (size + 2) numpy array, indexed [y, x]
+        """
+        weights = np.ones(len(positions)) if weights is None else weights
+        index, stencil = self._stencil(positions)
+        width = self.size + 2
+        grid = np.zeros(width * width)
+        for offset, share in stencil:
+            grid += np.bincount(index + offset, share * weights, minlength=width**2)
+        return grid.reshape(width, width)
+
+    def interpolate(self, grid, positions):
+        """
+        Read the values of `grid` at `positions`
+        :return: numpy array
+        """
+        index, stencil = self._stencil(positions)
+        grid = grid.ravel()
+        return sum(grid[index + offset] * share for offset, share in stencil)
+
+    def sums(self, positions, weights, queries):
+        """
+        Approximate sum of the `weights` of the points `positions` within `r` of each
+        of `queries`
+        :return: numpy array
+        """
+        if len(positions) == 0 or len(queries) == 0:
+            return np.zeros(len(queries))
+        field = fftconvolve(self.deposit(positions, weights), self.kernel, mode="same")
+        return self.interpolate(field, queries)
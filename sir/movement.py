@@ -0,0 +1,105 @@
+"""
+Vectorized movement kernels for agents living on the unit square
+"""
+
+import numpy as np
+
+BOUNDARIES = ("reject", "reflect", "clamp")
+
+
+def random_steps(rng, num, p):
+    """
+    Draw `num` random steps: each coordinate is uniform on (-p, p), as a random sign
+    times a uniform length
+    :return: `num` by 2 numpy array
+    """
+    signs = rng.choice([1, -1], size=(num, 2), replace=True)
+    return p * signs * rng.random((num, 2))
+
+
+def random_walk(rng, positions, p, boundary="reject"):
+    """
+    Move every agent in `positions` by one random step, see `random_steps`
+    :param rng: `numpy.random.Generator` to draw from
+    :param positions: (number of agents) by 2 numpy array of points in the unit square
+    :param p: the maximum movement distance along each axis
+    :param boundary: what to do with steps that leave the unit square
+      - "reject": draw a new step, until it lands inside. Only the rejected agents
+        are redrawn, all at once, each round
+      - "reflect": reflect the step off the edges
+      - "clamp": stop at the edge
+    :return: numpy array of the new positions
+    """
+    if boundary not in BOUNDARIES:
+        raise ValueError(
+            "boundary must be one of {}, not {}".format(BOUNDARIES, boundary)
+        )
+    positions = np.asarray(positions, dtype=np.float64)
+    new = positions + random_steps(rng, len(positions), p)
+    if boundary == "reject":
+        outside = np.flatnonzero(np.any((new < 0) | (new > 1), axis=1))
+        while len(outside):
+            new[outside] = positions[outside] + random_steps(rng, len(outside), p)
+            still = np.any((new[outside] < 0) | (new[outside] > 1), axis=1)
+            outside = outside[still]
+    elif boundary == "reflect":
+        # Fold the real line onto [0, 1]: a triangle wave of period 2
+        new = np.abs(new) % 2
+        new = np.where(new > 1, 2 - new, new)
+    else:
+        new = np.clip(new, 0, 1)
+    return new
+
+
+def flee(positions, threats, p):
+    """
+    Move each agent as far as possible from the centroid of its threats, with a step of
+    length at most `p` that stays inside the unit square. This maximizes the sum of
+    squared distances to the threats, the objective of `SmartAgent.move`. The farthest
+    point of a disk clipped to a box is either the far end of the diameter through the
+    centroid, a point where the circle crosses an edge of the box, or a corner of the
+    box; all of them are checked at once for every agent
+    :param positions: (number of agents) by 2 numpy array of starting points
+    :param threats: (number of agents) by 2 numpy array of threat centroids
+    :param p: the maximum step length
+    :return: numpy array of the new positions; agents sitting exactly on their
+    centroid have no preferred direction, and stay put
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+    threats = np.asarray(threats, dtype=np.float64).reshape(-1, 2)
+    tol = 1e-12
+    away = positions - threats
+    norm = np.linalg.norm(away, axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        far = positions + p * away / norm
+    candidates = [far]
+
+    # Where the circle of radius `p` crosses the lines x = 0, x = 1, y = 0 and y = 1
+    for axis in range(2):
+        other = 1 - axis
+        for edge in [0.0, 1.0]:
+            gap = edge - positions[:, axis]
+            with np.errstate(invalid="ignore"):
+                half = np.sqrt(p * p - gap * gap)
+            for sign in [1, -1]:
+                point = np.empty_like(positions)
+                point[:, axis] = edge
+                point[:, other] = positions[:, other] + sign * half
+                candidates.append(point)
+
+    for corner in [(0.0, 0.0), (0.0, 1.0), (1.0, 0.0), (1.0, 1.0)]:
+        point = np.broadcast_to(np.array(corner), positions.shape)
+        reach = np.linalg.norm(point - positions, axis=1, keepdims=True) <= p + tol
+        candidates.append(np.where(reach, point, np.nan))
+
+    candidates = np.stack(candidates, axis=1)
+    inside = np.all((candidates >= -tol) & (candidates <= 1 + tol), axis=2)
+    score = np.sum((candidates - threats[:, None, :]) ** 2, axis=2)
+    score = np.where(inside, score, -np.inf)
+    best = np.argmax(score, axis=1)
+    new = np.clip(candidates[np.arange(len(positions)), best], 0, 1)
+
+    # No feasible candidate (e.g. an agent outside the square), or no direction to flee
+    stay = ~np.isfinite(score.max(axis=1)) | (norm[:, 0] == 0)
+    new[stay] = np.clip(positions[stay], 0, 1)
+    return new
@@ -0,0 +1,395 @@
+"""
+Definition of the `NeighborGraph` class: the neighbors of a batch of points within some
+radius, stored in compressed sparse row (CSR) form so that per-agent counts and
+samples are array operations rather than Python loops. Also defines the spatial indexes
+which build them
+"""
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+
+class NeighborGraph:
+    """
+    Radius neighborhoods of `len(self)` query points. The neighbors of query `q` are
+    `indices[indptr[q]:indptr[q + 1]]`, at distances `distances[indptr[q]:indptr[q + 1]]`
+    """
+
+    def __init__(self, indptr, indices, distances):
+        """
+        Initialize a `NeighborGraph`
+        :param indptr: numpy array of row offsets, of length (number of queries + 1)
+        :param indices: numpy array of neighbor ids
+        :param distances: numpy array of neighbor distances, aligned with `indices`
+        :return: None
+        """
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.distances = np.asarray(distances, dtype=np.float64)
+
+    @classmethod
+    def from_balltree(cls, tree, queries, r):
+        """
+        Find the neighbors within `r` of every point in `queries` with a single call to
+        `BallTree.query_radius`
+        :param tree: `sklearn.neighbors.BallTree` of the candidate neighbors
+        :param queries: (number of queries) by 2 numpy array of points
+        :param r: radius
+        :return: `NeighborGraph`
+        """
+        if len(queries) == 0:
+            return cls(np.zeros(1), np.zeros(0), np.zeros(0))
+        indices, distances = tree.query_radius(queries, r=r, return_distance=True)
+        indptr = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in indices], out=indptr[1:])
+        return cls(indptr, np.concatenate(indices), np.concatenate(distances))
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def degree(self):
+        """
+        Number of neighbors of each query
+        """
+        return np.diff(self.indptr)
+
+    def rows(self):
+        """
+        The query that each entry of `self.indices` belongs to
+        """
+        return np.repeat(np.arange(len(self)), self.degree())
+
+    def neighbors(self, row):
+        """
+        Neighbor ids of query `row`
+        """
+        return self.indices[self.indptr[row] : self.indptr[row + 1]]
+
+    def take(self, rows):
+        """
+        Select the neighborhoods of the queries `rows`, in that order
+        :return: `NeighborGraph` with `len(rows)` queries
+        """
+        degree = self.degree()[rows]
+        indptr = np.zeros(len(degree) + 1, dtype=np.int64)
+        np.cumsum(degree, out=indptr[1:])
+        slots = np.arange(indptr[-1]) + np.repeat(
+            self.indptr[rows] - indptr[:-1], degree
+        )
+        return NeighborGraph(indptr, self.indices[slots], self.distances[slots])
+
+    def filter(self, keep):
+        """
+        Keep only the entries where the boolean array `keep` is True
+        :return: `NeighborGraph` with the same queries
+        """
+        indptr = np.zeros_like(self.indptr)
+        np.cumsum(np.bincount(self.rows()[keep], minlength=len(self)), out=indptr[1:])
+        return NeighborGraph(indptr, self.indices[keep], self.distances[keep])
+
+    def within(self, r):
+        """
+        Restrict every neighborhood to the neighbors at distance at most `r`
+        :return: `NeighborGraph`
+        """
+        return self.filter(self.distances <= r)
+
+    def without(self, ids):
+        """
+        Remove each query's own id from its neighborhood
+        :param ids: numpy array with the id of each query point
+        :return: `NeighborGraph`
+        """
+        return self.filter(self.indices != np.repeat(ids, self.degree()))
+
+    def count(self, mask):
+        """
+        Count the neighbors of each query which are flagged in `mask`
+        :param mask: boolean numpy array, indexed by neighbor id
+        :return: numpy array of counts, one per query
+        """
+        rows = self.rows()[mask[self.indices]]
+        return np.bincount(rows, minlength=len(self)).astype(np.int64)
+
+    def sample(self, rng, prob):
+        """
+        Pick `ceil(prob * degree)` distinct neighbors of each query at random
+        :param rng: `numpy.random.Generator` to draw from
+        :param prob: proportion of each neighborhood to pick
+        :return: numpy arrays of the query and the id of each pick
+        """
+        rows = self.rows()
+        num = np.ceil(self.degree() * prob).astype(np.int64)
+        # Shuffle each neighborhood (`rows` is sorted); the offset stays below 1 so that
+        # rounding can never move an entry into the next row
+        order = np.argsort(rows + 0.5 * rng.random(len(rows)), kind="stable")
+        keep = np.arange(len(rows)) - self.indptr[rows] < num[rows]
+        return rows[keep], self.indices[order][keep]
+
+
+class BallTreeIndex:
+    """
+    Spatial index backed by `sklearn.neighbors.BallTree`
+    """
+
+    def __init__(self, points, cell_size=None):
+        """
+        Initialize a `BallTreeIndex` over `points`; `cell_size` is unused
+        """
+        self.tree = BallTree(points)
+
+    def query(self, queries, r):
+        """
+        Find the indexed points within `r` of every point in `queries`
+        :return: `NeighborGraph`
+        """
+        return NeighborGraph.from_balltree(self.tree, queries, r)
+
+
+class CellListIndex:
+    """
+    Spatial index which bins the points into a uniform grid of square cells. A radius
+    query only looks at the cells within `r` of the query's own cell, so with cells about
+    as large as the radius every query checks a 3 by 3 block. Queries are vectorized
+    across all the query points
+    """
+
+    def __init__(self, points, cell_size):
+        """
+        Initialize a `CellListIndex` over `points`
+        :param points: (number of points) by 2 numpy array
+        :param cell_size: side length of the cells; best set to the largest query radius.
+        It is increased if the grid would have many more cells than points
+        :return: None
+        """
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.lower = self.points.min(axis=0) if len(self.points) else np.zeros(2)
+        extent = np.max(self.points.max(axis=0) - self.lower) if len(points) else 0
+        self.cell_size = max(cell_size, extent / (2 * np.sqrt(len(points)) + 1), 1e-12)
+        self.shape = (int(extent / self.cell_size) + 1,) * 2
+        cells = self.cell_of(self.points)
+        # Sort the points by cell; the points of cell c are `order[start[c]:start[c + 1]]`.
+        # Cells are numbered row by row, so consecutive cells of a row are contiguous
+        self.order = np.argsort(cells, kind="stable")
+        self.start = np.zeros(self.shape[0] * self.shape[1] + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(cells, minlength=self.shape[0] * self.shape[1]),
+            out=self.start[1:],
+        )
+        self.sorted_x = self.points[self.order, 0]
+        self.sorted_y = self.points[self.order, 1]
+
+    def cell_coords(self, points):
+        """
+        Row and column of the cell containing each point (clipped onto the grid)
+        """
+        coords = np.floor((points - self.lower) / self.cell_size).astype(np.int64)
+        return np.clip(coords, 0, self.shape[0] - 1)
+
+    def cell_of(self, points):
+        """
+        Flat index of the cell containing each point
+        """
+        coords = self.cell_coords(points)
+        return coords[:, 0] * self.shape[1] + coords[:, 1]
+
+    def query(self, queries, r, block_size=2**16):
+        """
+        Find the indexed points within `r` of every point in `queries`. The queries are
+        handled in blocks of `block_size`, in cell order, to bound memory use and keep
+        nearby queries together
+        :return: `NeighborGraph`
+        """
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 2)
+        order = np.argsort(self.cell_of(queries), kind="stable")
+        blocks = [
+            self._query_block(queries, order[ii : ii + block_size], r)
+            for ii in range(0, len(queries), block_size)
+        ]
+        if not blocks:
+            return NeighborGraph(np.zeros(1), np.zeros(0), np.zeros(0))
+        rows, ranks, ids, distances = (np.concatenate(parts) for parts in zip(*blocks))
+        # Scatter the entries into CSR order of the original queries
+        indptr = np.zeros(len(queries) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(queries)), out=indptr[1:])
+        dest = indptr[rows] + ranks
+        indices = np.empty(len(ids), dtype=np.int64)
+        indices[dest] = ids
+        dists = np.empty(len(ids), dtype=np.float64)
+        dists[dest] = distances
+        return NeighborGraph(indptr, indices, dists)
+
+    def _query_block(self, queries, block, r):
+        """
+        Radius query for the queries `block`
+        :return: numpy arrays of the query, the rank of the entry within that query's
+        neighborhood, the neighbor id and the distance of each entry
+        """
+        rings = int(np.ceil(r / self.cell_size))
+        coords = self.cell_coords(queries[block])
+        # The nearby cells in one row of the grid are a single range of sorted points
+        col_lo = np.clip(coords[:, 1] - rings, 0, None)
+        col_hi = np.clip(coords[:, 1] + rings, None, self.shape[1] - 1)
+        grid_rows = coords[:, 0, None] + np.arange(-rings, rings + 1)
+        valid = (grid_rows >= 0) & (grid_rows < self.shape[0])
+        grid_rows = np.clip(grid_rows, 0, self.shape[0] - 1) * self.shape[1]
+        first = self.start[grid_rows + col_lo[:, None]]
+        num = np.where(valid, self.start[grid_rows + col_hi[:, None] + 1] - first, 0)
+
+        # Expand each (query, grid row) range into its candidate points
+        num, first = num.ravel(), first.ravel()
+        local = np.repeat(np.arange(len(block)), 2 * rings + 1)
+        local = np.repeat(local, num)
+        ends = np.cumsum(num)
+        slots = np.arange(ends[-1]) + np.repeat(first - (ends - num), num)
+
+        dx = self.sorted_x[slots] - queries[block, 0][local]
+        dy = self.sorted_y[slots] - queries[block, 1][local]
+        dist2 = dx * dx + dy * dy
+        keep = dist2 <= r * r
+        local, slots, dist2 = local[keep], slots[keep], dist2[keep]
+        # Entries of a query are contiguous, so its rank is the offset from its first
+        start = np.zeros(len(block), dtype=np.int64)
+        np.cumsum(np.bincount(local, minlength=len(block))[:-1], out=start[1:])
+        ranks = np.arange(len(local)) - start[local]
+        return block[local], ranks, self.order[slots], np.sqrt(dist2)
+
+
+class VerletList:
+    """
+    Verlet neighbor list: the neighborhoods of every point are found once with an
+    extra `skin` added to the radius, and later queries only recompute the distances
+    of those candidate pairs. While no point has moved more than `skin / 2` since the
+    list was built, no pair can have come within the radius unnoticed, so the list is
+    only rebuilt after that
+    """
+
+    def __init__(self, spatial_index, cell_size, radius, skin):
+        """
+        Initialize a `VerletList`
+        :param spatial_index: name of the spatial index used to build the list
+        :param cell_size: cell size for grid-based indexes
+        :param radius: the largest radius that will be queried
+        :param skin: extra distance added to `radius` when building the list
+        :return: None
+        """
+        check_index_name(spatial_index)
+        self.spatial_index = spatial_index
+        self.cell_size = cell_size
+        self.radius = radius
+        self.skin = skin
+        self.reference = None
+        self.builds = 0
+
+    def needs_rebuild(self, points, r):
+        """
+        Whether the list can no longer answer a query of radius `r` at `points`
+        """
+        if self.reference is None or r > self.radius:
+            return True
+        if len(points) != len(self.reference):
+            return True
+        moved = np.max(np.sum((points - self.reference) ** 2, axis=1), initial=0)
+        return moved > (self.skin / 2) ** 2
+
+    def build(self, points):
+        """
+        Build the list for `points`. The points are relabeled in cell order, so that the
+        pairs of the list, and the positions they read, are close together in memory
+        :return: None
+        """
+        self.reference = points.copy()
+        size = self.cell_size + self.skin
+        cells = np.floor((points - points.min(axis=0, initial=0)) / size)
+        self.perm = np.lexsort((cells[:, 1], cells[:, 0]))
+        self.inverse = np.empty(len(points), dtype=np.int64)
+        self.inverse[self.perm] = np.arange(len(points))
+        ordered = points[self.perm]
+        graph = make_index(self.spatial_index, ordered, size).query(
+            ordered, self.radius + self.skin
+        )
+        dtype = np.int32 if len(points) <= np.iinfo(np.int32).max else np.int64
+        self.indptr = graph.indptr
+        self.cols = graph.indices.astype(dtype)
+        self.entry_rows = graph.rows().astype(dtype)
+        self.builds += 1
+
+    def query(self, points, r, rows=None):
+        """
+        Find the points within `r` of each of `points[rows]`
+        :param points: (number of points) by 2 numpy array of the current positions
+        :param r: radius
+        :param rows: (optional) indices of the query points; defaults to every point
+        :return: `NeighborGraph`
+        """
+        if self.needs_rebuild(points, r):
+            self.radius = max(self.radius, r)
+            self.build(points)
+        x, y = points[self.perm, 0], points[self.perm, 1]
+
+        if rows is None:
+            # Refine every pair in place, in relabeled order
+            entry_rows, cols = self.entry_rows, self.cols
+        else:
+            # Gather the pairs of the query points, in the order of `rows`
+            local = self.inverse[np.asarray(rows, dtype=np.int64)]
+            degree = self.indptr[local + 1] - self.indptr[local]
+            offsets = np.cumsum(degree) - degree
+            slots = np.arange(degree.sum()) + np.repeat(
+                self.indptr[local] - offsets, degree
+            )
+            entry_rows, cols = np.repeat(local, degree), self.cols[slots]
+
+        dx = x[entry_rows] - x[cols]
+        dy = y[entry_rows] - y[cols]
+        dist2 = dx * dx + dy * dy
+        keep = dist2 <= r * r
+        entry_rows, cols, dist2 = entry_rows[keep], cols[keep], dist2[keep]
+
+        if rows is None:
+            # Entries are grouped by relabeled row; scatter them into the rows' original
+            # order
+            counts = np.bincount(entry_rows, minlength=len(points))
+            start = np.cumsum(counts) - counts
+            ranks = np.arange(len(entry_rows)) - start[entry_rows]
+            indptr = np.zeros(len(points) + 1, dtype=np.int64)
+            np.cumsum(counts[self.inverse], out=indptr[1:])
+            dest = indptr[self.perm[entry_rows]] + ranks
+            indices = np.empty(len(cols), dtype=np.int64)
+            indices[dest] = self.perm[cols]
+            distances = np.empty(len(cols), dtype=np.float64)
+            distances[dest] = np.sqrt(dist2)
+            return NeighborGraph(indptr, indices, distances)
+
+        kept = np.zeros(len(keep) + 1, dtype=np.int64)
+        np.cumsum(keep, out=kept[1:])
+        indptr = kept[np.concatenate([[0], np.cumsum(degree)])]
+        return NeighborGraph(indptr, self.perm[cols], np.sqrt(dist2))
+
+
+# Spatial index backends, by name
+SPATIAL_INDEXES = {"balltree": BallTreeIndex, "cells": CellListIndex}
+
+
+def check_index_name(name):
+    """
+    Raise a `ValueError` unless `name` is a key of `SPATIAL_INDEXES`
+    """
+    if name not in SPATIAL_INDEXES:
+        raise ValueError(
+            "spatial_index must be one of {}, not {}".format(
+                sorted(SPATIAL_INDEXES), name
+            )
+        )
+
+
+def make_index(name, points, cell_size):
+    """
+    Build the spatial index called `name` over `points`
+    :param name: a key of `SPATIAL_INDEXES`
+    :param points: (number of points) by 2 numpy array
+    :param cell_size: cell size for grid-based indexes
+    :return: spatial index, with a `query(queries, r)` method returning a `NeighborGraph`
+    """
+    check_index_name(name)
+    return SPATIAL_INDEXES[name](points, cell_size)
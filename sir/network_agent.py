@@ -0,0 +1,111 @@
+"""
+Definition of the `NetworkAgentModel` class: an agent model whose contacts follow a
+fixed contact network, stored as a sparse adjacency matrix
+"""
+
+import math
+import numpy as np
+import networkx as nx
+from scipy import sparse as sp
+
+try:
+    from agent import ArrayAgentModel, SUSCEPTIBLE
+except ImportError:  # imported as part of the `sir` package
+    from .agent import ArrayAgentModel, SUSCEPTIBLE
+
+
+def adjacency_from_edges(u, v, size=None):
+    """
+    Build a symmetric CSR adjacency matrix from the edges `(u[e], v[e])`. Duplicate
+    edges and self loops are dropped
+    :param u: numpy array of node indices
+    :param v: numpy array of node indices
+    :param size: (optional) number of nodes; defaults to one more than the largest index
+    :return: `size` by `size` `scipy.sparse.csr_matrix` of 0s and 1s
+    """
+    u, v = np.asarray(u, dtype=np.int64), np.asarray(v, dtype=np.int64)
+    if size is None:
+        size = int(max(u.max(initial=-1), v.max(initial=-1))) + 1
+    keep = u != v
+    rows = np.concatenate([u[keep], v[keep]])
+    cols = np.concatenate([v[keep], u[keep]])
+    adjacency = sp.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(size, size)
+    )
+    adjacency.data[:] = 1
+    return adjacency
+
+
+class NetworkAgentModel(ArrayAgentModel):
+    def __init__(self, adjacency, k, prob_infect=None, initial_infect=None, rng=None):
+        """
+        Initialize a `NetworkAgentModel` class. Agents only interact with their
+        neighbors on a contact network, once per day. Agent states are stored as in
+        `ArrayAgentModel`
+        :param adjacency: `size` by `size` scipy sparse matrix; entry (i, j) is the number
+        of daily contacts between agents i and j (usually 0 or 1)
+        :param k: proportion of infected who recover/removed each day
+        :param prob_infect: (optional) probability that an interaction between a susceptible
+        agent and an infected agent results in the susceptible agent's infection
+        :param initial_infect: (optional) if supplied, start with `initial_infect` agents already infected
+        :param rng: (optional) `numpy.random.Generator`, or seed for one, used for all of
+        the model's randomness
+        :return: None
+        """
+        self.adjacency = sp.csr_matrix(adjacency, dtype=np.float32)
+        if self.adjacency.shape[0] != self.adjacency.shape[1]:
+            raise ValueError("`adjacency` must be a square matrix")
+        size = self.adjacency.shape[0]
+        super().__init__(None, k, size, prob_infect, initial_infect, rng)
+
+    @classmethod
+    def from_networkx(cls, graph, k, prob_infect=None, initial_infect=None, rng=None):
+        """
+        Build a `NetworkAgentModel` on a networkx graph, e.g. one made by
+        `networkx.watts_strogatz_graph`. Agent `i` is the `i`th node of `graph`
+        :return: `NetworkAgentModel`
+        """
+        if hasattr(nx, "to_scipy_sparse_array"):
+            adjacency = nx.to_scipy_sparse_array(graph, format="csr")
+        else:
+            adjacency = nx.to_scipy_sparse_matrix(graph, format="csr")
+        return cls(adjacency, k, prob_infect, initial_infect, rng)
+
+    @classmethod
+    def from_edgelist(
+        cls, path, k, prob_infect=None, initial_infect=None, rng=None, size=None
+    ):
+        """
+        Build a `NetworkAgentModel` from a text file with one edge per line, given as
+        two whitespace-separated node indices. Lines starting with `#` are ignored
+        :param size: (optional) number of agents; defaults to one more than the
+        largest index in the file
+        :return: `NetworkAgentModel`
+        """
+        edges = np.loadtxt(path, dtype=np.int64, usecols=(0, 1), ndmin=2)
+        adjacency = adjacency_from_edges(edges[:, 0], edges[:, 1], size)
+        return cls(adjacency, k, prob_infect, initial_infect, rng)
+
+    def step(self):
+        """
+        Simulate one day. Every infected agent interacts with each of their neighbors,
+        so a susceptible agent with `m` infected contacts is infected with probability
+        `1 - (1 - prob_infect) ** m`
+        :return: None
+        """
+        # Recover k proportion of the infected
+        num_recover = math.ceil(len(self.infected) * self.k)
+        ids_recover = self.rng.choice(
+            self.infected.to_array(), size=num_recover, replace=False
+        )
+        self._recover_many(ids_recover)
+
+        # Count the infected contacts of every agent with one sparse product
+        infected = np.zeros(self.size, dtype=np.float32)
+        infected[self.infected.to_array()] = 1
+        contacts = self.adjacency @ infected
+        at_risk = np.flatnonzero((contacts > 0) & (self.status == SUSCEPTIBLE))
+        p_infect = 1 - np.power(1 - self.prob_infect, contacts[at_risk])
+        self._infect_many(at_risk[self.rng.random(len(at_risk)) < p_infect])
+
+        self.days_passed += 1
@@ -111,9 +111,11 @@ class SpatialSirOde(OdeSir):
     The SIR method solved with ODEs including spatial components.
     """
 
-    def __init__(self, i0, N, b, k, p, M=200, position=None):
+    def __init__(self, i0, N, b, k, p, M=200, position=None, rng=None):
         """
         Initialize the class.
+        :param rng: (optional) `numpy.random.Generator`, or seed for one, used to place
+        the initial infections at random
         """
         super(SpatialSirOde, self).__init__(i0, N, b, k)
         self.i0_1 = i0
@@ -124,7 +126,7 @@ class SpatialSirOde(OdeSir):
         self.i0 = np.zeros((self.M, self.M))
         self.s0 = np.ones((self.M, self.M))
         if position == None:
-            self.ind_i = np.random.choice(self.M ** 2, self.n)
+            self.ind_i = np.random.default_rng(rng).choice(self.M ** 2, self.n)
             self.i0 = np.ravel(self.i0)
             self.s0 = np.ravel(self.s0)
             for ind in self.ind_i:
@@ -173,6 +175,23 @@ class SpatialSirOde(OdeSir):
             [-self.b * y[0] * y[2] + self.p * self.weight * self.diffusion[0], self.k * y[2] + self.p * self.weight * self.diffusion[1],
                 self.b * y[0] * y[2] - self.k * y[2] + self.p * self.weight * self.diffusion[2]])
 
+    @classmethod
+    def from_grid(cls, grid, N, b, k, p):
+        """
+        Start from the shares of susceptible, infected and recovered in each cell of
+        `grid`, e.g. the output of `SmartAgentModel2D.to_grid`, rather than from
+        infections placed at random. `grid` is a 3 by M by M array.
+        """
+        s0, i0, r0 = (np.array(share, dtype=float) for share in grid)
+        model = cls(float(np.mean(i0)), N, b, k, p, M=len(s0))
+        model.s0, model.i0, model.r0 = s0, i0, r0
+        model.s, model.i, model.r = s0, i0, r0
+        model.start = np.array([s0, r0, i0])
+        model.diffusion_s = np.ones((model.M, model.M)) * np.mean(s0)
+        model.diffusion_i = np.ones((model.M, model.M)) * np.mean(i0)
+        model.diffusion_r = np.ones((model.M, model.M)) * np.mean(r0)
+        return model
+
     def _infect(self, t):
         """
         Solves system to simulate infection.
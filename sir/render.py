@@ -0,0 +1,133 @@
+"""
+Fast snapshot figures of spatial models: agents are binned into one density raster per
+status, which are composited into a single image, instead of drawing one marker per agent
+"""
+
+import numpy as np
+from matplotlib import colors as mcolors
+from matplotlib import patches as mpatches
+from matplotlib import pyplot as plt
+
+try:
+    from mesh import bin_counts
+except ImportError:  # imported as part of the `sir` package
+    from .mesh import bin_counts
+
+# Colors of susceptible, infected and recovered agents
+STATUS_COLORS = ("blue", "red", "green")
+STATUS_LABELS = ("susceptible", "infected", "recovered")
+
+
+def density(positions, status, bins=256):
+    """
+    Count the agents of each status in every pixel of a `bins` by `bins` raster of the
+    unit square, see `mesh.bin_counts`
+    :param positions: (number of agents) by 2 numpy array of positions in [0, 1]
+    :param status: numpy array of status codes (0, 1 or 2)
+    :param bins: number of pixels along each side
+    :return: 3 by `bins` by `bins` numpy array; entry [s, y, x] counts the agents with
+    status `s` in row `y` and column `x`
+    """
+    return bin_counts(positions, status, bins)
+
+
+def composite(rasters, colors=STATUS_COLORS, alpha=0.5, background="white"):
+    """
+    Blend the density rasters of `density` into an RGB image. Each pixel takes the mean
+    color of its agents, and is as opaque as that many markers of opacity `alpha`
+    drawn on top of each other
+    :param rasters: output of `density`
+    :param colors: (optional) matplotlib color of each status
+    :param alpha: (optional) opacity of a single agent
+    :param background: (optional) matplotlib color of empty pixels
+    :return: `bins` by `bins` by 3 numpy array, in [0, 1]
+    """
+    rgb = np.array([mcolors.to_rgb(color) for color in colors])
+    counts = np.asarray(rasters, dtype=np.float64)
+    total = counts.sum(axis=0)
+    mix = np.einsum("syx,sc->yxc", counts, rgb)
+    mix /= np.maximum(total, 1)[..., None]
+    opacity = (1 - (1 - alpha) ** total)[..., None]
+    return mix * opacity + np.array(mcolors.to_rgb(background)) * (1 - opacity)
+
+
+def draw(
+    ax, positions, status, mode="raster", bins=256, colors=STATUS_COLORS, alpha=0.5
+):
+    """
+    Draw the agents on the axes `ax`
+    :param ax: matplotlib `Axes`
+    :param positions: (number of agents) by 2 numpy array of positions in [0, 1]
+    :param status: numpy array of status codes
+    :param mode: (optional) "raster" (one image, see `composite`) or "scatter" (one
+    batched scatter of every agent; matplotlib still draws every marker, so this suits
+    up to about 10^5 agents)
+    :param bins: (optional) number of pixels along each side, for "raster"
+    :param colors: (optional) matplotlib color of each status
+    :param alpha: (optional) opacity of a single agent
+    :return: the matplotlib artist drawn
+    """
+    if mode == "raster":
+        image = composite(density(positions, status, bins), colors, alpha)
+        return ax.imshow(
+            image, origin="lower", extent=(0, 1, 0, 1), interpolation="nearest"
+        )
+    if mode == "scatter":
+        positions = np.asarray(positions)
+        rgb = np.array([mcolors.to_rgb(color) for color in colors])
+        return ax.scatter(
+            positions[:, 0],
+            positions[:, 1],
+            c=rgb[np.asarray(status, dtype=np.int64)],
+            alpha=alpha,
+            edgecolors="none",
+            rasterized=True,
+        )
+    raise ValueError("mode must be 'raster' or 'scatter', not {}".format(mode))
+
+
+def legend_handles(colors=STATUS_COLORS):
+    """
+    Legend entries for the three statuses
+    :return: list of matplotlib `Patch`es
+    """
+    return [
+        mpatches.Patch(color=color, label=label)
+        for color, label in zip(colors, STATUS_LABELS)
+    ]
+
+
+def plot_snapshots(
+    trajectory, days, ncols=2, mode="raster", bins=256, figsize=(10, 10), **kwargs
+):
+    """
+    Plot the agents on each of `days` in a grid of panels, with a shared legend
+    :param trajectory: `trajectory.Trajectory`, or any object with the same
+    `frame_of`, `positions` and `status` methods
+    :param days: list of recorded days
+    :param ncols: (optional) number of panels per row
+    :param mode: (optional) see `draw`
+    :param bins: (optional) see `draw`
+    :param figsize: (optional) size of the figure
+    :param kwargs: (optional) passed to `draw`
+    :return: matplotlib `Figure`
+    """
+    nrows = -(-len(days) // ncols)
+    fig, axes = plt.subplots(nrows, ncols, figsize=figsize, squeeze=False)
+    for ax, day in zip(axes.flat, days):
+        frame = trajectory.frame_of(day)
+        draw(
+            ax,
+            trajectory.positions(frame),
+            trajectory.status(frame),
+            mode,
+            bins,
+            **kwargs
+        )
+        ax.set_xlim(0, 1)
+        ax.set_ylim(0, 1)
+        ax.set_title("state at t = {}".format(day + 1))
+    for ax in axes.flat[len(days) :]:
+        ax.axis("off")
+    fig.legend(handles=legend_handles(kwargs.get("colors", STATUS_COLORS)))
+    return fig
@@ -2,15 +2,206 @@
 Definitions for `DiscreteAgent` class, and the `Agent` class
 """
 
-import random
 import math
 import numpy as np
-import networkx as nx
-from sklearn.neighbors import BallTree
-from scipy.optimize import Bounds, minimize, NonlinearConstraint
+from scipy import ndimage
 
+try:
+    from compartments import IndexSet
+except ImportError:  # imported as part of the `sir` package
+    from .compartments import IndexSet
 
-class SmartAgentModel2D:
+try:
+    from neighbors import check_index_name, make_index, NeighborGraph, VerletList
+except ImportError:  # imported as part of the `sir` package
+    from .neighbors import check_index_name, make_index, NeighborGraph, VerletList
+
+try:
+    from movement import BOUNDARIES, flee, random_walk
+except ImportError:  # imported as part of the `sir` package
+    from .movement import BOUNDARIES, flee, random_walk
+
+try:
+    from events import EventLog, SUSCEPTIBLE, INFECTED, RECOVERED, UNKNOWN
+except ImportError:  # imported as part of the `sir` package
+    from .events import EventLog, SUSCEPTIBLE, INFECTED, RECOVERED, UNKNOWN
+
+try:
+    from mesh import DiskMesh, bin_counts
+except ImportError:  # imported as part of the `sir` package
+    from .mesh import DiskMesh, bin_counts
+
+try:
+    from trajectory import TrajectoryRecorder
+except ImportError:  # imported as part of the `sir` package
+    from .trajectory import TrajectoryRecorder
+
+try:
+    from streaming import StreamingMixin
+except ImportError:  # imported as part of the `sir` package
+    from .streaming import StreamingMixin
+
+
+# Columns of `SmartAgentModel2D.scores`
+FEAR, KNOWLEDGE = 0, 1
+
+# Ways of finding who infected agents infect, see `SmartAgentModel2D.__init__`
+INFECTIONS = ("neighbors", "mesh")
+
+# Largest infection probability per contact in "mesh" infections, which keeps the
+# hazard of a contact finite
+_MAX_SHARE = 1 - 1e-6
+
+# Most grid cells along each side in `nearby_agents`, which bounds its memory for tiny
+# (or zero) distances
+_MAX_SIDE = 1024
+
+
+def _centroids(graph, rows, mask, positions):
+    """
+    Mean position of the neighbors flagged in `mask`, for each of the queries of `graph`
+    flagged in the boolean array `rows`
+    :return: (number of rows) by 2 numpy array
+    """
+    entry_rows = graph.rows()
+    keep = rows[entry_rows] & mask[graph.indices]
+    entry_rows, ids = entry_rows[keep], graph.indices[keep]
+    counts = np.bincount(entry_rows, minlength=len(graph))[rows]
+    totals = [
+        np.bincount(entry_rows, weights=positions[ids, axis], minlength=len(graph))
+        for axis in range(2)
+    ]
+    return np.stack(totals, axis=1)[rows] / counts[:, None]
+
+
+def status_masks(status):
+    """
+    Flag the susceptible, infected and recovered agents
+    :param status: numpy array of every agent's status code
+    :return: 3 by (number of agents) boolean numpy array, one row per status code
+    """
+    return np.asarray(status) == np.arange(3)[:, None]
+
+
+def move_agents(
+    rng, positions, status, scores, ids, graph, params, active=None, masks=None
+):
+    """
+    Move the agents `ids` for one day: they become more fearful and knowledgable from
+    the agents around them, the fearful susceptible and knowledgable infected flee, and
+    the others take a random step. This is the movement phase of
+    `SmartAgentModel2D.step`, for the whole model or for one tile of it
+    :param rng: `numpy.random.Generator` to draw the random steps from
+    :param positions: (number of agents) by 2 numpy array of every agent's position
+    :param status: numpy array of every agent's status code
+    :param scores: (number of agents) by 2 numpy array of fear and knowledge scores;
+    the rows `ids` are updated in place
+    :param ids: numpy array of the ids of the agents to move
+    :param graph: `NeighborGraph` of the agents within `max(params.fear_distance,
+    params.knowledge_distance)` of each of the active `ids`, or None if both distances
+    are 0
+    :param params: object with the model's `p`, `fear_distance`, `knowledge_distance`,
+    `fear_threshold`, `knowledge_threshold` and `boundary` attributes
+    :param active: (optional) boolean array flagging the `ids` that are the queries of
+    `graph`; the others have no infected or recovered agent in range, so they just
+    take a random step. By default all of `ids` are active
+    :param masks: (optional) the output of `status_masks(status)`. Building it takes a
+    pass over every agent, so callers moving a few agents at a time (such as the tiles
+    of a `TiledSmartAgentModel`) should build it once and share it
+    :return: numpy array of the new positions of `ids`
+    """
+    place = np.arange(len(ids)) if active is None else np.flatnonzero(active)
+    queries = ids[place]
+    if masks is None:
+        masks = status_masks(status)
+    susceptible = masks[SUSCEPTIBLE]
+    infected = masks[INFECTED]
+    recovered = masks[RECOVERED]
+    flee_s = np.zeros(len(queries), dtype=bool)
+    flee_i = np.zeros(len(queries), dtype=bool)
+    # agents become more fearful based on nearby infected agents
+    if params.fear_distance != 0:
+        fear_graph = graph.within(params.fear_distance)
+        num_feared = fear_graph.count(infected)
+        scores[queries, FEAR] += num_feared
+        # susceptible agents who are fearful enough separate themselves from infected
+        flee_s = (
+            (num_feared > 0)
+            & susceptible[queries]
+            & (scores[queries, FEAR] > params.fear_threshold)
+        )
+    # agents become more knowledgable based on nearby infected and recovered agents
+    if params.knowledge_distance != 0:
+        knowledge_graph = graph.within(params.knowledge_distance)
+        num_known = knowledge_graph.count(infected | recovered)
+        scores[queries, KNOWLEDGE] += num_known
+        # infected agents who are knowledgable enough separate themselves from susceptible
+        num_exposed = knowledge_graph.count(susceptible)
+        flee_i = (
+            (num_exposed > 0)
+            & infected[queries]
+            & ~flee_s
+            & (scores[queries, KNOWLEDGE] > params.knowledge_threshold)
+        )
+
+    # fleeing agents step away from the centroid of the agents they flee, all at once
+    start = positions[ids]
+    new = start.copy()
+    centroids = np.zeros((len(queries), 2))
+    if flee_s.any():
+        centroids[flee_s] = _centroids(fear_graph, flee_s, infected, positions)
+    if flee_i.any():
+        centroids[flee_i] = _centroids(knowledge_graph, flee_i, susceptible, positions)
+    fleeing = flee_s | flee_i
+    fleers = place[fleeing]
+    if len(fleers):
+        new[fleers] = flee(start[fleers], centroids[fleeing], params.p)
+    # agents that fit in neither of the above categories simply move randomly, all at
+    # once
+    walkers = np.ones(len(ids), dtype=bool)
+    walkers[fleers] = False
+    new[walkers] = random_walk(rng, start[walkers], params.p, params.boundary)
+    return new
+
+
+def nearby_agents(positions, sources, r):
+    """
+    Flag the agents which may be within `r` of one of the agents flagged in `sources`:
+    those in a grid cell (of side at least `r`) next to, or holding, a source. Every
+    agent within `r` of a source is flagged, and a few farther ones
+    :param positions: (number of agents) by 2 numpy array of positions
+    :param sources: boolean numpy array flagging the source agents
+    :param r: distance, which may be 0
+    :return: boolean numpy array
+    """
+    side = _MAX_SIDE if r * _MAX_SIDE < 1 else max(1, math.floor(1 / r))
+    cells = np.clip((positions * side).astype(np.int64), 0, side - 1)
+    flat = cells[:, 0] * side + cells[:, 1]
+    occupied = np.zeros((side, side), dtype=bool)
+    occupied.flat[flat[sources]] = True
+    occupied = ndimage.binary_dilation(occupied, structure=np.ones((3, 3), dtype=bool))
+    return occupied.flat[flat]
+
+
+def infect_contacts(rng, graph, infectors, status, prob_infect):
+    """
+    Each of `infectors` picks a `prob_infect` share of its neighbors; the susceptible
+    ones are infected. This is the infection phase of `SmartAgentModel2D.step`, for the
+    whole model or for one tile of it
+    :param rng: `numpy.random.Generator` to draw from
+    :param graph: `NeighborGraph` of the other agents within `q` of each of `infectors`
+    :param infectors: numpy array of the ids of the infected agents
+    :param status: numpy array of every agent's status code
+    :param prob_infect: probability that a contact results in an infection
+    :return: numpy arrays of the id of each agent infected and of its infector; an
+    agent appears once per infector that picked it
+    """
+    rows, contacts = graph.sample(rng, prob_infect)
+    hits = status[contacts] == SUSCEPTIBLE
+    return contacts[hits], infectors[rows[hits]]
+
+
+class SmartAgentModel2D(StreamingMixin):
     def __init__(
         self,
         p,
@@ -23,6 +214,13 @@ class SmartAgentModel2D:
         fear_distance=0,
         prob_infect=None,
         initial_infect=None,
+        rng=None,
+        spatial_index="cells",
+        verlet_skin=None,
+        boundary="reject",
+        infection="neighbors",
+        mesh_size=None,
+        active_set=True,
     ):
         """
         Initialize an `SmartAgentModel2D` class (leave default optional parameters:
@@ -38,6 +236,31 @@ class SmartAgentModel2D:
         :param prob_infect: (optional) probability that an interaction between a susceptible
         agent and an infected agent results in the susceptible agent's infection
         :param initial_infect: (optional) if supplied, start with `initial_infect` agents already infected
+        :param rng: (optional) `numpy.random.Generator`, or seed for one, used for all of
+        the model's randomness
+        :param spatial_index: (optional) name of the spatial index used to find nearby
+        agents, "cells" (a uniform grid of cells, sized to the largest interaction
+        distance) or "balltree"; see `neighbors.SPATIAL_INDEXES`
+        :param verlet_skin: (optional) if supplied, keep a Verlet neighbor list with
+        this skin distance, and only rebuild it once an agent has moved more than
+        half the skin; a skin of a few times `p` suits slow-moving agents
+        :param boundary: (optional) how random steps that would leave the unit square
+        are handled: "reject", "reflect" or "clamp"; see `movement.random_walk`
+        :param infection: (optional) "neighbors" (each infected agent finds the agents
+        within `q` and picks some of them), or "mesh", an approximation for very large
+        populations: the infection pressure of the infected agents is spread over a
+        grid with `mesh.DiskMesh`, and each susceptible agent is infected with the
+        probability read off the grid at its position
+        :param mesh_size: (optional) number of grid cells along each side of the unit
+        square, for "mesh" infections; finer grids are more accurate and slower. The
+        default gives cells of about `q / 4`. The grid blurs the edge of each agent's
+        range over a few cells, which matters most when `prob_infect` is close to 1
+        :param active_set: (optional) if True, only look for the neighbors of agents
+        near an infected or recovered agent (see `nearby_agents`), and only among the
+        agents near those; the others just take a random step. Fear, knowledge and
+        contacts are the same either way, but far less work is done while the outbreak
+        is small. The neighbors may be listed in another order, so, as with another
+        `spatial_index`, seeded runs match in distribution rather than number for number
         :return: None
         """
         (
@@ -59,14 +282,47 @@ class SmartAgentModel2D:
             knowledge_distance,
             fear_distance,
         )
-        self.agents = [SmartAgent(ii) for ii in range(size)]
-        self.susceptible = [agent.id for agent in self.agents]
-        self.locations = [agent.pos for agent in self.agents]
-        self.infected = []
-        self.recovered = []
+        self.rng = np.random.default_rng(rng)
+        self.spatial_index = spatial_index
+        self.cell_size = max(q, knowledge_distance, fear_distance)
+        check_index_name(spatial_index)
+        self.verlet = None
+        if verlet_skin is not None:
+            self.verlet = VerletList(
+                spatial_index, self.cell_size, self.cell_size, verlet_skin
+            )
+        if boundary not in BOUNDARIES:
+            raise ValueError(
+                "boundary must be one of {}, not {}".format(BOUNDARIES, boundary)
+            )
+        self.boundary = boundary
+        if infection not in INFECTIONS:
+            raise ValueError(
+                "infection must be one of {}, not {}".format(INFECTIONS, infection)
+            )
+        self.infection = infection
+        self.active_set = active_set
+        self.mesh = None
+        if infection == "mesh":
+            if mesh_size is None:
+                mesh_size = min(math.ceil(4 / q), 4096)
+            self.mesh = DiskMesh(q, mesh_size)
+        # Every agent's position is a row of this array; `SmartAgent.pos` is a view.
+        # Likewise for the fear and knowledge scores
+        self.positions = self._allocate("positions", (size, 2))
+        self.positions[:] = self.rng.random((size, 2))
+        self.scores = self._allocate("scores", (size, 2))
+        self.agents = [
+            SmartAgent(ii, rng=self.rng, positions=self.positions, scores=self.scores)
+            for ii in range(size)
+        ]
+        self.susceptible = IndexSet(size, np.arange(size))
+        self.infected = IndexSet(size)
+        self.recovered = IndexSet(size)
         self.days_passed = 0
         self.initial_infect = initial_infect
         self.prob_infect = 1 if prob_infect is None else prob_infect
+        self.event_log = None
         if self.initial_infect is not None:
             self.exogenous_infect(n=initial_infect)
 
@@ -79,20 +335,22 @@ class SmartAgentModel2D:
         """
         if n is not None:
             if n <= len(self.susceptible):
-                infected = sorted(random.sample(self.susceptible, k=n))
+                infected = np.sort(
+                    self.rng.choice(self.susceptible.to_array(), size=n, replace=False)
+                )
                 for agent_id in infected:
-                    self.agents[agent_id].infect()
-                    self.categorize_agents()
+                    self._infect(agent_id)
+                self._log(self.days_passed, infected, INFECTED)
             else:
                 print(
                     "DiscreteAgentModel.exogenous_infect: `n` greater than the number of susceptible agents"
                 )
 
         if indices is not None:
-            if set(indices).issubset(set(self.susceptible)):
+            if all(agent_id in self.susceptible for agent_id in indices):
                 for agent_id in indices:
-                    self.agents[agent_id].infect()
-                    self.categorize_agents()
+                    self._infect(agent_id)
+                self._log(self.days_passed, indices, INFECTED)
             else:
                 print(
                     "DiscreteAgentModel.exogenous_infect: `indices` contains non-susceptible agents"
@@ -103,6 +361,39 @@ class SmartAgentModel2D:
                 "DiscreteAgentModel.exogenous_infect: supply either `n` or `indices`. No action was taken"
             )
 
+    def start_event_log(self):
+        """
+        Start logging every change of status from now on, in `self.event_log`. This
+        is much more compact than the status matrix of `step_t_days`; use
+        `EventLog.status_on` and `EventLog.counts` to rebuild any day
+        :return: `EventLog`
+        """
+        self.event_log = EventLog(self.status_codes(), start_day=self.days_passed)
+        return self.event_log
+
+    def _allocate(self, name, shape, dtype=np.float64):
+        """
+        Allocate the per-agent array `name`, filled with zeros. Subclasses may place it
+        elsewhere, see `tiling.TiledSmartAgentModel`
+        :return: numpy array
+        """
+        return np.zeros(shape, dtype=dtype)
+
+    def _log(self, day, agents, state, infectors=None):
+        """
+        Record a batch of transitions, if events are being logged
+        :return: None
+        """
+        if self.event_log is not None:
+            self.event_log.record(day, agents, state, infectors)
+
+    @property
+    def locations(self):
+        """
+        (number of agents) by 2 numpy array of the agents' positions
+        """
+        return self.positions
+
     def reset(self):
         """
         Reset the model to a "clean slate"
@@ -111,113 +402,209 @@ class SmartAgentModel2D:
         for agent in self.agents:
             agent.reset()
 
-        self.susceptible = list(range(self.size))
-        self.infected = []
-        self.recovered = []
+        self.susceptible.add_many(np.arange(self.size))
+        self.infected.clear()
+        self.recovered.clear()
         self.days_passed = 0
 
+    def _infect(self, agent_id):
+        """
+        Infect a susceptible agent, and move its `id` to `self.infected`
+        :return: None
+        """
+        self.agents[agent_id].infect()
+        self.susceptible.remove(agent_id)
+        self.infected.add(agent_id)
+
+    def _recover(self, agent_id):
+        """
+        Recover an infected agent, and move its `id` to `self.recovered`
+        :return: None
+        """
+        self.agents[agent_id].recover()
+        self.infected.remove(agent_id)
+        self.recovered.add(agent_id)
+
     def categorize_agents(self):
         """
-        Iterate through the agents, and append their `id` to the appropriate list
-        based off their current status
+        Iterate through the agents, and rebuild the sets of `id`s in each compartment
+        from scratch, based off their current status. The compartments are kept up to
+        date as agents change status, so this is only needed if agents were modified
+        directly
         :return: None
         """
-        self.susceptible = []
-        self.infected = []
-        self.recovered = []
+        self.susceptible = IndexSet(self.size)
+        self.infected = IndexSet(self.size)
+        self.recovered = IndexSet(self.size)
         for agent in self.agents:
             s, i, r = agent.status()
             if s:
-                self.susceptible.append(agent.id)
+                self.susceptible.add(agent.id)
             elif i:
-                self.infected.append(agent.id)
+                self.infected.add(agent.id)
             else:
-                self.recovered.append(agent.id)
+                self.recovered.add(agent.id)
 
-    def step(self):
+    def _neighbors(self, positions, r, ids=None, candidates=None):
         """
-        Simulate one day according to SIR model parameters
-        :return: None
+        Find the agents within `r` of each of the agents `ids` (default: all of them),
+        from the Verlet list if there is one, or else from a new spatial index
+        :param candidates: (optional) numpy array of the ids of the only agents that
+        can be within `r` of `ids`; a new index then only holds those. The Verlet list
+        holds every agent anyway
+        :return: `NeighborGraph`
         """
-        agent_ids = [agent.id for agent in self.agents]
-        # agents learn and become more fearful, then move and we store new locations of all agents
-        tree = BallTree(np.array(self.locations))
-        for ii in agent_ids:
-            # agents become more fearful based on nearby infected agents
-            if self.fear_distance != 0:
-                ind_fear = tree.query_radius(
-                    self.locations[ii : ii + 1], r=self.fear_distance
-                )
-                self.agents[ii].react(
-                    len(set(ind_fear[0]).intersection(set(self.infected)))
-                )
-            # agents become more knowledgable based on nearby infected and recovered agents
-            if self.knowledge_distance != 0:
-                ind_knowledge = tree.query_radius(
-                    self.locations[ii : ii + 1], r=self.knowledge_distance
-                )
-                self.agents[ii].learn(
-                    len(set(ind_knowledge[0]).intersection(set(self.infected)))
-                    + len(set(ind_knowledge[0]).intersection(set(self.recovered)))
-                )
-            # susceptible agents who are fearful enough separate themselves from infected
-            if (
-                self.fear_distance != 0
-                and len(set(ind_fear[0]).intersection(set(self.infected))) > 0
-                and self.agents[ii].s == True
-                and self.agents[ii].fear > self.fear_threshold
-            ):
-                self.agents[ii].move(
-                    self.p,
-                    self.fear_threshold,
-                    [
-                        self.locations[jj]
-                        for jj in set(ind_fear[0]).intersection(set(self.infected))
-                    ],
-                )
-            # infected agents who are knowledgable enough separate themselves from susceptible
-            elif (
-                self.knowledge_distance != 0
-                and len(set(ind_knowledge[0]).intersection(set(self.susceptible))) > 0
-                and self.agents[ii].i == True
-                and self.agents[ii].knowledge > self.knowledge_threshold
+        if self.verlet is not None:
+            return self.verlet.query(positions, r, ids)
+        queries = positions if ids is None else positions[ids]
+        if candidates is None:
+            index = make_index(self.spatial_index, positions, self.cell_size)
+            return index.query(queries, r)
+        if len(candidates) == 0 or len(queries) == 0:
+            return NeighborGraph(np.zeros(len(queries) + 1), np.zeros(0), np.zeros(0))
+        index = make_index(self.spatial_index, positions[candidates], self.cell_size)
+        graph = index.query(queries, r)
+        return NeighborGraph(graph.indptr, candidates[graph.indices], graph.distances)
+
+    def check_compartments(self):
+        """
+        Debugging aid: rescan every agent, and check that the compartments agree with
+        the agents' statuses
+        :return: True if they agree
+        """
+        for agent in self.agents:
+            if agent.status() != (
+                agent.id in self.susceptible,
+                agent.id in self.infected,
+                agent.id in self.recovered,
             ):
-                self.agents[ii].move(
-                    self.p,
-                    self.fear_threshold,
-                    [
-                        self.locations[jj]
-                        for jj in set(ind_fear[0]).intersection(set(self.susceptible))
-                    ],
-                )
-            # agents that fit in neither of the above categories simply move randomly
-            else:
-                self.agents[ii].move(self.p, self.fear_threshold)
-            self.locations[ii] = self.agents[ii].pos
+                return False
+        return True
 
-        # Recover k proportion of the infected
-        num_recover = np.random.choice(
+    def _recover_share(self):
+        """
+        Recover k proportion of the infected
+        :return: None
+        """
+        num_recover = self.rng.choice(
             [
                 math.ceil(len(self.infected) * self.k),
                 math.floor(len(self.infected) * self.k),
             ]
         )
         if num_recover > 0:
-            ids_recover = random.sample(self.infected, k=num_recover)
+            ids_recover = self.rng.choice(
+                self.infected.to_array(), size=num_recover, replace=False
+            )
             for r_id in ids_recover:
-                self.agents[r_id].recover()
-                self.categorize_agents()
-
-        # infected agents infect individuals within range q
-        tree = BallTree(np.array(self.locations))
-        for ii in self.infected:
-            ind = tree.query_radius(self.locations[ii : ii + 1], r=self.q)
-            num_infect = math.ceil(len(ind[0][1:]) * self.prob_infect)
-            new_infect = random.sample(set(ind[0][1:]), num_infect)
-            for jj in new_infect:
-                self.agents[jj].infect()
-
-        self.categorize_agents()
+                self._recover(r_id)
+            self._log(self.days_passed + 1, ids_recover, RECOVERED)
+
+    def _infect_contacts(self, contacts, sources):
+        """
+        Infect the agents `contacts` (the output of `infect_contacts`), crediting each
+        to the first of its infectors in `sources`
+        :return: None
+        """
+        new_infect, first = np.unique(contacts, return_index=True)
+        for jj in new_infect:
+            self._infect(jj)
+        self._log(self.days_passed + 1, new_infect, INFECTED, sources[first])
+
+    def _mesh_contacts(self):
+        """
+        Infections of the "mesh" mode. An infected agent with `d` other agents within
+        `q` picks `ceil(prob_infect * d)` of them, so each is picked with probability
+        `w = ceil(prob_infect * d) / d`. Both `d` and the hazard `-log(1 - w)` summed
+        over the infected agents within `q` of each susceptible agent are read off the
+        mesh, and each susceptible agent is infected with probability
+        `1 - exp(-hazard)`
+        :return: numpy arrays of the ids of the agents infected, and of their infectors,
+        which are unknown
+        """
+        status = self.status_codes()
+        infectors = np.flatnonzero(status == INFECTED)
+        susceptible = np.flatnonzero(status == SUSCEPTIBLE)
+        positions = self.positions
+        degree = (self.mesh.sums(positions, None, positions[infectors]) - 1).clip(
+            0, None
+        )
+        share = np.zeros(len(infectors))
+        np.divide(np.ceil(self.prob_infect * degree), degree, share, where=degree > 0)
+        hazard = -np.log1p(-np.minimum(share, _MAX_SHARE))
+        pressure = self.mesh.sums(
+            positions[infectors], hazard, positions[susceptible]
+        ).clip(0, None)
+        hits = self.rng.random(len(susceptible)) < -np.expm1(-pressure)
+        contacts = susceptible[hits]
+        return contacts, np.full(len(contacts), UNKNOWN)
+
+    def to_grid(self, size):
+        """
+        Share of the agents in each cell of a `size` by `size` grid of the unit square
+        who are susceptible, infected and recovered; the grids of `SpatialSirOde`, see
+        `SpatialSirOde.from_grid`. Empty cells are all 0
+        :return: 3 by `size` by `size` numpy array of the susceptible, infected and
+        recovered shares, indexed [status, y, x]
+        """
+        counts = bin_counts(self.positions, self.status_codes(), size)
+        total = counts.sum(axis=0)
+        return counts / np.maximum(total, 1)
+
+    def step(self):
+        """
+        Simulate one day according to SIR model parameters
+        :return: None
+        """
+        # agents learn and become more fearful, then move and we store new locations of
+        # all agents. One batched query finds every neighborhood needed by both
+        positions = self.positions.copy()
+        status = self.status_codes()
+        radius = max(self.fear_distance, self.knowledge_distance)
+        graph = active = None
+        if radius != 0:
+            if self.active_set:
+                # Only agents with an infected or recovered agent in range can learn,
+                # become more fearful or flee
+                active = nearby_agents(positions, status != SUSCEPTIBLE, radius)
+                queries = np.flatnonzero(active)
+                candidates = np.flatnonzero(nearby_agents(positions, active, radius))
+                graph = self._neighbors(positions, radius, queries, candidates)
+            else:
+                graph = self._neighbors(positions, radius)
+        self.positions[:] = move_agents(
+            self.rng,
+            positions,
+            status,
+            self.scores,
+            np.arange(self.size),
+            graph,
+            self,
+            active,
+        )
+
+        self._recover_share()
+
+        # infected agents infect a `prob_infect` share of the other agents within range
+        # q, found with one batched query. Only those infected before this phase can
+        # infect others
+        if self.infection == "mesh":
+            self._infect_contacts(*self._mesh_contacts())
+        else:
+            positions = self.positions
+            infectors = self.infected.to_array()
+            candidates = None
+            if self.active_set:
+                infected = np.zeros(self.size, dtype=bool)
+                infected[infectors] = True
+                candidates = np.flatnonzero(nearby_agents(positions, infected, self.q))
+            graph = self._neighbors(positions, self.q, infectors, candidates)
+            graph = graph.without(infectors)
+            contacts, sources = infect_contacts(
+                self.rng, graph, infectors, self.status_codes(), self.prob_infect
+            )
+            self._infect_contacts(contacts, sources)
+
         self.days_passed += 1
 
     def step_t_days(self, days):
@@ -242,33 +629,63 @@ class SmartAgentModel2D:
         infected = np.zeros(
             (days, self.size), dtype=np.int64
         )  # 0 if susceptible, 1 if infected 2 if recovered
-        for jj in range(self.size):
-            locsX[0, jj] = np.round(self.locations[jj][0], 5)
-            locsY[0, jj] = np.round(self.locations[jj][1], 5)
-            if self.agents[jj].i == True:
-                infected[0, jj] = int(1)
-            elif self.agents[jj].r == True:
-                infected[0, jj] = int(2)
-            else:
-                infected[0, jj] = int(0)
+        locsX[0], locsY[0], infected[0] = self._snapshot()
         # Initialize the 0th index to the initial state of the model
         num_d[0], num_s[0], num_i[0], num_r[0] = self.summarize_model()
 
         for ii in np.arange(1, days):
             self.step()
             num_d[ii], num_s[ii], num_i[ii], num_r[ii] = self.summarize_model()
-            for jj in range(self.size):
-                locsX[ii, jj] = np.round(self.locations[jj][0], 5)
-                locsY[ii, jj] = np.round(self.locations[jj][1], 5)
-                if self.agents[jj].i == True:
-                    infected[ii, jj] = int(1)
-                elif self.agents[jj].r == True:
-                    infected[ii, jj] = int(2)
-                else:
-                    infected[ii, jj] = int(0)
+            locsX[ii], locsY[ii], infected[ii] = self._snapshot()
 
         return np.array([num_d, num_s, num_i, num_r]).T, locsX, locsY, infected
 
+    def record_t_days(
+        self, days, path, stride=1, position_dtype="uint16", chunk_days=64
+    ):
+        """
+        Simulate infections for `days`, like `step_t_days`, but write the agents'
+        positions and statuses to memory-mapped files instead of returning them. Open
+        the result with `trajectory.Trajectory(path)`
+        :param days: Number of days to step
+        :param path: directory to write the trajectory to
+        :param stride: (optional) only record every `stride`th day
+        :param position_dtype: (optional) "uint16" (quantized) or "float32"
+        :param chunk_days: (optional) number of recorded days per file
+        :return: `days` by `4` numpy array, the first output of `step_t_days`
+        """
+        result = np.zeros((days, 4), dtype=np.int64)
+        with TrajectoryRecorder(
+            path, self.size, position_dtype, stride, chunk_days
+        ) as recorder:
+            for ii in range(days):
+                if ii > 0:
+                    self.step()
+                result[ii] = self.summarize_model()
+                recorder.record(ii, self.positions, self.status_codes())
+        return result
+
+    def status_codes(self):
+        """
+        Status of every agent, coded as 0 if susceptible, 1 if infected and 2 if recovered
+        :return: uint8 numpy array
+        """
+        status = np.zeros(self.size, dtype=np.uint8)
+        status[self.infected.to_array()] = 1
+        status[self.recovered.to_array()] = 2
+        return status
+
+    def _snapshot(self):
+        """
+        The agents' rounded X and Y coordinates, and their status codes
+        :return: tuple of three numpy arrays
+        """
+        return (
+            np.round(self.positions[:, 0], 5),
+            np.round(self.positions[:, 1], 5),
+            self.status_codes(),
+        )
+
     def summarize_model(self):
         """
         Summarize the current state of the `DiscreteAgentModel` object
@@ -283,21 +700,66 @@ class SmartAgentModel2D:
 
 
 class SmartAgent:
-    def __init__(self, agent_id, pos=None):
+    def __init__(self, agent_id, pos=None, rng=None, positions=None, scores=None):
         """
         Initialize the `SmartAgent` as susceptible
+        :param rng: (optional) `numpy.random.Generator`, or seed for one, used to place
+        and move the agent
+        :param positions: (optional) array of positions shared with a model; the agent's
+        position is then row `agent_id` of it, and is not drawn here
+        :param scores: (optional) array of fear and knowledge scores shared with a model;
+        the agent's scores are then row `agent_id` of it
         """
         self.s = True
         self.i = False
         self.r = False
         self.id = agent_id
-        if pos == None:
-            self.pos = np.random.rand(2)
+        self.rng = np.random.default_rng(rng)
+        self._positions = positions
+        if scores is None:
+            self._scores, self._row = np.zeros((1, 2)), 0
         else:
+            self._scores, self._row = scores, agent_id
+        if pos is not None:
             self.pos = pos
+        elif positions is None:
+            self.pos = self.rng.random(2)
         self.knowledge = 0
         self.fear = 0
 
+    @property
+    def pos(self):
+        """
+        The agent's position. For agents of a model this is a view into the model's
+        array of positions, so it can be modified in place
+        """
+        if self._positions is None:
+            return self._pos
+        return self._positions[self.id]
+
+    @pos.setter
+    def pos(self, value):
+        if self._positions is None:
+            self._pos = value
+        else:
+            self._positions[self.id] = value
+
+    @property
+    def fear(self):
+        return self._scores[self._row, FEAR]
+
+    @fear.setter
+    def fear(self, value):
+        self._scores[self._row, FEAR] = value
+
+    @property
+    def knowledge(self):
+        return self._scores[self._row, KNOWLEDGE]
+
+    @knowledge.setter
+    def knowledge(self, value):
+        self._scores[self._row, KNOWLEDGE] = value
+
     def reset(self):
         """
         Reset the `SmartAgent` to its initial state; i.e., make them susceptible again
@@ -307,7 +769,7 @@ class SmartAgent:
         self.s = True
         self.i = False
         self.r = False
-        self.pos = np.random.rand(2)
+        self.pos = self.rng.random(2)
         self.knowledge = 0
         self.fear = 0
 
@@ -338,32 +800,13 @@ class SmartAgent:
         Moves the `SmartAgent` in a smart direction based off of the agents fear and knowledge of the virus
         :return: None
         """
-        if loc_nearby == None or self.r == True:
-            new_loc = [-1, -1]
-            while new_loc[0] < 0 or new_loc[0] > 1 or new_loc[1] < 0 or new_loc[1] > 1:
-                delta = (
-                    p
-                    * np.random.choice([1, -1], size=2, replace=True)
-                    * np.random.rand(2)
-                )
-                new_loc = self.pos + delta
-            self.pos = new_loc
+        if loc_nearby is None or self.r == True:
+            self.pos = random_walk(self.rng, [self.pos], p)[0]
         else:
-
-            def f(x):
-                return -np.linalg.norm(x - loc_nearby)
-
-            def cons_f(x):
-                return [np.linalg.norm(x - self.pos)]
-
-            bounds = Bounds(
-                [0, 0],
-                [1, 1],
-            )
-            cons = NonlinearConstraint(cons_f, -np.inf, p)
-            res = minimize(f, x0=self.pos, constraints=cons, bounds=bounds)
-            new_loc = res.x
-            self.pos = new_loc
+            # Maximize the distance from the nearby agents, see `movement.flee`
+            loc_nearby = np.asarray(loc_nearby, dtype=np.float64).reshape(-1, 2)
+            if len(loc_nearby):
+                self.pos = flee([self.pos], [loc_nearby.mean(axis=0)], p)[0]
 
     def learn(self, num_infect_or_recovered_nearby):
         """
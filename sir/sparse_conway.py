@@ -0,0 +1,192 @@
+"""
+Definition of the `SparseConwayModel` class: a `ConwayModel` which splits the board into
+square tiles and only recomputes the tiles where something can happen
+
+A cell's Life state can only change if it or one of its neighbors changed in the last
+generation, and a cell can only be infected next to an infected agent, so each day only
+the tiles around the tiles that changed, or that hold infected agents, are computed.
+Once a board settles into still lifes and a few small oscillators, the cost of a day
+follows the activity rather than the area of the board
+"""
+
+import math
+import numpy as np
+from scipy import ndimage
+from numpy.lib.stride_tricks import as_strided
+
+try:
+    from conway_agent import ConwayModel, DEAD, SUSCEPTIBLE, INFECTED, RECOVERED
+except ImportError:  # imported as part of the `sir` package
+    from .conway_agent import ConwayModel, DEAD, SUSCEPTIBLE, INFECTED, RECOVERED
+
+_NEIGHBORHOOD = np.ones((3, 3), dtype=bool)
+
+
+def _grow(tiles):
+    """
+    The tiles of the boolean tile grid `tiles` and their eight neighbors
+    """
+    return ndimage.binary_dilation(tiles, structure=_NEIGHBORHOOD)
+
+
+def _count_neighbors(windows):
+    """
+    Count the neighbors of the inner cells of a stack of windows, each with a border of
+    one cell, one axis at a time
+    :param windows: (number of windows) by (tile + 2) by (tile + 2) numpy array of 0s and 1s
+    :return: (number of windows) by tile by tile int8 numpy array
+    """
+    windows = windows.astype(np.int8)
+    rows = windows[:, :, :-2] + windows[:, :, 1:-1] + windows[:, :, 2:]
+    total = rows[:, :-2] + rows[:, 1:-1] + rows[:, 2:]
+    return total - windows[:, 1:-1, 1:-1]
+
+
+class SparseConwayModel(ConwayModel):
+    def __init__(self, m, n, k, p, agents=None, rng=None, grid=None, tile=64):
+        """
+        Initialize a `SparseConwayModel`; the parameters are those of `ConwayModel`, and
+        the model runs the same game with the same distribution of outcomes, but draws
+        random numbers only for the cells that need them. Life is not memoized with a
+        `CycleCache`, since quiet tiles are skipped anyway
+        :param tile: side of the square tiles, in cells
+        """
+        super().__init__(m, n, k, p, agents=agents, rng=rng, grid=grid, max_period=0)
+        self.tile = tile
+        self.tile_rows, self.tile_cols = -(-m // tile), -(-n // tile)
+        # The board, padded to whole tiles and with a border of one cell; the padding
+        # holds code 0, which is never alive and is never infected
+        self._board = np.zeros(
+            (self.tile_rows * tile + 2, self.tile_cols * tile + 2), dtype=np.int8
+        )
+        self._board[1 : m + 1, 1 : n + 1] = self.grid
+        self.grid = self._board[1 : m + 1, 1 : n + 1]
+        # [tile row, tile column, row, column] view of the cells of every tile, and of
+        # every tile with its border
+        self._tiles = (
+            self._board[1:-1, 1:-1]
+            .reshape(self.tile_rows, tile, self.tile_cols, tile)
+            .transpose(0, 2, 1, 3)
+        )
+        row_stride, col_stride = self._board.strides
+        self._windows = as_strided(
+            self._board,
+            shape=(self.tile_rows, self.tile_cols, tile + 2, tile + 2),
+            strides=(tile * row_stride, tile * col_stride, row_stride, col_stride),
+            writeable=False,
+        )
+        self.refresh()
+
+    def refresh(self):
+        """
+        Mark every tile as active and recount the statuses on every tile; needed after
+        the grid is edited directly, e.g. through the `agents` views
+        :return: None
+        """
+        shape = (self.tile_rows, self.tile_cols)
+        self.changed_tiles = np.ones(shape, dtype=bool)
+        # Number of cells with each code, from -3 to 3, on every tile
+        codes = self._tiles.reshape(-1, self.tile**2).astype(np.int64)
+        codes += (3 + 7 * np.arange(len(codes)))[:, None]
+        counts = np.bincount(codes.ravel(), minlength=7 * len(codes))
+        self._counts = counts.reshape(shape + (7,))
+        self.infected_tiles = self._counts[:, :, 3 + INFECTED] > 0
+
+    def set_alive(self, alive):
+        """
+        Set all agents as being alive or dead, from an `m` x `n` boolean grid, and mark
+        every tile as active
+        """
+        magnitude = np.abs(self.grid)
+        self.grid[...] = np.where(alive, magnitude, -magnitude)
+        self.refresh()
+
+    def _update(self, rows, cols, codes, cells, old):
+        """
+        Store the new `codes` of the tiles (`rows`, `cols`), and update the counts of
+        the tiles and whether they hold living infected agents
+        :param codes: (number of tiles) by tile by tile numpy array
+        :param cells: flat indices into `codes` of the cells which changed
+        :param old: codes of those cells before the change
+        """
+        self._tiles[rows, cols] = codes
+        which = cells // self.tile**2
+        offset = (rows[which] * self.tile_cols + cols[which]) * 7 + 3
+        new = codes.ravel()[cells]
+        size = self._counts.size
+        flat = self._counts.reshape(-1)
+        flat += np.bincount(offset + new, minlength=size)
+        flat -= np.bincount(offset + old, minlength=size)
+        self.infected_tiles[rows, cols] = self._counts[rows, cols, 3 + INFECTED] > 0
+
+    def step_conway(self):
+        """
+        The first part of every 'turn': Conway moves, on the tiles next to a tile that
+        changed in the last generation
+        """
+        rows, cols = np.nonzero(_grow(self.changed_tiles))
+        windows = self._windows[rows, cols]
+        prior = windows > DEAD
+        counts = _count_neighbors(prior)
+        inner = prior[:, 1:-1, 1:-1]
+        # Alive next turn: 3 neighbors, or 2 neighbors and alive now
+        flip = ((counts | inner) == 3) != inner
+
+        changed = flip.any(axis=(1, 2))
+        self.changed_tiles[...] = False
+        self.changed_tiles[rows, cols] = changed
+        codes = windows[changed, 1:-1, 1:-1]
+        cells = np.flatnonzero(flip[changed])
+        codes.ravel()[cells] *= -1
+        old = -codes.ravel()[cells]
+        self._update(rows[changed], cols[changed], codes, cells, old)
+
+    def step_agents(self):
+        """
+        The second part of every 'turn': agent moves, as in `ConwayModel.step_agents`,
+        on the tiles next to a tile with infected agents
+        """
+        # With `p >= 1` every susceptible agent is infected, near an infected one or not
+        if self.p >= 1:
+            near = np.ones_like(self.infected_tiles)
+        else:
+            near = _grow(self.infected_tiles)
+        rows, cols = np.nonzero(near)
+        windows = self._windows[rows, cols]
+        codes = windows[:, 1:-1, 1:-1].copy()
+        infected_ids = np.flatnonzero(codes == INFECTED)
+
+        infect = codes == SUSCEPTIBLE
+        if self.p < 1:
+            num_infected_nearby = _count_neighbors(windows == INFECTED)
+            infect &= num_infected_nearby > 0
+            cells = np.flatnonzero(infect)
+            uniform = self.rng.random(len(cells))
+            power = np.power(uniform, num_infected_nearby.ravel()[cells])
+            infect_ids = cells[power <= self.p]
+        else:
+            infect_ids = np.flatnonzero(infect)
+        codes.ravel()[infect_ids] = INFECTED
+
+        recover_ids = self.rng.choice(
+            infected_ids, size=math.ceil(self.k * len(infected_ids)), replace=False
+        )
+        codes.ravel()[recover_ids] = RECOVERED
+
+        cells = np.concatenate([infect_ids, recover_ids])
+        old = np.repeat([SUSCEPTIBLE, INFECTED], [len(infect_ids), len(recover_ids)])
+        touched = np.unique(cells // self.tile**2)
+        cells = np.searchsorted(touched, cells // self.tile**2) * self.tile**2 + (
+            cells % self.tile**2
+        )
+        self._update(rows[touched], cols[touched], codes[touched], cells, old)
+
+    def summarize_model(self):
+        """
+        Return the number of susceptible, infected, and recovered "alive" agents,
+        as well as the number of days passed, in a tuple, from the counts kept for
+        each tile
+        """
+        counts = self._counts.sum(axis=(0, 1))
+        num_s, num_i, num_r = counts[3 + SUSCEPTIBLE : 3 + RECOVERED + 1]
+        return self.days_passed, num_s, num_i, num_r
@@ -0,0 +1,105 @@
+"""
+Definition of the `StreamingMixin` class, which lets a model yield its daily summaries
+one at a time, and stop early once the outbreak is over
+"""
+
+import numpy as np
+
+# Column of `summarize_model()` holding the number infected
+_INFECTED = 2
+
+
+def extinction(summary):
+    """
+    Stop condition: no agent is infected (in every replicate, for batched models)
+    """
+    return bool(np.all(np.asarray(summary)[..., _INFECTED] == 0))
+
+
+def make_stop_condition(stop, patience=1):
+    """
+    Turn `stop` into a function of the latest summary, which returns True when the
+    simulation should stop
+    :param stop: None (never stop), "extinction", "steady" (the number susceptible,
+    infected and recovered has not changed for `patience` days), a function taking the
+    output of `summarize_model()` and returning a bool, or a list of these (stop as
+    soon as any one holds)
+    :param patience: number of unchanged days after which the model is "steady"
+    :return: function
+    """
+    if stop is None:
+        return lambda summary: False
+    if isinstance(stop, (list, tuple)):
+        conditions = [make_stop_condition(cond, patience) for cond in stop]
+        # Every condition sees every summary, so that "steady" keeps its count
+        return lambda summary: any([cond(summary) for cond in conditions])
+    if callable(stop):
+        return stop
+    if stop == "extinction":
+        return extinction
+    if stop == "steady":
+        previous, unchanged = None, 0
+
+        def steady(summary):
+            nonlocal previous, unchanged
+            counts = np.asarray(summary)[..., 1:]
+            if previous is not None and np.array_equal(counts, previous):
+                unchanged += 1
+            else:
+                unchanged = 0
+            previous = counts
+            return unchanged >= patience
+
+        return steady
+    raise ValueError(
+        "stop must be None, 'extinction', 'steady' or a function, not {}".format(stop)
+    )
+
+
+class StreamingMixin:
+    """
+    Adds `iter_days` to a model class with `step()` and `summarize_model()` methods
+    """
+
+    def iter_days(self, days=None, stop=None, stride=1, patience=1):
+        """
+        Simulate day by day, yielding the summary of the model as it goes. Nothing is
+        stored, so the horizon can be as long as needed
+        :param days: (optional) yield at most the same days as `step_t_days(days)`,
+        i.e. the current state followed by `days - 1` steps. With `days=None` the
+        simulation runs until `stop` holds
+        :param stop: (optional) when to stop early, see `make_stop_condition`; the
+        summary of the day on which it holds is always yielded
+        :param stride: only yield every `stride`th day
+        :param patience: see `make_stop_condition`
+        :return: generator of `summarize_model()` outputs
+        """
+        if stride < 1:
+            raise ValueError("stride must be at least 1")
+        if days is not None and days < 1:
+            return
+        should_stop = make_stop_condition(stop, patience)
+        day = 0
+        while True:
+            summary = self.summarize_model()
+            last = should_stop(summary) or (days is not None and day >= days - 1)
+            if last or day % stride == 0:
+                yield summary
+            if last:
+                return
+            self.step()
+            day += 1
+
+    def run_days(self, days=None, stop=None, stride=1, patience=1):
+        """
+        Collect the output of `iter_days` in an array
+        :return: numpy array, with the same layout as the summaries of `step_t_days`
+        but only the recorded days
+        """
+        return np.stack(
+            [
+                np.asarray(summary)
+                for summary in self.iter_days(days, stop, stride, patience)
+            ],
+            axis=-2,
+        )
@@ -0,0 +1,48 @@
+"""
+Independent, reproducible random number streams for parallel simulations
+
+Every stream is a `numpy.random.Generator` driven by the counter-based `Philox` bit
+generator, seeded from a `numpy.random.SeedSequence` whose spawn key names the stream,
+e.g. (parameter index, replicate) in a sweep or (day, tile) in a tiled simulation. A
+stream only depends on the root seed and its key, never on which process draws from
+it or in what order, so results are the same on 1 core or 64
+"""
+
+import numpy as np
+
+
+def root_seed(seed=None):
+    """
+    Turn `seed` into a `SeedSequence`. With `seed=None` fresh entropy is drawn from the
+    operating system; record `root_seed().entropy` to reproduce the run later
+    :param seed: None, an int, or a `SeedSequence`
+    :return: `numpy.random.SeedSequence`
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+
+def make_stream(seed, *key):
+    """
+    Build the random number stream named `key`
+    :param seed: None, an int, or a `SeedSequence` shared by all the streams of a run
+    :param key: non-negative integers naming the stream
+    :return: `numpy.random.Generator`
+    """
+    root = root_seed(seed)
+    child = np.random.SeedSequence(
+        root.entropy,
+        spawn_key=tuple(root.spawn_key) + tuple(int(part) for part in key),
+        pool_size=root.pool_size,
+    )
+    return np.random.Generator(np.random.Philox(child))
+
+
+def spawn_streams(seed, n):
+    """
+    Build `n` independent random number streams, named `0` to `n - 1`
+    :return: list of `numpy.random.Generator`s
+    """
+    root = root_seed(seed)
+    return [make_stream(root, ii) for ii in range(n)]
@@ -0,0 +1,316 @@
+"""
+Definition of the `ParameterSweep` class, which runs any of the `sir` models over a
+grid of parameters on a pool of worker processes
+"""
+
+import os
+import sys
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+try:
+    from streams import root_seed, make_stream
+except ImportError:  # imported as part of the `sir` package
+    from .streams import root_seed, make_stream
+
+# Functions which run one simulation of a model class, keyed by class name. Each is
+# called as `runner(model_class, params, days, rng, stop=None, stride=1, patience=1)`,
+# where `rng` is the `numpy.random.Generator` reserved for that run, and `stop`,
+# `stride` and `patience` are as for `StreamingMixin.iter_days`
+RUNNERS = {}
+
+
+def register_runner(*names):
+    """
+    Decorator: use the decorated function to run simulations of the model classes
+    called `names` (and of their subclasses)
+    """
+
+    def register(runner):
+        for name in names:
+            RUNNERS[name] = runner
+        return runner
+
+    return register
+
+
+@register_runner(
+    "DiscreteAgentModel",
+    "ArrayAgentModel",
+    "EnsembleAgentModel",
+    "GillespieModel",
+    "ChainBinomialModel",
+    "NetworkAgentModel",
+)
+def run_agent_model(model_class, params, days, rng, stop=None, stride=1, patience=1):
+    """
+    Run an agent model for `days`
+    :return: the output of `step_t_days`, or of `run_days` when stopping early or
+    skipping days
+    """
+    model = model_class(rng=rng, **params)
+    if stop is None and stride == 1:
+        return model.step_t_days(days)
+    return model.run_days(days, stop, stride, patience)
+
+
+@register_runner("SmartAgentModel2D")
+def run_smart_agent_model(
+    model_class, params, days, rng, stop=None, stride=1, patience=1
+):
+    """
+    Run a `SmartAgentModel2D` for `days`. Only the S, I, R counts are returned, since
+    the per-agent locations are too large to send back from the workers
+    :return: `days` by `4` numpy array, as for `DiscreteAgentModel.step_t_days`
+    """
+    return model_class(rng=rng, **params).run_days(days, stop, stride, patience)
+
+
+@register_runner("ConwayModel")
+def run_conway_model(model_class, params, days, rng, stop=None, stride=1, patience=1):
+    """
+    Run a `ConwayModel` for `days`. Instead of a list of agents, `params` holds
+    `prop_alive` and `prop_infect`: the proportion of agents initially alive, and the
+    proportion of those initially infected
+    :return: the output of `step_t_days`
+    """
+    params = dict(params)
+    m, n = params["m"], params["n"]
+    prop_alive, prop_infect = params.pop("prop_alive"), params.pop("prop_infect")
+    codes = sys.modules[model_class.__module__]
+    alive = rng.random(m * n) <= prop_alive
+    infected = rng.random(m * n) <= prop_infect
+    # Only living agents can be infected
+    grid = np.where(
+        alive, np.where(infected, codes.INFECTED, codes.SUSCEPTIBLE), -codes.SUSCEPTIBLE
+    )
+    model = model_class(grid=grid.reshape(m, n), rng=rng, **params)
+    if stop is None and stride == 1:
+        return model.step_t_days(days)
+    return model.run_days(days, stop, stride, patience)
+
+
+@register_runner("OdeSir", "ODEReinfection")
+def run_ode_model(model_class, params, days, rng, stop=None, stride=1, patience=1):
+    """
+    Solve an ODE model over `days`. These models are deterministic, so `rng` is
+    unused, and the whole time span is always solved (`stop`, `stride` and `patience`
+    are ignored)
+    :return: numpy array whose first row is the time, followed by one row for each
+    of the values returned by `_give_values` (s, i, r and, with reinfection, d)
+    """
+    model = model_class(**params)
+    model._infect(days)
+    return np.array([model._give_time(), *model._give_values()])
+
+
+@register_runner("SpatialSirOde")
+def run_spatial_ode_model(
+    model_class, params, days, rng, stop=None, stride=1, patience=1
+):
+    """
+    Solve a `SpatialSirOde` model over `days`, ignoring `stop`, `stride` and `patience`
+    :return: numpy array with rows time, s, i, r, where s, i, r are averaged over the grid
+    """
+    model = model_class(rng=rng, **params)
+    model._infect(days)
+    s, i, r = model._give_summary()
+    return np.array([model._give_time(), s, i, r])
+
+
+def find_runner(model_class):
+    """
+    Look up the runner registered for `model_class`, or for its closest parent class
+    """
+    for cls in model_class.__mro__:
+        if cls.__name__ in RUNNERS:
+            return RUNNERS[cls.__name__]
+    raise ValueError(
+        "No runner is registered for {}; see `register_runner`".format(
+            model_class.__name__
+        )
+    )
+
+
+def parameter_grid(grid):
+    """
+    Expand a dictionary of parameter name -> list of values into the list of every
+    combination of values. A list of dictionaries is returned unchanged
+    """
+    if isinstance(grid, dict):
+        names = list(grid)
+        return [
+            dict(zip(names, values))
+            for values in itertools.product(*(grid[name] for name in names))
+        ]
+    return list(grid)
+
+
+def available_cores():
+    """
+    Number of cores this process may run on (respects e.g. SLURM CPU binding)
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count()
+
+
+def _run_chunk(model_class, days, seed, chunk, options):
+    """
+    Worker function: run every task in `chunk`. Each run draws from its own stream,
+    named by its parameter index and replicate number
+    :param options: dictionary of extra keyword arguments for the runner
+    :return: list of (parameter index, replicate number, output) tuples
+    """
+    runner = find_runner(model_class)
+    return [
+        (
+            param_index,
+            replicate,
+            runner(
+                model_class,
+                params,
+                days,
+                make_stream(seed, param_index, replicate),
+                **options
+            ),
+        )
+        for param_index, params, replicate in chunk
+    ]
+
+
+class ParameterSweep:
+    def __init__(
+        self,
+        model_class,
+        grid,
+        replicates=1,
+        days=100,
+        processes=None,
+        chunksize=1,
+        seed=None,
+        stop=None,
+        stride=1,
+        patience=1,
+    ):
+        """
+        Initialize a `ParameterSweep` class
+        :param model_class: the model class to simulate, e.g. `DiscreteAgentModel`
+        :param grid: dictionary of constructor argument -> list of values to try, or a
+        list of dictionaries of constructor arguments
+        :param replicates: number of independent runs for each set of parameters
+        :param days: number of days to simulate (the time span, for the ODE models)
+        :param processes: (optional) number of worker processes; defaults to every
+        core available. With `processes=1` the runs are done in this process
+        :param chunksize: number of runs sent to a worker at a time
+        :param seed: (optional) int or `numpy.random.SeedSequence`; the same seed gives
+        the same results, whatever the number of processes and chunk size
+        :param stop: (optional) stop each run early, e.g. "extinction"; see
+        `make_stop_condition`. With several processes, a custom stop function must be
+        defined at module level, so that it can be pickled
+        :param stride: only record every `stride`th day
+        :param patience: number of unchanged days after which a run is "steady", when
+        `stop` is "steady"; a few days more than 1 keeps slow outbreaks from being cut
+        short by a single quiet day
+        :return: None
+        """
+        self.model_class = model_class
+        self.params = parameter_grid(grid)
+        self.replicates = replicates
+        self.days = days
+        self.processes = available_cores() if processes is None else processes
+        self.chunksize = chunksize
+        self.seed = root_seed(seed)
+        # Only pass the streaming options on when they are used, so that runners
+        # registered for other models need not accept them
+        self.options = {}
+        if stop is not None:
+            self.options["stop"] = stop
+        if stride != 1:
+            self.options["stride"] = stride
+        if patience != 1:
+            self.options["patience"] = patience
+        # Fail early, rather than in the workers
+        find_runner(model_class)
+
+    def tasks(self):
+        """
+        List every run as a (parameter index, parameters, replicate number) tuple
+        """
+        return [
+            (param_index, params, replicate)
+            for param_index, params in enumerate(self.params)
+            for replicate in range(self.replicates)
+        ]
+
+    def chunks(self):
+        """
+        Split `self.tasks()` into lists of `self.chunksize` tasks
+        """
+        tasks = self.tasks()
+        return [
+            tasks[ii : ii + self.chunksize]
+            for ii in range(0, len(tasks), self.chunksize)
+        ]
+
+    def run(self):
+        """
+        Run the sweep, yielding results as soon as they are completed (so not
+        necessarily in order)
+        :return: generator of (parameters, replicate number, output) tuples
+        """
+        for param_index, replicate, output in self._run_indexed():
+            yield self.params[param_index], replicate, output
+
+    def _run_indexed(self):
+        """
+        Run the sweep, with at most two chunks per worker queued at a time
+        :return: generator of (parameter index, replicate number, output) tuples
+        """
+        chunks = iter(self.chunks())
+        if self.processes == 1:
+            for chunk in chunks:
+                yield from _run_chunk(
+                    self.model_class, self.days, self.seed, chunk, self.options
+                )
+            return
+
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            pending = set()
+            for chunk in itertools.islice(chunks, 2 * self.processes):
+                pending.add(
+                    executor.submit(
+                        _run_chunk,
+                        self.model_class,
+                        self.days,
+                        self.seed,
+                        chunk,
+                        self.options,
+                    )
+                )
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for chunk in itertools.islice(chunks, 1):
+                        pending.add(
+                            executor.submit(
+                                _run_chunk,
+                                self.model_class,
+                                self.days,
+                                self.seed,
+                                chunk,
+                                self.options,
+                            )
+                        )
+                    yield from future.result()
+
+    def run_all(self):
+        """
+        Run the sweep, and collect the results in task order
+        :return: list with one list of `replicates` outputs for each set of parameters
+        """
+        results = [[None] * self.replicates for _ in self.params]
+        for param_index, replicate, output in self._run_indexed():
+            results[param_index][replicate] = output
+        return results
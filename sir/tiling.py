@@ -0,0 +1,337 @@
+"""
+Definition of the `TiledSmartAgentModel` class, which splits the daily step of a
+`SmartAgentModel2D` over square tiles of the unit square, and steps the tiles on a pool
+of worker processes
+
+The agents' positions, statuses and scores live in shared memory. Each day the agents
+are sorted by the tile they are in (so agents migrate between tiles as they move), then
+every tile moves its own agents, and later lets its infected agents infect others. A
+tile only reads the agents in a halo of width `max(q, fear_distance,
+knowledge_distance) + p` around it, and only writes the rows of its own agents, so the
+tiles run in any order. Every tile draws from its own random stream, named by the day,
+the tile and the phase (see `streams.make_stream`), so the results do not depend on the
+number of processes
+"""
+
+import math
+import weakref
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+try:
+    from smartagent import (
+        SmartAgentModel2D,
+        infect_contacts,
+        move_agents,
+        status_masks,
+    )
+except ImportError:  # imported as part of the `sir` package
+    from .smartagent import (
+        SmartAgentModel2D,
+        infect_contacts,
+        move_agents,
+        status_masks,
+    )
+
+try:
+    from neighbors import NeighborGraph, make_index
+except ImportError:  # imported as part of the `sir` package
+    from .neighbors import NeighborGraph, make_index
+
+try:
+    from events import INFECTED
+except ImportError:  # imported as part of the `sir` package
+    from .events import INFECTED
+
+try:
+    from streams import make_stream, root_seed
+except ImportError:  # imported as part of the `sir` package
+    from .streams import make_stream, root_seed
+
+try:
+    from sweep import available_cores
+except ImportError:  # imported as part of the `sir` package
+    from .sweep import available_cores
+
+# Phases of a day, also the last part of the name of each tile's random stream
+MOVE, INFECT = 0, 1
+
+# Shared memory blocks attached by this process, by name
+_attached = {}
+
+
+def max_tiles(p, q, fear_distance=0, knowledge_distance=0):
+    """
+    Largest number of tiles per side of the unit square for these parameters. Tiles are
+    at least `halo + p` wide, where `halo = max(q, fear_distance, knowledge_distance) +
+    p`, so that every agent a tile needs on a day started the day in that tile or one of
+    its eight neighbors
+    :return: int
+    """
+    halo = max(q, fear_distance, knowledge_distance) + p
+    return max(1, math.floor(1 / (halo + p)))
+
+
+def _attach(layout):
+    """
+    numpy arrays on the shared memory blocks described by `layout`
+    :param layout: dictionary of (block name, shape, dtype) tuples
+    :return: dictionary of numpy arrays, with the same keys as `layout`
+    """
+    arrays = {}
+    for key, (name, shape, dtype) in layout.items():
+        if name not in _attached:
+            _attached[name] = shared_memory.SharedMemory(name=name)
+        arrays[key] = np.ndarray(shape, dtype=dtype, buffer=_attached[name].buf)
+    return arrays
+
+
+def _release(resources):
+    """
+    Shut down the worker processes and free the shared memory of a model
+    :return: None
+    """
+    if resources["executor"] is not None:
+        resources["executor"].shutdown()
+        resources["executor"] = None
+    for block in resources["blocks"]:
+        try:
+            block.close()
+        except BufferError:  # arrays on the block are still in use; they keep it alive
+            pass
+        block.unlink()
+    resources["blocks"] = []
+
+
+def _local_graph(params, positions, ids, candidates, r, lo, hi):
+    """
+    Find the agents within `r` of each of the agents `ids`, among the `candidates` in
+    the box [lo, hi]
+    :return: `NeighborGraph`, with agent ids as neighbors
+    """
+    empty = NeighborGraph(np.zeros(len(ids) + 1), np.zeros(0), np.zeros(0))
+    if len(ids) == 0:
+        return empty
+    points = positions[candidates]
+    keep = np.all((points >= lo) & (points <= hi), axis=1)
+    if not keep.any():
+        return empty
+    candidates = candidates[keep]
+    graph = make_index(params.spatial_index, points[keep], params.cell_size).query(
+        positions[ids], r
+    )
+    return NeighborGraph(graph.indptr, candidates[graph.indices], graph.distances)
+
+
+def _step_shared_tile(layout, *args):
+    """
+    Worker function: run `_step_tile` on the shared memory blocks described by `layout`
+    """
+    return _step_tile(_attach(layout), *args)
+
+
+def _step_tile(arrays, params, side, starts, tile, phase, seed, day):
+    """
+    Run one phase of one day on one tile
+    :param arrays: dictionary of the model's shared arrays
+    :param params: dictionary of model parameters, see `TiledSmartAgentModel._params`
+    :param side: number of tiles per side
+    :param starts: numpy array of the offsets of each tile's agents in `order`
+    :param tile: tile number, `side * column + row`
+    :param phase: `MOVE` or `INFECT`
+    :param seed: root `SeedSequence` of the model's random streams
+    :param day: day number
+    :return: None for `MOVE`, which writes the new positions of the tile's agents to
+    the shared `moved` array; for `INFECT` the output of `infect_contacts`
+    """
+    params = SimpleNamespace(**params)
+    rng = make_stream(seed, day, tile, phase)
+    order, positions, status = arrays["order"], arrays["positions"], arrays["status"]
+    owned = order[starts[tile] : starts[tile + 1]]
+    column, row = divmod(tile, side)
+    nearby = np.concatenate(
+        [
+            order[starts[side * cc + rr] : starts[side * cc + rr + 1]]
+            for cc in range(max(column - 1, 0), min(column + 2, side))
+            for rr in range(max(row - 1, 0), min(row + 2, side))
+        ]
+    )
+    lo = np.array([column, row]) / side
+    hi = (np.array([column, row]) + 1) / side
+
+    if phase == MOVE:
+        radius = max(params.fear_distance, params.knowledge_distance)
+        graph = None
+        if radius != 0:
+            graph = _local_graph(
+                params, positions, owned, nearby, radius, lo - radius, hi + radius
+            )
+        arrays["moved"][owned] = move_agents(
+            rng,
+            positions,
+            status,
+            arrays["scores"],
+            owned,
+            graph,
+            params,
+            masks=arrays["masks"],
+        )
+        return None
+    # The tile's infected agents have moved up to `p` out of it today
+    infectors = owned[status[owned] == INFECTED]
+    margin = params.q + params.p
+    graph = _local_graph(
+        params, positions, infectors, nearby, params.q, lo - margin, hi + margin
+    ).without(infectors)
+    return infect_contacts(rng, graph, infectors, status, params.prob_infect)
+
+
+class TiledSmartAgentModel(SmartAgentModel2D):
+    def __init__(self, *args, tiles=None, processes=None, seed=None, **kwargs):
+        """
+        Initialize a `TiledSmartAgentModel`. It takes the same parameters as
+        `SmartAgentModel2D` (except `verlet_skin`), and behaves the same way, but draws
+        its random numbers in a different order, so a run matches a serial run in
+        distribution rather than number for number
+        :param tiles: (optional) number of tiles per side of the unit square; defaults
+        to about four tiles per process, up to `max_tiles`
+        :param processes: (optional) number of worker processes; defaults to every core
+        available. With `processes=1` the tiles are stepped in this process
+        :param seed: (optional) root seed of the tiles' random streams; defaults to a
+        seed drawn from `rng`
+        :return: None
+        """
+        if kwargs.get("verlet_skin") is not None:
+            raise ValueError("TiledSmartAgentModel does not support verlet_skin")
+        self._resources = {"executor": None, "blocks": []}
+        self._layout, self._arrays = {}, {}
+        self._finalizer = weakref.finalize(self, _release, self._resources)
+        super().__init__(*args, **kwargs)
+        self.processes = available_cores() if processes is None else processes
+        limit = max_tiles(self.p, self.q, self.fear_distance, self.knowledge_distance)
+        if tiles is None:
+            tiles = min(math.ceil(math.sqrt(4 * self.processes)), limit)
+        elif not 1 <= tiles <= limit:
+            raise ValueError(
+                "tiles must be between 1 and {} for these distances, not {}".format(
+                    limit, tiles
+                )
+            )
+        self.tiles = tiles
+        self.seed = root_seed(int(self.rng.integers(2**63)) if seed is None else seed)
+        self._moved = self._allocate("moved", (self.size, 2))
+        self._status = self._allocate("status", self.size, np.uint8)
+        self._masks = self._allocate("masks", (3, self.size), bool)
+        self._order = self._allocate("order", self.size, np.int64)
+
+    def _allocate(self, name, shape, dtype=np.float64):
+        """
+        Allocate the per-agent array `name` in a new shared memory block
+        :return: numpy array
+        """
+        nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        block = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._resources["blocks"].append(block)
+        self._layout[name] = (block.name, shape, np.dtype(dtype).str)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array[...] = 0
+        self._arrays[name] = array
+        return array
+
+    def close(self):
+        """
+        Shut down the worker processes and free the shared memory. The model cannot be
+        stepped afterwards
+        :return: None
+        """
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _params(self):
+        """
+        The parameters the workers need, see `move_agents` and `infect_contacts`
+        :return: dictionary
+        """
+        names = (
+            "p",
+            "q",
+            "fear_distance",
+            "knowledge_distance",
+            "fear_threshold",
+            "knowledge_threshold",
+            "boundary",
+            "spatial_index",
+            "cell_size",
+            "prob_infect",
+        )
+        return {name: getattr(self, name) for name in names}
+
+    def _run(self, phase, starts):
+        """
+        Run `phase` of today on every tile holding agents, on the worker processes
+        :return: list of the outputs of `_step_tile`, in tile order
+        """
+        args = (self._params(), self.tiles, starts)
+        tiles = [
+            tile for tile in range(self.tiles**2) if starts[tile] < starts[tile + 1]
+        ]
+        seed, day = self.seed, self.days_passed
+        if self.processes == 1:
+            return [
+                _step_tile(self._arrays, *args, tile, phase, seed, day)
+                for tile in tiles
+            ]
+        if self._resources["executor"] is None:
+            self._resources["executor"] = ProcessPoolExecutor(
+                max_workers=self.processes
+            )
+        futures = [
+            self._resources["executor"].submit(
+                _step_shared_tile, self._layout, *args, tile, phase, seed, day
+            )
+            for tile in tiles
+        ]
+        return [future.result() for future in futures]
+
+    def step(self):
+        """
+        Simulate one day according to SIR model parameters, tile by tile, see
+        `SmartAgentModel2D.step`
+        :return: None
+        """
+        # Agents belong to the tile they start the day in
+        cells = np.minimum(
+            (self.positions * self.tiles).astype(np.int64), self.tiles - 1
+        )
+        tile_of = cells[:, 0] * self.tiles + cells[:, 1]
+        self._order[:] = np.argsort(tile_of, kind="stable")
+        starts = np.zeros(self.tiles**2 + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tile_of, minlength=self.tiles**2), out=starts[1:])
+
+        self._status[:] = self.status_codes()
+        # The tiles share one set of status masks, rather than each building its own
+        self._masks[:] = status_masks(self._status)
+        self._run(MOVE, starts)
+        self.positions[:] = self._moved
+
+        self._recover_share()
+
+        # Only those infected before this phase can infect others. "mesh" infections
+        # are one pass over the whole grid, done here
+        if self.infection == "mesh":
+            self._infect_contacts(*self._mesh_contacts())
+        else:
+            self._status[:] = self.status_codes()
+            results = self._run(INFECT, starts)
+            if results:
+                contacts, sources = (np.concatenate(parts) for parts in zip(*results))
+                self._infect_contacts(contacts, sources)
+
+        self.days_passed += 1
@@ -0,0 +1,196 @@
+"""
+Definitions of the `TrajectoryRecorder` and `Trajectory` classes, which store the
+positions and statuses of every agent over a run in chunked, memory-mapped files
+
+A trajectory is a directory holding `metadata.json`, `days.npy`, and for each chunk of
+`chunk_days` recorded days, `positions_<chunk>.npy` (chunk_days by size by 2) and
+`status_<chunk>.npy` (chunk_days by size, 0 = susceptible, 1 = infected, 2 = recovered)
+"""
+
+import os
+import json
+import numpy as np
+
+# Storage types for positions; uint16 stores positions in [0, 1] to within 1 / 65535
+POSITION_DTYPES = ("uint16", "float32")
+_UINT16_SCALE = np.iinfo(np.uint16).max
+
+
+def _chunk_file(path, name, chunk):
+    """
+    Name of the file holding chunk number `chunk` of the array `name`
+    """
+    return os.path.join(path, "{}_{:05d}.npy".format(name, chunk))
+
+
+class TrajectoryRecorder:
+    def __init__(self, path, size, position_dtype="uint16", stride=1, chunk_days=64):
+        """
+        Initialize a `TrajectoryRecorder`, writing to the directory `path`
+        :param path: directory to write to; it is created if needed
+        :param size: number of agents
+        :param position_dtype: (optional) "uint16" (quantized) or "float32"
+        :param stride: (optional) only record days which are a multiple of `stride`
+        :param chunk_days: (optional) number of recorded days per chunk file
+        :return: None
+        """
+        if position_dtype not in POSITION_DTYPES:
+            raise ValueError(
+                "position_dtype must be one of {}, not {}".format(
+                    POSITION_DTYPES, position_dtype
+                )
+            )
+        self.path, self.size = path, size
+        self.position_dtype = position_dtype
+        self.stride, self.chunk_days = stride, chunk_days
+        self.days = []
+        self.positions = self.status = None
+        os.makedirs(path, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _open_chunk(self, chunk):
+        """
+        Create the memory-mapped files of chunk number `chunk`
+        :return: None
+        """
+        self.flush()
+        self.positions = np.lib.format.open_memmap(
+            _chunk_file(self.path, "positions", chunk),
+            mode="w+",
+            dtype=self.position_dtype,
+            shape=(self.chunk_days, self.size, 2),
+        )
+        self.status = np.lib.format.open_memmap(
+            _chunk_file(self.path, "status", chunk),
+            mode="w+",
+            dtype=np.uint8,
+            shape=(self.chunk_days, self.size),
+        )
+
+    def record(self, day, positions, status):
+        """
+        Record the state of the model on `day`, if it falls on the stride
+        :param day: day number
+        :param positions: (number of agents) by 2 numpy array of positions in [0, 1]
+        :param status: numpy array of status codes
+        :return: True if the day was recorded
+        """
+        if day % self.stride != 0:
+            return False
+        chunk, row = divmod(len(self.days), self.chunk_days)
+        if row == 0:
+            self._open_chunk(chunk)
+        if self.position_dtype == "uint16":
+            self.positions[row] = np.rint(np.clip(positions, 0, 1) * _UINT16_SCALE)
+        else:
+            self.positions[row] = positions
+        self.status[row] = status
+        self.days.append(day)
+        return True
+
+    def flush(self):
+        """
+        Write any buffered data to disk
+        :return: None
+        """
+        for array in (self.positions, self.status):
+            if array is not None:
+                array.flush()
+
+    def close(self):
+        """
+        Flush the data, and write the metadata that `Trajectory` needs
+        :return: None
+        """
+        self.flush()
+        self.positions = self.status = None
+        np.save(
+            os.path.join(self.path, "days.npy"), np.array(self.days, dtype=np.int64)
+        )
+        metadata = {
+            "size": self.size,
+            "frames": len(self.days),
+            "position_dtype": self.position_dtype,
+            "stride": self.stride,
+            "chunk_days": self.chunk_days,
+        }
+        with open(os.path.join(self.path, "metadata.json"), "w") as f:
+            json.dump(metadata, f)
+
+
+class Trajectory:
+    def __init__(self, path):
+        """
+        Open the trajectory in the directory `path`. Nothing is read until it is needed,
+        and then only the chunk holding the requested day
+        :param path: directory written by a `TrajectoryRecorder`
+        :return: None
+        """
+        self.path = path
+        with open(os.path.join(path, "metadata.json")) as f:
+            self.metadata = json.load(f)
+        self.size = self.metadata["size"]
+        self.chunk_days = self.metadata["chunk_days"]
+        self.days = np.load(os.path.join(path, "days.npy"))
+        self._chunks = {}
+
+    def __len__(self):
+        return len(self.days)
+
+    def _chunk(self, name, frame):
+        """
+        Memory map of the chunk of array `name` holding `frame`, and the frame's row in it
+        """
+        if not 0 <= frame < len(self):
+            raise IndexError("frame {} out of range".format(frame))
+        chunk, row = divmod(frame, self.chunk_days)
+        if (name, chunk) not in self._chunks:
+            self._chunks[name, chunk] = np.load(
+                _chunk_file(self.path, name, chunk), mmap_mode="r"
+            )
+        return self._chunks[name, chunk], row
+
+    def frame_of(self, day):
+        """
+        Index of the frame recorded on `day`
+        """
+        frame = np.searchsorted(self.days, day)
+        if frame == len(self) or self.days[frame] != day:
+            raise KeyError("day {} was not recorded".format(day))
+        return int(frame)
+
+    def positions(self, frame):
+        """
+        (number of agents) by 2 numpy array of float positions in frame `frame`
+        """
+        chunk, row = self._chunk("positions", frame)
+        if self.metadata["position_dtype"] == "uint16":
+            return chunk[row] / _UINT16_SCALE
+        return np.asarray(chunk[row], dtype=np.float64)
+
+    def status(self, frame):
+        """
+        numpy array of the status codes in frame `frame`
+        """
+        chunk, row = self._chunk("status", frame)
+        return np.array(chunk[row])
+
+    def counts(self):
+        """
+        Number susceptible, infected and recovered in every frame, reading one chunk
+        at a time
+        :return: (number of frames) by 3 numpy array
+        """
+        result = np.zeros((len(self), 3), dtype=np.int64)
+        for start in range(0, len(self), self.chunk_days):
+            chunk, _ = self._chunk("status", start)
+            stop = min(start + self.chunk_days, len(self))
+            block = chunk[: stop - start]
+            for state in range(3):
+                result[start:stop, state] = np.sum(block == state, axis=1)
+        return result
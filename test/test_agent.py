@@ -5,6 +5,7 @@ import os
 import sys
 import random
 import unittest
+import numpy as np
 
 # Make an adjustment to where python will look for classes
 # Since this script can be run from within `/test`, a sibling
@@ -16,7 +17,13 @@ else:
 
 
 # Import `Agent` and `DiscreteAgentModel` classes.
-from agent import Agent, DiscreteAgentModel
+from agent import (
+    Agent,
+    DiscreteAgentModel,
+    ArrayAgentModel,
+    EnsembleAgentModel,
+    sample_contacts,
+)
 
 
 class TestDiscreteAgentModel(unittest.TestCase):
@@ -149,6 +156,194 @@ class TestDiscreteAgentModel(unittest.TestCase):
             self.assertTrue(return_shape[0] == t)
             self.assertTrue(return_shape[1] == 4)
 
+    def test_rng(self):
+        """
+        Two models given the same seed produce the same results
+        """
+        for model_class in [DiscreteAgentModel, ArrayAgentModel]:
+            M = model_class(2, 0.1, 500, initial_infect=5, rng=11)
+            N = model_class(2, 0.1, 500, initial_infect=5, rng=11)
+            self.assertTrue(np.all(M.step_t_days(20) == N.step_t_days(20)))
+        M = EnsembleAgentModel(2, 0.1, 500, 4, initial_infect=5, rng=11)
+        N = EnsembleAgentModel(2, 0.1, 500, 4, initial_infect=5, rng=11)
+        self.assertTrue(np.all(M.step_t_days(20) == N.step_t_days(20)))
+
+    def test_compartments(self):
+        """
+        The incrementally maintained compartments agree with a full rescan of the agents
+        """
+        b, k, size, initial_infect = 2, 0.1, 200, 5
+        M = DiscreteAgentModel(b, k, size, initial_infect=initial_infect)
+        for _ in range(20):
+            M.step()
+            self.assertTrue(M.check_compartments())
+            self.assertTrue(sum(M.summarize_model()[1:]) == size)
+
+        # Modifying an agent directly, behind the model's back, is caught by the check
+        M = DiscreteAgentModel(b, k, size)
+        M.agents[0].infect()
+        self.assertFalse(M.check_compartments())
+        M.categorize_agents()
+        self.assertTrue(M.check_compartments())
+
+
+class TestArrayAgentModel(unittest.TestCase):
+    """
+    Test the array-backed engine for the discrete agent model
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        pass
+
+    def test_init(self):
+        """
+        Test that the model starts with the requested number of infected agents,
+        stored as a compact int8 array
+        """
+        b, k, size = 2, 0.1, 1000
+        for initial_infect in [None, 1, 50]:
+            M = ArrayAgentModel(b, k, size, initial_infect=initial_infect)
+            n = 0 if initial_infect is None else initial_infect
+            self.assertTrue(M.status.dtype == np.int8)
+            self.assertTrue(M.status.shape == (size,))
+            self.assertTrue(M.summarize_model() == (0, size - n, n, 0))
+            self.assertTrue(len(M.infected) == n)
+
+    def test_exogenous_infect(self):
+        """
+        Test both parameterizations of `exogenous_infect`
+        """
+        b, k, size = 1, 0.2, 100
+        M = ArrayAgentModel(b, k, size)
+        M.exogenous_infect(n=10)
+        self.assertTrue(len(M.susceptible) == size - 10)
+        self.assertTrue(len(M.infected) == 10)
+
+        indices = random.sample(list(M.susceptible), k=20)
+        M.exogenous_infect(indices=indices)
+        self.assertTrue(set(indices).issubset(set(M.infected)))
+        self.assertTrue(len(M.infected) == 30)
+
+    def test_agent_views(self):
+        """
+        Agents are only views onto the status array, in both directions
+        """
+        M = ArrayAgentModel(1, 0.2, 10)
+        A = M.agents[3]
+        self.assertTrue(isinstance(A, Agent))
+        self.assertTrue(A.status() == (True, False, False))
+        M.exogenous_infect(indices=[3])
+        self.assertTrue(A.status() == (False, True, False))
+        A.recover()
+        self.assertTrue(M.status[3] == 2)
+        self.assertTrue(len(M.agents) == 10)
+
+    def test_step_t_days(self):
+        """
+        The population is conserved, the recovered count never decreases, and the
+        output has the same layout as `DiscreteAgentModel.step_t_days`
+        """
+        b, k, size, initial_infect = 2, 0.1, 1000, 5
+        M = ArrayAgentModel(b, k, size, initial_infect=initial_infect)
+        result = M.step_t_days(30)
+        self.assertTrue(result.shape == (30, 4))
+        self.assertTrue(M.days_passed == 29)
+        self.assertTrue(np.all(result[:, 1:].sum(axis=1) == size))
+        self.assertTrue(np.all(np.diff(result[:, 3]) >= 0))
+        M.reset()
+        self.assertTrue(M.summarize_model() == (0, size, 0, 0))
+
+    def test_compartments(self):
+        """
+        The infected set and recovered count agree with a full scan of `status`
+        """
+        M = ArrayAgentModel(3, 0.2, 1000, initial_infect=5)
+        for _ in range(20):
+            M.step()
+            self.assertTrue(M.check_compartments())
+        M.agents[int(M.recovered[0])].reset()
+        self.assertTrue(M.check_compartments())
+
+
+class TestEnsembleAgentModel(unittest.TestCase):
+    """
+    Test the replicate-batched engine for the discrete agent model
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        pass
+
+    def test_exogenous_infect(self):
+        """
+        Each replicate gets its own `n` infected agents, or exactly `indices`
+        """
+        M = EnsembleAgentModel(2, 0.1, 100, 8, initial_infect=5)
+        self.assertTrue(M.status.shape == (8, 100))
+        self.assertTrue(np.all(np.sum(M.status == 1, axis=1) == 5))
+        M.reset()
+        M.exogenous_infect(indices=[1, 2, 3])
+        self.assertTrue(np.all(M.status[:, [1, 2, 3]] == 1))
+        self.assertTrue(np.all(M.counts == [97, 3, 0]))
+
+    def test_step_t_days(self):
+        """
+        The output stacks one `step_t_days`-style array per replicate, and the
+        replicates evolve independently
+        """
+        replicates, days, size = 20, 30, 500
+        M = EnsembleAgentModel(2, 0.2, size, replicates, initial_infect=5)
+        result = M.step_t_days(days)
+        self.assertTrue(result.shape == (replicates, days, 4))
+        self.assertTrue(np.all(result[:, :, 0] == np.arange(days)))
+        self.assertTrue(np.all(result[:, :, 1:].sum(axis=2) == size))
+        self.assertTrue(np.all(np.diff(result[:, :, 3], axis=1) >= 0))
+        self.assertTrue(len(np.unique(result[:, 10, 1])) > 1)
+        # The running counts agree with the status array
+        for state in range(3):
+            counts = np.sum(M.status == state, axis=1)
+            self.assertTrue(np.all(counts == M.counts[:, state]))
+
+
+class TestSampleContacts(unittest.TestCase):
+    """
+    Test the batched contact sampling used by the agent models
+    """
+
+    def test_distinct(self):
+        """
+        Every infector meets `b` distinct agents, drawn from the whole population
+        """
+        rng = np.random.default_rng()
+        for size, b in [(10, 10), (100, 5), (1000, 1), (50, 0)]:
+            contacts = sample_contacts(rng, 500, size, b)
+            self.assertTrue(contacts.shape == (500, b))
+            self.assertTrue(np.all(contacts >= 0) and np.all(contacts < size))
+            for row in contacts:
+                self.assertTrue(len(set(row)) == b)
+
+    def test_uniform(self):
+        """
+        Every subset of contacts should be (roughly) equally likely
+        """
+        rng = np.random.default_rng()
+        contacts = np.sort(sample_contacts(rng, 60000, 4, 2), axis=1)
+        _, counts = np.unique(contacts, axis=0, return_counts=True)
+        self.assertTrue(len(counts) == 6)
+        self.assertTrue(np.all(np.abs(counts - 10000) < 500))
+
+    def test_too_many(self):
+        """
+        Like `random.sample`, asking for more contacts than agents is an error
+        """
+        with self.assertRaises(ValueError):
+            sample_contacts(np.random.default_rng(), 1, 3, 4)
+
 
 # Test `Agent` functionality
 class TestAgent(unittest.TestCase):
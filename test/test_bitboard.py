@@ -0,0 +1,158 @@
+"""
+Conduct unit tests for the bit-packed Conway engine
+"""
+import os
+import sys
+import unittest
+import numpy as np
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+import bitboard
+from bitboard import (
+    BitboardConwayModel,
+    from_bits,
+    life_step,
+    pack,
+    popcount,
+    set_bits,
+    unpack,
+    words_per_row,
+)
+from conway_agent import ConwayModel
+
+
+class TestPacking(unittest.TestCase):
+    """
+    Test the conversions between cells and words
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        self.rng = np.random.default_rng(0)
+
+    def test_round_trip(self):
+        for m, n in [(1, 1), (3, 64), (5, 65), (7, 200)]:
+            cells = self.rng.random((m, n)) < 0.5
+            words = pack(cells)
+            self.assertEqual(words.shape, (m, words_per_row(n)))
+            self.assertEqual(words.dtype, np.uint64)
+            np.testing.assert_array_equal(unpack(words, n), cells)
+            self.assertEqual(popcount(words), cells.sum())
+
+    def test_set_bits(self):
+        cells = self.rng.random((6, 130)) < 0.1
+        words = pack(cells)
+        flat = set_bits(words)
+        np.testing.assert_array_equal(flat, np.flatnonzero(unpack(words)))
+        np.testing.assert_array_equal(from_bits(flat, words.shape), words)
+
+
+class TestLifeStep(unittest.TestCase):
+    """
+    Test the bit-sliced game of life against `ConwayModel`
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        self.rng = np.random.default_rng(1)
+
+    def check(self, m, n, days=12):
+        alive = self.rng.random((m, n)) < 0.35
+        model = ConwayModel(m, n, 0, 0, grid=np.where(alive, 1, -1).astype(np.int8))
+        words = pack(alive)
+        for _ in range(days):
+            model.step_conway()
+            life_step(words, n)
+            np.testing.assert_array_equal(unpack(words, n), model.conway_grid)
+
+    def test_matches_conway_model(self):
+        for m, n in [(4, 5), (30, 64), (41, 130)]:
+            self.check(m, n)
+
+    def test_bands(self):
+        """
+        Boards split into several bands step the same as in one piece
+        """
+        band_words = bitboard.BAND_WORDS
+        bitboard.BAND_WORDS = 5
+        try:
+            self.check(40, 200)
+        finally:
+            bitboard.BAND_WORDS = band_words
+
+    def test_blinker(self):
+        words = pack([[0, 1, 0], [0, 1, 0], [0, 1, 0]])
+        life_step(words, 3)
+        np.testing.assert_array_equal(
+            unpack(words, 3), [[0, 0, 0], [1, 1, 1], [0, 0, 0]]
+        )
+
+
+class TestBitboardConwayModel(unittest.TestCase):
+    """
+    Test the `BitboardConwayModel` class
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        rng = np.random.default_rng(2)
+        codes = np.array([1, 2, 3, -1, -2, -3], dtype=np.int8)
+        shares = [0.3, 0.05, 0.05, 0.4, 0.1, 0.1]
+        self.grid = rng.choice(codes, size=(40, 150), p=shares)
+
+    def test_grid(self):
+        model = BitboardConwayModel(40, 150, 0.1, 0.5, self.grid)
+        np.testing.assert_array_equal(model.grid, self.grid)
+        reference = ConwayModel(40, 150, 0.1, 0.5, grid=self.grid)
+        self.assertEqual(model.summarize_model(), reference.summarize_model())
+
+    def test_deterministic(self):
+        """
+        Without randomness in who is infected and who recovers, the two engines agree
+        """
+        for p, k in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+            model = BitboardConwayModel(40, 150, k, p, self.grid, rng=0)
+            reference = ConwayModel(40, 150, k, p, grid=self.grid, rng=0)
+            np.testing.assert_array_equal(
+                model.step_t_days(10), reference.step_t_days(10)
+            )
+            np.testing.assert_array_equal(model.grid, reference.grid)
+
+    def test_matches_in_distribution(self):
+        grid = np.where(self.grid == 3, 1, self.grid)
+        curves = [
+            np.mean(
+                [engine(grid, seed).step_t_days(10)[-1, 1:] for seed in range(10)],
+                axis=0,
+            )
+            for engine in [
+                lambda g, s: ConwayModel(40, 150, 0.1, 0.3, grid=g, rng=s),
+                lambda g, s: BitboardConwayModel(40, 150, 0.1, 0.3, g, rng=s),
+            ]
+        ]
+        np.testing.assert_allclose(curves[0], curves[1], rtol=0.1)
+
+    def test_compartments(self):
+        model = BitboardConwayModel(40, 150, 0.2, 0.4, self.grid, rng=3)
+        model.step_t_days(5)
+        both = model.infected & model.recovered
+        self.assertEqual(popcount(both), 0)
+        _, s, i, r = model.summarize_model()
+        self.assertEqual(s + i + r, popcount(model.alive))
+
+
+if __name__ == "__main__":
+    unittest.main()
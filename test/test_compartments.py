@@ -0,0 +1,80 @@
+"""
+Conduct unit tests for `IndexSet`
+"""
+import os
+import sys
+import unittest
+import numpy as np
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from compartments import IndexSet
+
+
+class TestIndexSet(unittest.TestCase):
+    """
+    Test the `IndexSet` class against python's built in `set`
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        pass
+
+    def assertConsistent(self, S, expected):
+        """
+        The members, their positions and the length all have to agree
+        """
+        self.assertTrue(set(S) == expected)
+        self.assertTrue(len(S) == len(expected))
+        for pos in range(len(S)):
+            self.assertTrue(S.position[S[pos]] == pos)
+        self.assertTrue(np.count_nonzero(S.position >= 0) == len(expected))
+
+    def test_init(self):
+        """
+        Test initializing empty and non-empty sets
+        """
+        S = IndexSet(10)
+        self.assertConsistent(S, set())
+        S = IndexSet(10, [1, 5, 7])
+        self.assertConsistent(S, {1, 5, 7})
+        self.assertTrue(5 in S and 2 not in S and 10 not in S)
+
+    def test_add_remove(self):
+        """
+        Adding and removing single ids, including ones already (not) in the set
+        """
+        S = IndexSet(10)
+        for ii in [3, 4, 3, 9]:
+            S.add(ii)
+        self.assertConsistent(S, {3, 4, 9})
+        for ii in [3, 3, 0]:
+            S.remove(ii)
+        self.assertConsistent(S, {4, 9})
+
+    def test_many(self):
+        """
+        The vectorized methods match repeated single-id operations
+        """
+        rng = np.random.default_rng()
+        S = IndexSet(100)
+        expected = set()
+        for _ in range(200):
+            ids = rng.choice(100, size=rng.integers(0, 20), replace=False)
+            if rng.random() < 0.5:
+                S.add_many(ids)
+                expected |= set(ids.tolist())
+            else:
+                S.remove_many(ids)
+                expected -= set(ids.tolist())
+            self.assertConsistent(S, expected)
+        S.clear()
+        self.assertConsistent(S, set())
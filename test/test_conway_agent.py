@@ -164,3 +164,59 @@ class TestConwayModel(unittest.TestCase):
             result = C.step_t_days(d)
             self.assertTrue(result.shape[0] == d and result.shape[1] == 4)
             self.assertTrue(C.days_passed == d - 1)
+
+    def test_rng(self):
+        """
+        Two models given the same seed produce the same results
+        """
+        m, n = 10, 10
+        k, p = 0.2, 0.7
+        results = []
+        for _ in range(2):
+            agents = [ConwayAgent(ii, ii % 3 != 0) for ii in range(m * n)]
+            for agent in agents[::7]:
+                agent.infect()
+            results.append(ConwayModel(m, n, k, p, agents, rng=5).step_t_days(10))
+        self.assertTrue(np.all(results[0] == results[1]))
+
+    def test_grid(self):
+        """
+        A model built from a status grid matches one built from agents, and the agents
+        are views onto the grid
+        """
+        m, n = 10, 12
+        k, p = 0.2, 0.5
+        agents = [ConwayAgent(ii, ii % 3 != 0) for ii in range(m * n)]
+        for agent in agents[::5]:
+            agent.infect()
+        C = ConwayModel(m, n, k, p, agents, rng=2)
+        G = ConwayModel(m, n, k, p, grid=C.grid.copy(), rng=2)
+        self.assertTrue(np.all(C.step_t_days(10) == G.step_t_days(10)))
+        self.assertTrue(np.all(C.grid == G.grid))
+        self.assertTrue(len(C.agents) == m * n)
+        self.assertTrue(
+            [A.status() for A in C.agents] == list(C.agent_grid.ravel())
+        )
+        alive = [A.id for A in C.alive_agents]
+        self.assertTrue(alive == list(np.flatnonzero(C.conway_grid)))
+
+    def test_agent_views(self):
+        """
+        Changes made through the agents are changes to the grid, and dead agents keep
+        their state until they are born again
+        """
+        m, n = 4, 4
+        C = ConwayModel(m, n, 0.2, 0.5, grid=np.ones((m, n), dtype=np.int8))
+        A = C.agents[5]
+        A.infect()
+        self.assertTrue(C.agent_grid[1, 1] == 2)
+        A.kill()
+        self.assertTrue(C.agent_grid[1, 1] == 0 and A.i)
+        A.born()
+        self.assertTrue(C.agent_grid[1, 1] == 2)
+        self.assertTrue(C.summarize_model() == (0, 15, 1, 0))
+
+    def test_summarize_model(self):
+        grid = np.array([[1, 2, 3], [-1, -2, -3], [-1, 1, 1]], dtype=np.int8)
+        C = ConwayModel(3, 3, 0.2, 0.5, grid=grid)
+        self.assertTrue(C.summarize_model() == (0, 3, 1, 1))
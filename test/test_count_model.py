@@ -0,0 +1,139 @@
+"""
+Conduct unit tests for `GillespieModel` and `ChainBinomialModel`
+"""
+import os
+import sys
+import unittest
+import numpy as np
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from count_model import GillespieModel, ChainBinomialModel
+from agent import EnsembleAgentModel
+from ode import OdeSir
+
+
+class TestGillespieModel(unittest.TestCase):
+    """
+    Test the count-based stochastic engine
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        pass
+
+    def test_init(self):
+        """
+        Test initializing the class, including `NoneType`s for the optional parameters
+        """
+        for initial_infect in [None, 10]:
+            M = GillespieModel(2, 0.1, 1000, initial_infect=initial_infect)
+            n = 0 if initial_infect is None else initial_infect
+            self.assertTrue(M.summarize_model() == (0, 1000 - n, n, 0))
+            self.assertTrue(M.prob_infect == 1)
+        with self.assertRaises(ValueError):
+            GillespieModel(2, 0.1, 1000, method="euler")
+
+    def test_step_t_days(self):
+        """
+        Output has the same layout as `DiscreteAgentModel.step_t_days`, and the
+        population is conserved
+        """
+        for method in ["ssa", "tau"]:
+            M = GillespieModel(2, 0.2, 5000, initial_infect=20, method=method)
+            result = M.step_t_days(40)
+            self.assertTrue(result.shape == (40, 4))
+            self.assertTrue(M.days_passed == 39)
+            self.assertTrue(np.all(result[:, 0] == np.arange(40)))
+            self.assertTrue(np.all(result[:, 1:].sum(axis=1) == 5000))
+            self.assertTrue(np.all(result[:, 1:] >= 0))
+            self.assertTrue(np.all(np.diff(result[:, 3]) >= 0))
+
+    def test_rng(self):
+        """
+        Two models given the same seed produce the same results
+        """
+        for method in ["ssa", "tau"]:
+            M = GillespieModel(2, 0.2, 5000, initial_infect=20, method=method, rng=4)
+            N = GillespieModel(2, 0.2, 5000, initial_infect=20, method=method, rng=4)
+            self.assertTrue(np.all(M.step_t_days(20) == N.step_t_days(20)))
+
+    def test_mean_field(self):
+        """
+        For a large population, both methods follow the ODE model
+        """
+        size, b, k, i0 = 2 * 10 ** 5, 1, 0.25, 0.01
+        ode = OdeSir(i0, size, b, k)
+        s_ode = ode._infect(20).y[0][-1]
+        for method in ["ssa", "tau"]:
+            M = GillespieModel(b, k, size, initial_infect=int(i0 * size), method=method)
+            M.step_t_days(21)
+            self.assertTrue(abs(M.S / size - s_ode) < 0.02)
+
+    def test_large_population(self):
+        """
+        Tau-leaping handles a huge population in a small number of leaps
+        """
+        M = GillespieModel(2, 0.5, 10 ** 8, initial_infect=1000, method="tau")
+        result = M.step_t_days(60)
+        self.assertTrue(result[-1, 3] > 10 ** 7)
+        self.assertTrue(M.leaps + M.events < 10 ** 5)
+
+
+class TestChainBinomialModel(unittest.TestCase):
+    """
+    Test the chain-binomial engine
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        pass
+
+    def test_step_t_days(self):
+        """
+        With scalar parameters, the output has the same layout as
+        `DiscreteAgentModel.step_t_days`
+        """
+        M = ChainBinomialModel(2, 0.2, 1000, initial_infect=10)
+        result = M.step_t_days(30)
+        self.assertTrue(result.shape == (30, 4))
+        self.assertTrue(np.all(result[:, 0] == np.arange(30)))
+        self.assertTrue(np.all(result[:, 1:].sum(axis=1) == 1000))
+        self.assertTrue(np.all(np.diff(result[:, 3]) >= 0))
+        M.reset()
+        self.assertTrue(np.all(M.summarize_model() == [0, 990, 10, 0]))
+
+    def test_vectorized(self):
+        """
+        Array parameters and replicates are broadcast together
+        """
+        b = np.array([1, 2, 3]).reshape(3, 1)
+        k = np.array([0.1, 0.2])
+        M = ChainBinomialModel(b, k, 1000, initial_infect=10, replicates=5)
+        result = M.step_t_days(20)
+        self.assertTrue(result.shape == (5, 3, 2, 20, 4))
+        self.assertTrue(np.all(result[..., 1:].sum(axis=-1) == 1000))
+        # A bigger `b` makes for a bigger epidemic
+        final_r = result[:, :, 0, -1, 3].mean(axis=0)
+        self.assertTrue(final_r[0] < final_r[2])
+
+    def test_matches_agent_model(self):
+        """
+        The mean curves match those of the agent model
+        """
+        size, replicates = 5000, 300
+        M = ChainBinomialModel(2, 0.2, size, initial_infect=20, replicates=replicates)
+        E = EnsembleAgentModel(2, 0.2, size, replicates, initial_infect=20)
+        mean_m = M.step_t_days(30).mean(axis=0)
+        mean_e = E.step_t_days(30).mean(axis=0)
+        self.assertTrue(np.all(np.abs(mean_m - mean_e) < 0.03 * size))
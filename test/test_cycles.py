@@ -0,0 +1,157 @@
+"""
+Conduct unit tests for the cycle cache of the Conway layer
+"""
+import os
+import sys
+import unittest
+import numpy as np
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from conway_agent import ConwayModel
+from cycles import CycleCache
+
+
+def run(cache, state, steps, period=5, tail=3):
+    """
+    Walk a process that counts up to `tail`, then cycles with the given `period`,
+    through `cache`
+    :return: list of the states visited
+    """
+    states = []
+    for _ in range(steps):
+        states.append(int(state[0]))
+        cached = cache.lookup(state)
+        value = int(state[0]) + 1
+        if value >= tail + period:
+            value = tail
+        expected = np.array([value], dtype=np.uint8)
+        if cached is None:
+            cache.store(expected)
+        else:
+            np.testing.assert_array_equal(cached, expected)
+        state = expected
+    return states
+
+
+class TestCycleCache(unittest.TestCase):
+    """
+    Test the `CycleCache` class
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        self.start = np.array([0], dtype=np.uint8)
+
+    def test_detects_cycle(self):
+        cache = CycleCache(max_period=10)
+        run(cache, self.start, 20)
+        self.assertEqual(cache.start, 8)
+        self.assertEqual(cache.period, 5)
+        self.assertEqual(cache.misses, 8)
+        self.assertEqual(cache.hits, 12)
+        self.assertEqual(cache.stats()["hit_rate"], 12 / 20)
+
+    def test_period_too_long(self):
+        cache = CycleCache(max_period=4)
+        run(cache, self.start, 20)
+        self.assertIsNone(cache.period)
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(len(cache._pairs), 4)
+
+    def test_disabled(self):
+        cache = CycleCache(max_period=0)
+        run(cache, self.start, 20)
+        self.assertEqual(cache.stats()["misses"], 20)
+        self.assertEqual(len(cache._pairs), 0)
+
+    def test_leaves_cycle(self):
+        """
+        A state off the cycle drops it, though its known successor is still served,
+        and the cycle is found again later
+        """
+        cache = CycleCache(max_period=10)
+        run(cache, self.start, 12)
+        self.assertEqual(cache.period, 5)
+        np.testing.assert_array_equal(cache.lookup(np.array([1], dtype=np.uint8)), [2])
+        self.assertIsNone(cache.period)
+        run(cache, np.array([2], dtype=np.uint8), 12)
+        self.assertEqual(cache.period, 5)
+
+
+class TestConwayCycles(unittest.TestCase):
+    """
+    Test the cycle cache of `ConwayModel`
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        rng = np.random.default_rng(0)
+        codes = np.array([1, 2, -1], dtype=np.int8)
+        self.grid = rng.choice(codes, size=(40, 40), p=[0.35, 0.01, 0.64])
+
+    def test_blinker(self):
+        grid = np.full((5, 5), -1, dtype=np.int8)
+        grid[2, 1:4] = 1
+        model = ConwayModel(5, 5, 0, 0, grid=grid)
+        for _ in range(10):
+            model.step_conway()
+        self.assertEqual(model.cycle_cache.period, 2)
+        self.assertEqual(model.cycle_cache.hits, 8)
+        np.testing.assert_array_equal(model.grid, grid)
+
+    def test_same_results(self):
+        """
+        The cache changes nothing but the time taken, including the random numbers
+        """
+        cached = ConwayModel(40, 40, 0.1, 0.4, grid=self.grid, rng=3)
+        plain = ConwayModel(40, 40, 0.1, 0.4, grid=self.grid, rng=3, max_period=0)
+        np.testing.assert_array_equal(cached.step_t_days(600), plain.step_t_days(600))
+        np.testing.assert_array_equal(cached.grid, plain.grid)
+        self.assertGreater(cached.cycle_cache.hits, 0)
+        self.assertEqual(plain.cycle_cache.hits, 0)
+
+    def test_set_alive(self):
+        """
+        Agents brought to life from outside take the model off the cycle
+        """
+        model = ConwayModel(40, 40, 0, 0, grid=self.grid)
+        model.step_t_days(600)
+        self.assertIsNotNone(model.cycle_cache.period)
+        model.set_alive_agents(np.arange(0, 40 * 40, 7))
+        reference = ConwayModel(40, 40, 0, 0, grid=model.grid, max_period=0)
+        model.step_conway()
+        reference.step_conway()
+        np.testing.assert_array_equal(model.grid, reference.grid)
+        self.assertIsNone(model.cycle_cache.period)
+
+    def test_edit_before_cycle(self):
+        """
+        An agent born between two steps, before any cycle is found, is not replayed
+        """
+        grid = np.full((7, 7), -1, dtype=np.int8)
+        grid[3, 2:5] = 1
+        model = ConwayModel(7, 7, 0, 0, grid=grid)
+        model.step_conway()
+        model.agents[0].born()
+        reference = ConwayModel(7, 7, 0, 0, grid=model.grid, max_period=0)
+        for _ in range(6):
+            model.step_conway()
+            reference.step_conway()
+            np.testing.assert_array_equal(model.grid, reference.grid)
+        self.assertEqual(model.conway_grid.sum(), 3)
+        self.assertEqual(model.cycle_cache.period, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Conduct unit tests for `EventLog`
+"""
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from events import EventLog, UNKNOWN
+from smartagent import SmartAgentModel2D
+
+
+class TestEventLog(unittest.TestCase):
+    """
+    Test the event log, and its reconstruction of the model's history
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        pass
+
+    def test_small_log(self):
+        """
+        Rebuild statuses and counts from a handful of events
+        """
+        log = EventLog([0, 0, 1, 0])
+        log.record(1, [0], 1, [2])
+        log.record(2, [2], 2)
+        log.record(3, [0], 2)
+        log.record(3, [1, 3], 1, [0, 0])
+        self.assertEqual(len(log), 5)
+        self.assertTrue(np.array_equal(log.status_on(0), [0, 0, 1, 0]))
+        self.assertTrue(np.array_equal(log.status_on(2), [1, 0, 2, 0]))
+        self.assertTrue(np.array_equal(log.status_on(3), [2, 1, 2, 1]))
+        expected = [[0, 3, 1, 0], [1, 2, 2, 0], [2, 2, 1, 1], [3, 0, 2, 2]]
+        self.assertTrue(np.array_equal(log.counts(), expected))
+        self.assertTrue(np.array_equal(log.infector, [2, UNKNOWN, UNKNOWN, 0, 0]))
+
+    def test_matches_step_t_days(self):
+        """
+        The log of a model run rebuilds the dense output of `step_t_days`
+        """
+        first = SmartAgentModel2D(
+            0.05, 0.1, 0.2, 300, fear_distance=0.1, initial_infect=5, rng=6
+        )
+        second = SmartAgentModel2D(
+            0.05, 0.1, 0.2, 300, fear_distance=0.1, initial_infect=5, rng=6
+        )
+        log = first.start_event_log()
+        first.step_t_days(25)
+        summary, _, _, status = second.step_t_days(25)
+        self.assertTrue(np.array_equal(log.counts(25), summary))
+        for day in [0, 7, 24]:
+            self.assertTrue(np.array_equal(log.status_on(day), status[day]))
+        # Every agent changes status at most twice, and infections by other agents
+        # name an infector who was infected earlier
+        self.assertTrue(np.all(np.bincount(log.agent) <= 2))
+        infected = (log.state == 1) & (log.infector != UNKNOWN)
+        for day, infector in zip(log.day[infected], log.infector[infected]):
+            self.assertEqual(log.status_on(day - 1)[infector], 1)
+
+    def test_save_load(self):
+        """
+        A saved log loads back unchanged
+        """
+        model = SmartAgentModel2D(0.05, 0.1, 0.2, 100, initial_infect=3, rng=1)
+        log = model.start_event_log()
+        model.step_t_days(10)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "events.npz")
+            log.save(path)
+            loaded = EventLog.load(path)
+        for name in ["day", "agent", "state", "infector", "initial_status"]:
+            self.assertTrue(np.array_equal(getattr(log, name), getattr(loaded, name)))
+        self.assertTrue(np.array_equal(log.counts(10), loaded.counts(10)))
+
+
+if __name__ == "__main__":
+    unittest.main()
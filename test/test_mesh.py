@@ -0,0 +1,147 @@
+"""
+Conduct unit tests for the particle-mesh infection pressure
+"""
+import os
+import sys
+import unittest
+import numpy as np
+from sklearn.neighbors import BallTree
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from mesh import DiskMesh, bin_counts, disk_kernel
+from smartagent import SmartAgentModel2D
+from ode import SpatialSirOde
+
+
+class TestDiskMesh(unittest.TestCase):
+    """
+    Test the grid sums against exact neighbor counts
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        rng = np.random.default_rng(0)
+        self.points = rng.random((50000, 2))
+        self.queries = rng.random((500, 2))
+
+    def test_kernel_area(self):
+        kernel = disk_kernel(0.05, 100)
+        self.assertAlmostEqual(kernel.sum(), np.pi * 0.05**2 * 100**2, delta=0.5)
+        np.testing.assert_array_equal(kernel, kernel.T)
+        np.testing.assert_array_equal(kernel, kernel[::-1])
+
+    def test_deposit_conserves_weight(self):
+        mesh = DiskMesh(0.02, 64)
+        weights = np.arange(len(self.points), dtype=float)
+        self.assertAlmostEqual(
+            mesh.deposit(self.points, weights).sum(), weights.sum(), delta=1e-3
+        )
+        corners = np.array([[0.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+        self.assertAlmostEqual(mesh.deposit(corners).sum(), 3)
+
+    def test_sums_converge(self):
+        """
+        The mesh sums approach the exact counts as the grid gets finer
+        """
+        r = 0.03
+        tree = BallTree(self.points)
+        exact = np.array([len(ids) for ids in tree.query_radius(self.queries, r)])
+        errors = []
+        for size in [50, 200]:
+            estimate = DiskMesh(r, size).sums(self.points, None, self.queries)
+            errors.append(np.mean(np.abs(estimate - exact)))
+        self.assertLess(errors[1], errors[0])
+        self.assertLess(errors[1], 0.05 * exact.mean())
+
+    def test_empty(self):
+        mesh = DiskMesh(0.1, 10)
+        np.testing.assert_array_equal(mesh.sums(np.zeros((0, 2)), None, self.queries), 0)
+
+
+class TestMeshInfection(unittest.TestCase):
+    """
+    Test the "mesh" infection mode of `SmartAgentModel2D`
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        self.params = dict(
+            p=0.01, q=0.03, k=0.05, size=4000, initial_infect=20, prob_infect=0.05
+        )
+
+    def test_matches_neighbors(self):
+        """
+        The mean epidemic curve is close to the exact neighbor search's
+        """
+        curves = {}
+        for infection in ["neighbors", "mesh"]:
+            curves[infection] = np.mean(
+                [
+                    SmartAgentModel2D(
+                        rng=seed, infection=infection, **self.params
+                    ).run_days(15)[:, 1]
+                    for seed in range(6)
+                ],
+                axis=0,
+            )
+        infected = self.params["size"] - curves["neighbors"][-1]
+        self.assertGreater(infected, 500)
+        self.assertLess(
+            abs(curves["mesh"][-1] - curves["neighbors"][-1]), 0.1 * infected
+        )
+
+    def test_event_log(self):
+        model = SmartAgentModel2D(rng=1, infection="mesh", **self.params)
+        log = model.start_event_log()
+        summary = model.run_days(5)
+        np.testing.assert_array_equal(log.counts(5), summary)
+        self.assertTrue(model.check_compartments())
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            SmartAgentModel2D(infection="fft", **self.params)
+
+
+class TestToGrid(unittest.TestCase):
+    """
+    Test the bridge from agents to the grids of `SpatialSirOde`
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        self.model = SmartAgentModel2D(0.01, 0.03, 0.1, 3000, initial_infect=300, rng=2)
+
+    def test_shares(self):
+        grid = self.model.to_grid(10)
+        self.assertEqual(grid.shape, (3, 10, 10))
+        counts = bin_counts(self.model.positions, self.model.status_codes(), 10)
+        occupied = counts.sum(axis=0) > 0
+        np.testing.assert_allclose(grid.sum(axis=0)[occupied], 1)
+        self.assertAlmostEqual(
+            np.sum(grid[1] * counts.sum(axis=0)), len(self.model.infected)
+        )
+
+    def test_spatial_ode(self):
+        grid = self.model.to_grid(8)
+        ode = SpatialSirOde.from_grid(grid, 3000, 0.5, 0.1, 0.01)
+        np.testing.assert_array_equal(ode.s0, grid[0])
+        np.testing.assert_array_equal(ode.i0, grid[1])
+        np.testing.assert_array_equal(ode.start, grid[[0, 2, 1]])
+        self.assertEqual(ode.M, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Conduct unit tests for the movement kernels
+"""
+import os
+import sys
+import unittest
+import numpy as np
+from scipy.optimize import Bounds, minimize, NonlinearConstraint
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from movement import flee, random_steps, random_walk
+from smartagent import SmartAgentModel2D
+
+
+class TestRandomWalk(unittest.TestCase):
+    """
+    Test the vectorized random walk
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        self.rng = np.random.default_rng(0)
+        # Many agents in the corners and along the edges
+        self.positions = np.concatenate(
+            [self.rng.random((500, 2)), self.rng.random((500, 2)) * 0.02]
+        )
+
+    def test_boundaries(self):
+        """
+        Every policy keeps the agents in the unit square, and within `p` per axis
+        """
+        for boundary in ["reject", "reflect", "clamp"]:
+            new = random_walk(self.rng, self.positions, 0.1, boundary)
+            self.assertEqual(new.shape, self.positions.shape)
+            self.assertTrue(np.all((new >= 0) & (new <= 1)))
+            self.assertTrue(np.all(np.abs(new - self.positions) <= 0.1))
+
+    def test_reject(self):
+        """
+        Rejection sampling gives uniform steps: away from the edges the mean is 0, and
+        in the corner the accepted steps all point inwards
+        """
+        new = random_walk(self.rng, np.full((20000, 2), 0.5), 0.1)
+        self.assertTrue(np.all(np.abs(new.mean(axis=0) - 0.5) < 0.002))
+        new = random_walk(self.rng, np.zeros((1000, 2)), 0.1)
+        self.assertTrue(np.all(new >= 0))
+        self.assertTrue(np.all(np.abs(new.mean(axis=0) - 0.05) < 0.005))
+
+    def test_reflect_and_clamp(self):
+        """
+        Steps past an edge are reflected or stopped at the edge
+        """
+        start = np.zeros((2000, 2))
+        steps = random_steps(np.random.default_rng(1), 2000, 0.1)
+        reflected = random_walk(np.random.default_rng(1), start, 0.1, "reflect")
+        clamped = random_walk(np.random.default_rng(1), start, 0.1, "clamp")
+        self.assertTrue(np.allclose(reflected, np.abs(steps)))
+        self.assertTrue(np.allclose(clamped, np.maximum(steps, 0)))
+        rng = np.random.default_rng(1)
+        with self.assertRaises(ValueError):
+            random_walk(rng, start, 0.1, "wrap")
+
+    def test_model_positions(self):
+        """
+        Agents' positions are views into the model's array
+        """
+        M = SmartAgentModel2D(0.1, 0.1, 0.1, 50, initial_infect=2, boundary="reflect")
+        M.agents[3].pos[0] = 0.25
+        self.assertEqual(M.positions[3, 0], 0.25)
+        M.step()
+        self.assertTrue(np.array_equal(M.agents[3].pos, M.positions[3]))
+        self.assertTrue(np.all((M.positions >= 0) & (M.positions <= 1)))
+        with self.assertRaises(ValueError):
+            SmartAgentModel2D(0.1, 0.1, 0.1, 50, boundary="wrap")
+
+
+def optimizer_flee(pos, loc_nearby, p):
+    """
+    The optimizer that `SmartAgent.move` used to run for each fleeing agent
+    """
+
+    def f(x):
+        return -np.linalg.norm(x - loc_nearby)
+
+    def cons_f(x):
+        return [np.linalg.norm(x - pos)]
+
+    cons = NonlinearConstraint(cons_f, -np.inf, p)
+    return minimize(f, x0=pos, constraints=cons, bounds=Bounds([0, 0], [1, 1])).x
+
+
+class TestFlee(unittest.TestCase):
+    """
+    Test the batched flee solver against the optimizer it replaces
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        self.rng = np.random.default_rng(2)
+
+    def test_against_optimizer(self):
+        """
+        The solver's move is feasible, and at least as far from the threats as the
+        optimizer's (which may stop at a local optimum near the corners)
+        """
+        p = 0.1
+        positions = np.concatenate(
+            [self.rng.random((60, 2)), self.rng.random((60, 2)) * 0.1]
+        )
+        threats = [
+            pos + self.rng.normal(0, 0.05, size=(self.rng.integers(1, 5), 2))
+            for pos in positions
+        ]
+        centroids = np.array([loc.mean(axis=0) for loc in threats])
+        new = flee(positions, centroids, p)
+        self.assertTrue(np.all((new >= 0) & (new <= 1)))
+        self.assertTrue(np.all(np.linalg.norm(new - positions, axis=1) <= p + 1e-9))
+        agree = 0
+        for pos, loc, ours in zip(positions, threats, new):
+            theirs = optimizer_flee(pos, loc, p)
+            objective = lambda x: np.linalg.norm(x - loc)
+            self.assertTrue(objective(ours) >= objective(theirs) - 1e-6)
+            agree += np.linalg.norm(ours - theirs) < 1e-3
+        # Away from the corners they find the same point
+        self.assertTrue(agree >= 0.8 * len(positions))
+
+    def test_corner(self):
+        """
+        An agent cornered by a threat escapes along an edge, rather than into the corner
+        """
+        new = flee([[0.02, 0.02]], [[0.05, 0.04]], 0.1)
+        self.assertTrue(np.allclose(new[0], [0, 0.02 + np.sqrt(0.01 - 0.02**2)]))
+
+    def test_no_direction(self):
+        """
+        An agent on top of its threats' centroid stays put
+        """
+        new = flee([[0.5, 0.5]], [[0.5, 0.5]], 0.1)
+        self.assertTrue(np.array_equal(new, [[0.5, 0.5]]))
+
+
+if __name__ == "__main__":
+    unittest.main()
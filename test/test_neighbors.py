@@ -0,0 +1,172 @@
+"""
+Conduct unit tests for `NeighborGraph`
+"""
+import os
+import sys
+import unittest
+import numpy as np
+from sklearn.neighbors import BallTree
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from neighbors import NeighborGraph, CellListIndex, VerletList, make_index
+
+
+def brute_force(points, queries, r):
+    """
+    Sorted neighbor ids within `r` of each query, by checking every pair
+    """
+    dist = np.linalg.norm(queries[:, None, :] - points[None, :, :], axis=2)
+    return [np.flatnonzero(row <= r) for row in dist]
+
+
+class TestNeighborGraph(unittest.TestCase):
+    """
+    Test the batched radius neighborhoods
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        self.rng = np.random.default_rng(0)
+        self.points = self.rng.random((300, 2))
+        self.graph = NeighborGraph.from_balltree(
+            BallTree(self.points), self.points, 0.1
+        )
+
+    def test_from_balltree(self):
+        """
+        The neighborhoods match a brute force search
+        """
+        expected = brute_force(self.points, self.points, 0.1)
+        self.assertEqual(len(self.graph), 300)
+        for ii in range(300):
+            self.assertTrue(
+                np.array_equal(np.sort(self.graph.neighbors(ii)), expected[ii])
+            )
+
+    def test_within(self):
+        """
+        Shrinking the radius matches a new query
+        """
+        graph = self.graph.within(0.05)
+        expected = brute_force(self.points, self.points, 0.05)
+        for ii in range(300):
+            self.assertTrue(np.array_equal(np.sort(graph.neighbors(ii)), expected[ii]))
+
+    def test_count(self):
+        """
+        Count the flagged neighbors of each point, and drop the points themselves
+        """
+        mask = self.rng.random(300) < 0.3
+        counts = self.graph.count(mask)
+        for ii in range(300):
+            self.assertEqual(counts[ii], mask[self.graph.neighbors(ii)].sum())
+        graph = self.graph.without(np.arange(300))
+        self.assertTrue(np.array_equal(graph.degree(), self.graph.degree() - 1))
+
+    def test_sample(self):
+        """
+        Samples are distinct neighbors, `ceil(prob * degree)` of them per query
+        """
+        rows, picks = self.graph.sample(self.rng, 0.3)
+        num = np.ceil(self.graph.degree() * 0.3)
+        self.assertTrue(np.array_equal(np.bincount(rows, minlength=300), num))
+        for ii in range(300):
+            mine = picks[rows == ii]
+            self.assertEqual(len(np.unique(mine)), len(mine))
+            self.assertTrue(np.all(np.isin(mine, self.graph.neighbors(ii))))
+
+    def test_empty(self):
+        """
+        No queries gives an empty graph
+        """
+        graph = NeighborGraph.from_balltree(BallTree(self.points), np.zeros((0, 2)), 1)
+        self.assertEqual(len(graph), 0)
+        rows, picks = graph.sample(self.rng, 0.5)
+        self.assertEqual(len(picks), 0)
+
+
+class TestSpatialIndexes(unittest.TestCase):
+    """
+    Test the spatial index backends
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        self.rng = np.random.default_rng(1)
+
+    def test_backends_agree(self):
+        """
+        Every backend finds the same neighborhoods as a brute force search
+        """
+        points = self.rng.random((500, 2))
+        queries = self.rng.random((100, 2)) * 1.2 - 0.1
+        for r in [0.01, 0.05, 0.3]:
+            expected = brute_force(points, queries, r)
+            for name in ["balltree", "cells"]:
+                graph = make_index(name, points, 0.05).query(queries, r)
+                for ii in range(100):
+                    found = np.sort(graph.neighbors(ii))
+                    self.assertTrue(np.array_equal(found, expected[ii]))
+
+    def test_cell_list_blocks(self):
+        """
+        Splitting the queries into blocks does not change the result
+        """
+        points = self.rng.random((400, 2))
+        index = CellListIndex(points, 0.1)
+        whole = index.query(points, 0.1)
+        blocked = index.query(points, 0.1, block_size=7)
+        self.assertTrue(np.array_equal(whole.indptr, blocked.indptr))
+        self.assertTrue(np.array_equal(whole.indices, blocked.indices))
+        self.assertTrue(np.allclose(whole.distances, blocked.distances))
+
+    def test_take(self):
+        """
+        Selecting rows keeps their neighborhoods
+        """
+        points = self.rng.random((200, 2))
+        graph = make_index("cells", points, 0.1).query(points, 0.1)
+        rows = np.array([5, 3, 199, 3])
+        taken = graph.take(rows)
+        for ii, row in enumerate(rows):
+            self.assertTrue(np.array_equal(taken.neighbors(ii), graph.neighbors(row)))
+
+    def test_verlet_list(self):
+        """
+        The Verlet list gives the same neighborhoods as a fresh query, and is only
+        rebuilt once the points have moved more than half the skin
+        """
+        points = self.rng.random((300, 2))
+        verlet = VerletList("cells", 0.05, 0.05, 0.04)
+        for day in range(10):
+            for r, rows in [(0.05, None), (0.03, np.arange(0, 300, 7))]:
+                graph = verlet.query(points, r, rows)
+                queries = points if rows is None else points[rows]
+                expected = brute_force(points, queries, r)
+                for ii in range(len(queries)):
+                    found = np.sort(graph.neighbors(ii))
+                    self.assertTrue(np.array_equal(found, expected[ii]))
+            points = points + self.rng.uniform(-0.005, 0.005, size=points.shape)
+        self.assertTrue(1 < verlet.builds < 10)
+
+    def test_unknown_backend(self):
+        """
+        An unknown name raises a `ValueError`
+        """
+        with self.assertRaises(ValueError):
+            make_index("octree", np.zeros((1, 2)), 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Conduct unit tests for `NetworkAgentModel`
+"""
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+import networkx as nx
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from network_agent import NetworkAgentModel, adjacency_from_edges
+
+
+class TestNetworkAgentModel(unittest.TestCase):
+    """
+    Test the contact-network agent model
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        pass
+
+    def test_adjacency_from_edges(self):
+        """
+        Edges are symmetrized, and duplicates and self loops dropped
+        """
+        adjacency = adjacency_from_edges([0, 1, 1, 2], [1, 0, 2, 2], size=4)
+        self.assertEqual(adjacency.shape, (4, 4))
+        expected = np.zeros((4, 4))
+        expected[0, 1] = expected[1, 0] = expected[1, 2] = expected[2, 1] = 1
+        self.assertTrue(np.array_equal(adjacency.toarray(), expected))
+
+    def test_from_networkx(self):
+        """
+        The model takes its size from the graph
+        """
+        graph = nx.watts_strogatz_graph(200, 4, 0.1, seed=0)
+        sim = NetworkAgentModel.from_networkx(graph, 0.1, 0.5, 5, rng=0)
+        self.assertEqual(sim.size, 200)
+        self.assertEqual(sim.adjacency.nnz, 2 * graph.number_of_edges())
+        self.assertEqual(sim.summarize_model(), (0, 195, 5, 0))
+
+    def test_from_edgelist(self):
+        """
+        Read a contact network from a text file
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "edges.txt")
+            with open(path, "w") as f:
+                f.write("# a path\n0 1\n1 2\n2 3\n")
+            sim = NetworkAgentModel.from_edgelist(path, 0.1, rng=0)
+        self.assertEqual(sim.size, 4)
+        self.assertEqual(sim.adjacency.nnz, 6)
+
+    def test_spread_follows_edges(self):
+        """
+        With certain transmission, infection moves one hop along a path each day
+        """
+        size = 10
+        adjacency = adjacency_from_edges(np.arange(size - 1), np.arange(1, size))
+        sim = NetworkAgentModel(adjacency, 0, 1, rng=0)
+        sim.exogenous_infect(indices=[0])
+        for day in range(1, 4):
+            sim.step()
+            self.assertEqual(sorted(sim.infected), list(range(day + 1)))
+
+    def test_isolated_agents(self):
+        """
+        Agents without contacts are never infected
+        """
+        adjacency = adjacency_from_edges([0], [1], size=5)
+        sim = NetworkAgentModel(adjacency, 0.5, 1, rng=0)
+        sim.exogenous_infect(indices=[0])
+        sim.step_t_days(10)
+        self.assertTrue(np.all(sim.status[2:] == 0))
+
+    def test_step_t_days(self):
+        """
+        The population is conserved, and no agent is lost
+        """
+        graph = nx.barabasi_albert_graph(500, 3, seed=1)
+        sim = NetworkAgentModel.from_networkx(graph, 0.2, 0.3, 10, rng=1)
+        result = sim.step_t_days(30)
+        self.assertEqual(result.shape, (30, 4))
+        self.assertTrue(np.all(result[:, 1:].sum(axis=1) == 500))
+        self.assertTrue(np.all(np.diff(result[:, 3]) >= 0))
+        self.assertTrue(sim.check_compartments())
+
+    def test_rng(self):
+        """
+        The same seed gives the same epidemic
+        """
+        graph = nx.watts_strogatz_graph(300, 6, 0.2, seed=2)
+        first = NetworkAgentModel.from_networkx(graph, 0.1, 0.4, 3, rng=7)
+        second = NetworkAgentModel.from_networkx(graph, 0.1, 0.4, 3, rng=7)
+        self.assertTrue(np.array_equal(first.step_t_days(20), second.step_t_days(20)))
+
+
+if __name__ == "__main__":
+    unittest.main()
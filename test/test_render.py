@@ -0,0 +1,90 @@
+"""
+Conduct unit tests for the raster renderer
+"""
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+import matplotlib
+
+matplotlib.use("Agg")
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from matplotlib import pyplot as plt
+from render import composite, density, draw, plot_snapshots
+from smartagent import SmartAgentModel2D
+from trajectory import Trajectory
+
+
+class TestRender(unittest.TestCase):
+    """
+    Test the density rasters and the figures drawn from them
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        rng = np.random.default_rng(0)
+        self.positions = rng.random((5000, 2))
+        self.status = rng.integers(0, 3, 5000)
+
+    def tearDown(self):
+        plt.close("all")
+
+    def test_density_matches_histogram2d(self):
+        rasters = density(self.positions, self.status, bins=16)
+        self.assertEqual(rasters.shape, (3, 16, 16))
+        for state in range(3):
+            points = self.positions[self.status == state]
+            expected, _, _ = np.histogram2d(
+                points[:, 1], points[:, 0], bins=16, range=[[0, 1], [0, 1]]
+            )
+            np.testing.assert_array_equal(rasters[state], expected)
+
+    def test_density_edges(self):
+        """
+        Agents on the far edges land in the last pixel
+        """
+        rasters = density([[1.0, 1.0], [0.0, 1.0]], [1, 2], bins=4)
+        self.assertEqual(rasters[1, 3, 3], 1)
+        self.assertEqual(rasters[2, 3, 0], 1)
+        self.assertEqual(rasters.sum(), 2)
+
+    def test_composite(self):
+        rasters = np.zeros((3, 2, 2))
+        rasters[1, 0, 0] = 1
+        rasters[0, 1, 1] = 100
+        image = composite(rasters, alpha=0.5)
+        np.testing.assert_allclose(image[0, 1], [1, 1, 1])
+        np.testing.assert_allclose(image[0, 0], [1, 0.5, 0.5])
+        np.testing.assert_allclose(image[1, 1], [0, 0, 1], atol=1e-12)
+
+    def test_draw(self):
+        fig, ax = plt.subplots()
+        draw(ax, self.positions, self.status)
+        self.assertEqual(len(ax.images), 1)
+        draw(ax, self.positions, self.status, mode="scatter")
+        self.assertEqual(len(ax.collections), 1)
+        with self.assertRaises(ValueError):
+            draw(ax, self.positions, self.status, mode="hexbin")
+
+    def test_plot_snapshots(self):
+        with tempfile.TemporaryDirectory() as path:
+            model = SmartAgentModel2D(0.05, 0.1, 0.1, 300, initial_infect=5, rng=2)
+            model.record_t_days(6, path)
+            fig = plot_snapshots(Trajectory(path), [0, 2, 5], bins=32)
+        self.assertEqual(len(fig.axes), 4)
+        self.assertEqual(fig.axes[2].get_title(), "state at t = 6")
+
+
+if __name__ == "__main__":
+    unittest.main()
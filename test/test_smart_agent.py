@@ -194,6 +194,157 @@ class TestSmartAgentModel2D(unittest.TestCase):
             self.assertTrue(return_shape_SIR[0] == t)
             self.assertTrue(return_shape_SIR[1] == 4)
 
+    def test_rng(self):
+        """
+        Two models given the same seed produce the same results
+        """
+        p, q, k, size, initial_infect = 0.1, 0.1, 0.1, 100, 5
+        results = []
+        for _ in range(2):
+            M = SmartAgentModel2D(
+                p, q, k, size, fear_distance=0.2, initial_infect=initial_infect, rng=3
+            )
+            results.append(M.step_t_days(5))
+        for first, second in zip(*results):
+            self.assertTrue(np.all(first == second))
+
+    def test_spatial_index(self):
+        """
+        The model runs with every spatial index, and rejects unknown ones
+        """
+        p, q, k, size, initial_infect = 0.1, 0.1, 0.1, 100, 5
+        for name in ["balltree", "cells"]:
+            M = SmartAgentModel2D(
+                p,
+                q,
+                k,
+                size,
+                fear_distance=0.2,
+                knowledge_distance=0.2,
+                initial_infect=initial_infect,
+                spatial_index=name,
+            )
+            result = M.step_t_days(5)[0]
+            self.assertTrue(np.all(result[:, 1:].sum(axis=1) == size))
+        with self.assertRaises(ValueError):
+            SmartAgentModel2D(p, q, k, size, spatial_index="octree")
+
+    def test_verlet_skin(self):
+        """
+        With a Verlet list, the neighbor list is reused across days
+        """
+        p, q, k, size, initial_infect = 0.01, 0.1, 0.1, 100, 5
+        M = SmartAgentModel2D(
+            p,
+            q,
+            k,
+            size,
+            fear_distance=0.2,
+            initial_infect=initial_infect,
+            verlet_skin=0.1,
+        )
+        result = M.step_t_days(10)[0]
+        self.assertTrue(np.all(result[:, 1:].sum(axis=1) == size))
+        self.assertTrue(M.verlet.builds < 10)
+
+    def test_compartments(self):
+        """
+        The incrementally maintained compartments agree with a full rescan of the agents
+        """
+        p, q, k, size, initial_infect = 0.1, 0.1, 0.1, 100, 5
+        M = SmartAgentModel2D(p, q, k, size, initial_infect=initial_infect)
+        for _ in range(5):
+            M.step()
+            self.assertTrue(M.check_compartments())
+
+    def test_nearby_agents(self):
+        """
+        Every agent within `r` of a source is flagged, and far fewer than all agents
+        """
+        rng = np.random.default_rng(0)
+        positions = rng.random((5000, 2))
+        sources = np.zeros(5000, dtype=bool)
+        sources[:5] = True
+        r = 0.03
+        flagged = nearby_agents(positions, sources, r)
+        gaps = positions[:, None, :] - positions[None, sources, :]
+        within = np.any(np.sum(gaps**2, axis=2) <= r * r, axis=1)
+        self.assertTrue(np.all(flagged[within]))
+        self.assertLess(flagged.sum(), 0.1 * len(positions))
+
+    def test_status_masks(self):
+        """
+        Moving agents with shared status masks is the same as building them
+        """
+        M = SmartAgentModel2D(
+            0.02, 0.05, 0.1, 500, fear_distance=0.1, knowledge_distance=0.1, rng=4
+        )
+        M.exogenous_infect(n=100)
+        M.step()
+        status = M.status_codes()
+        masks = status_masks(status)
+        self.assertTrue(np.all(masks.sum(axis=0) == 1))
+        self.assertTrue(np.all(masks[status, np.arange(500)]))
+        ids = np.arange(0, 500, 3)
+        graph = M._neighbors(M.positions, 0.1, ids)
+        moves = []
+        for shared in [None, masks]:
+            moves.append(
+                move_agents(
+                    np.random.default_rng(1),
+                    M.positions,
+                    status,
+                    M.scores.copy(),
+                    ids,
+                    graph,
+                    M,
+                    masks=shared,
+                )
+            )
+        self.assertTrue(np.all(moves[0] == moves[1]))
+
+    def test_zero_distance(self):
+        """
+        With `q=0` no one is infected, and tiny distances do not build huge grids
+        """
+        positions = np.random.default_rng(1).random((100, 2))
+        sources = np.arange(100) < 3
+        for r in [0, 1e-12]:
+            flagged = nearby_agents(positions, sources, r)
+            self.assertTrue(np.all(flagged[sources]))
+        M = SmartAgentModel2D(0.01, 0, 0.05, 1000, initial_infect=5, rng=1)
+        summary = M.step_t_days(3)[0][:, 2:4]
+        self.assertTrue(np.all(summary[:, 0] + summary[:, 1] == 5))
+
+    def test_active_set(self):
+        """
+        Without movement, fear, knowledge and (with `prob_infect=1`) infections are
+        deterministic, and must not depend on the active set
+        """
+        models = [
+            SmartAgentModel2D(
+                0,
+                0.03,
+                0,
+                2000,
+                fear_distance=0.05,
+                knowledge_distance=0.04,
+                prob_infect=1,
+                initial_infect=3,
+                rng=6,
+                active_set=active_set,
+            )
+            for active_set in [False, True]
+        ]
+        for _ in range(4):
+            for M in models:
+                M.step()
+            self.assertTrue(
+                np.all(models[0].status_codes() == models[1].status_codes())
+            )
+            self.assertTrue(np.all(models[0].scores == models[1].scores))
+        self.assertTrue(0 < len(models[1].infected) < 2000)
+
 
 # Test `SmartAgent` functionality
 class TestSmartAgent(unittest.TestCase):
@@ -0,0 +1,104 @@
+"""
+Conduct unit tests for the tiled, sparse Conway engine
+"""
+import os
+import sys
+import unittest
+import numpy as np
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from conway_agent import ConwayModel
+from sparse_conway import SparseConwayModel
+
+
+class TestSparseConwayModel(unittest.TestCase):
+    """
+    Test the `SparseConwayModel` class against `ConwayModel`
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        rng = np.random.default_rng(0)
+        codes = np.array([1, 2, 3, -1, -2, -3], dtype=np.int8)
+        shares = [0.3, 0.01, 0.05, 0.5, 0.04, 0.1]
+        self.grid = rng.choice(codes, size=(50, 90), p=shares)
+
+    def test_deterministic(self):
+        """
+        Without randomness in who is infected and who recovers, the two engines agree,
+        whatever the size of the tiles
+        """
+        for tile in [4, 7, 64]:
+            for p, k in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+                model = SparseConwayModel(50, 90, k, p, grid=self.grid, tile=tile)
+                reference = ConwayModel(50, 90, k, p, grid=self.grid)
+                np.testing.assert_array_equal(
+                    model.step_t_days(30), reference.step_t_days(30)
+                )
+                np.testing.assert_array_equal(model.grid, reference.grid)
+
+    def test_matches_in_distribution(self):
+        curves = [
+            np.mean(
+                [engine(seed).step_t_days(15)[-1, 1:] for seed in range(10)], axis=0
+            )
+            for engine in [
+                lambda s: ConwayModel(50, 90, 0.1, 0.3, grid=self.grid, rng=s),
+                lambda s: SparseConwayModel(
+                    50, 90, 0.1, 0.3, grid=self.grid, rng=s, tile=8
+                ),
+            ]
+        ]
+        np.testing.assert_allclose(curves[0], curves[1], rtol=0.15)
+
+    def test_counts(self):
+        model = SparseConwayModel(50, 90, 0.2, 0.4, grid=self.grid, rng=1, tile=16)
+        for _ in range(10):
+            model.step()
+            reference = ConwayModel(50, 90, 0, 0, grid=model.grid)
+            self.assertEqual(
+                model.summarize_model()[1:], reference.summarize_model()[1:]
+            )
+
+    def test_quiet_tiles(self):
+        """
+        Still lifes with no infection leave every tile quiet after one generation
+        """
+        grid = np.full((32, 32), -1, dtype=np.int8)
+        grid[4:6, 4:6] = 1
+        grid[20:22, 25:27] = 3
+        model = SparseConwayModel(32, 32, 0.1, 0.5, grid=grid, tile=8)
+        self.assertTrue(model.changed_tiles.all())
+        model.step()
+        self.assertFalse(model.changed_tiles.any())
+        self.assertFalse(model.infected_tiles.any())
+        np.testing.assert_array_equal(model.grid, grid)
+
+    def test_refresh(self):
+        grid = np.full((16, 16), -1, dtype=np.int8)
+        grid[4:6, 4:6] = 1
+        model = SparseConwayModel(16, 16, 0, 1, grid=grid, tile=4)
+        model.step()
+        model.agents[4 * 16 + 4].kill()
+        model.refresh()
+        model.step()
+        self.assertEqual(model.summarize_model()[1:], (0, 4, 0))
+
+    def test_set_alive_agents(self):
+        model = SparseConwayModel(10, 10, 0, 0, grid=self.grid[:10, :10], tile=4)
+        model.set_alive_agents([0, 1, 2])
+        model.step()
+        np.testing.assert_array_equal(np.flatnonzero(model.conway_grid), [1, 11])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Conduct unit tests for `StreamingMixin.iter_days`
+"""
+import os
+import sys
+import unittest
+import numpy as np
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from streaming import make_stop_condition
+from agent import DiscreteAgentModel, EnsembleAgentModel
+from smartagent import SmartAgentModel2D
+from conway_agent import ConwayModel, ConwayAgent
+from sweep import ParameterSweep
+
+
+def make_conway(seed):
+    """
+    A 20 by 20 `ConwayModel` with a random initial state
+    """
+    rng = np.random.default_rng(seed)
+    agents = []
+    for ii in range(400):
+        agents.append(ConwayAgent(ii, bool(rng.random() < 0.4)))
+        if rng.random() < 0.1:
+            agents[ii].infect()
+    return ConwayModel(20, 20, 0.1, 0.5, agents, rng=seed)
+
+
+class TestStreaming(unittest.TestCase):
+    """
+    Test the day by day generator API
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        pass
+
+    def test_same_as_step_t_days(self):
+        """
+        Without stopping or skipping, the summaries match `step_t_days`
+        """
+        first = DiscreteAgentModel(5, 0.1, 300, 0.3, 5, rng=0)
+        second = DiscreteAgentModel(5, 0.1, 300, 0.3, 5, rng=0)
+        streamed = np.array(list(first.iter_days(40)))
+        self.assertTrue(np.array_equal(streamed, second.step_t_days(40)))
+
+        first, second = make_conway(1), make_conway(1)
+        streamed = first.run_days(15)
+        self.assertTrue(np.array_equal(streamed, second.step_t_days(15)))
+
+    def test_extinction(self):
+        """
+        The run stops on the first day without infected agents
+        """
+        sim = DiscreteAgentModel(1, 0.5, 200, 0.1, 3, rng=2)
+        result = sim.run_days(stop="extinction")
+        self.assertEqual(result[-1, 2], 0)
+        self.assertTrue(np.all(result[:-1, 2] > 0))
+        self.assertEqual(result[-1, 0], sim.days_passed)
+
+    def test_stride(self):
+        """
+        Only every `stride`th day is yielded, plus the last one
+        """
+        sim = DiscreteAgentModel(5, 0.1, 300, 0.3, 5, rng=0)
+        days = [summary[0] for summary in sim.iter_days(30, stride=7)]
+        self.assertEqual(days, [0, 7, 14, 21, 28, 29])
+
+    def test_predicate(self):
+        """
+        A function of the summary can end the run
+        """
+        sim = SmartAgentModel2D(
+            0.1, 0.1, 0.1, 40, prob_infect=0.5, initial_infect=3, rng=3
+        )
+        summaries = list(sim.iter_days(50, stop=lambda summary: summary[0] == 4))
+        self.assertEqual(len(summaries), 5)
+        self.assertEqual(sim.days_passed, 4)
+
+    def test_steady(self):
+        """
+        "steady" waits for `patience` days without a change
+        """
+        stop = make_stop_condition("steady", patience=2)
+        self.assertFalse(stop((0, 5, 1, 4)))
+        self.assertFalse(stop((1, 5, 1, 4)))
+        self.assertTrue(stop((2, 5, 1, 4)))
+        stop = make_stop_condition(["extinction", "steady"], patience=3)
+        self.assertTrue(stop((0, 5, 0, 5)))
+        with self.assertRaises(ValueError):
+            make_stop_condition("never")
+
+    def test_ensemble(self):
+        """
+        Batched models stop when every replicate is extinct
+        """
+        sim = EnsembleAgentModel(2, 0.5, 100, 8, 0.2, 2, rng=4)
+        result = sim.run_days(stop="extinction")
+        self.assertEqual(result.shape[0], 8)
+        self.assertTrue(np.all(result[:, -1, 2] == 0))
+        self.assertTrue(np.any(result[:, -2, 2] > 0))
+
+    def test_sweep(self):
+        """
+        Sweeps pass the stop condition and stride on to the models
+        """
+        sweep = ParameterSweep(
+            DiscreteAgentModel,
+            {"b": [1], "k": [0.5], "size": [100], "initial_infect": [2]},
+            replicates=3,
+            days=1000,
+            processes=1,
+            seed=5,
+            stop="extinction",
+        )
+        for output in sweep.run_all()[0]:
+            self.assertTrue(len(output) < 1000)
+            self.assertEqual(output[-1, 2], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Conduct unit tests for the random number streams
+"""
+import os
+import sys
+import unittest
+import numpy as np
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from streams import root_seed, make_stream, spawn_streams
+
+
+class TestStreams(unittest.TestCase):
+    """
+    Test that streams are reproducible and independent
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        pass
+
+    def test_reproducible(self):
+        """
+        The same seed and key always give the same stream, whatever was drawn before
+        """
+        first = make_stream(42, 3, 1).random(5)
+        make_stream(42, 0, 0).random(1000)
+        second = make_stream(42, 3, 1).random(5)
+        self.assertTrue(np.all(first == second))
+        self.assertTrue(isinstance(make_stream(42).bit_generator, np.random.Philox))
+
+    def test_independent(self):
+        """
+        Different keys, or different seeds, give different streams
+        """
+        draws = [make_stream(42, ii).random(5) for ii in range(3)]
+        draws.append(make_stream(43, 0).random(5))
+        draws.append(make_stream(42, 0, 0).random(5))
+        for ii in range(len(draws)):
+            for jj in range(ii):
+                self.assertFalse(np.any(draws[ii] == draws[jj]))
+
+    def test_spawn_streams(self):
+        """
+        `spawn_streams` names its streams 0 to n - 1
+        """
+        streams = spawn_streams(7, 4)
+        self.assertTrue(len(streams) == 4)
+        self.assertTrue(np.all(streams[2].random(3) == make_stream(7, 2).random(3)))
+
+    def test_root_seed(self):
+        """
+        An unseeded root records its entropy, so the run can be repeated
+        """
+        root = root_seed()
+        again = root_seed(root.entropy)
+        self.assertTrue(root_seed(root) is root)
+        self.assertTrue(
+            np.all(make_stream(root, 1).random(3) == make_stream(again, 1).random(3))
+        )
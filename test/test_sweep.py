@@ -0,0 +1,128 @@
+"""
+Conduct unit tests for `ParameterSweep`
+"""
+import os
+import sys
+import unittest
+import numpy as np
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from sweep import ParameterSweep, parameter_grid
+from agent import DiscreteAgentModel
+from ode import OdeSir
+from conway_agent import ConwayModel
+
+
+class TestParameterSweep(unittest.TestCase):
+    """
+    Test the parallel parameter sweep
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        pass
+
+    def test_parameter_grid(self):
+        """
+        A dictionary expands to every combination, a list is left alone
+        """
+        grid = parameter_grid({"b": [1, 2], "k": [0.1, 0.2, 0.3]})
+        self.assertTrue(len(grid) == 6)
+        self.assertTrue({"b": 2, "k": 0.3} in grid)
+        self.assertTrue(parameter_grid([{"b": 1}]) == [{"b": 1}])
+
+    def test_run(self):
+        """
+        Every (parameters, replicate) pair is run exactly once, on a pool of workers
+        """
+        grid = {"b": [1, 2], "k": [0.1, 0.2], "size": [200], "initial_infect": [5]}
+        sweep = ParameterSweep(
+            DiscreteAgentModel, grid, replicates=3, days=10, processes=2, chunksize=2
+        )
+        seen = []
+        for params, replicate, output in sweep.run():
+            seen.append((params["b"], params["k"], replicate))
+            self.assertTrue(output.shape == (10, 4))
+        self.assertTrue(len(seen) == 12 and len(set(seen)) == 12)
+
+    def test_run_all(self):
+        """
+        `run_all` collects results in order, serially or in parallel
+        """
+        grid = {"i0": [0.1], "N": [100], "b": [0.5, 1], "k": [0.5]}
+        for processes in [1, 2]:
+            results = ParameterSweep(OdeSir, grid, days=5, processes=processes).run_all()
+            self.assertTrue(len(results) == 2 and len(results[0]) == 1)
+            expected = OdeSir(0.1, 100, 1, 0.5)._infect(5).y
+            self.assertTrue(np.allclose(results[1][0][1], expected[0]))
+
+    def test_seed(self):
+        """
+        A seeded sweep gives the same results whatever the number of processes
+        """
+        grid = {"b": [1, 2], "k": [0.2], "size": [300], "initial_infect": [5]}
+        results = []
+        for processes, chunksize in [(1, 1), (3, 2)]:
+            sweep = ParameterSweep(
+                DiscreteAgentModel,
+                grid,
+                replicates=3,
+                days=15,
+                processes=processes,
+                chunksize=chunksize,
+                seed=2021,
+            )
+            results.append(np.array(sweep.run_all()))
+        self.assertTrue(np.all(results[0] == results[1]))
+        # ... and the replicates differ from each other
+        self.assertFalse(np.all(results[0][0, 0] == results[0][0, 1]))
+
+    def test_conway(self):
+        """
+        `ConwayModel` agents are generated from proportions of alive and infected agents
+        """
+        grid = {"m": [5], "n": [6], "k": [0.2], "p": [0.5]}
+        grid.update({"prop_alive": [0.5], "prop_infect": [0.2]})
+        results = ParameterSweep(ConwayModel, grid, replicates=2, days=4).run_all()
+        self.assertTrue(results[0][1].shape == (4, 4))
+
+    def test_patience(self):
+        """
+        With `stop="steady"`, runs only stop after `patience` unchanged days
+        """
+        grid = {"b": [1], "k": [0.05], "size": [300], "initial_infect": [2]}
+        grid["prob_infect"] = [0.3]
+        lengths = []
+        for patience in [1, 4]:
+            sweep = ParameterSweep(
+                DiscreteAgentModel,
+                grid,
+                replicates=4,
+                days=200,
+                processes=1,
+                seed=5,
+                stop="steady",
+                patience=patience,
+            )
+            for output in sweep.run_all()[0]:
+                lengths.append(len(output))
+                if len(output) < 200:
+                    tail = output[-patience - 1 :, 1:]
+                    self.assertTrue(np.all(tail == tail[0]))
+        self.assertGreater(sum(lengths[4:]), sum(lengths[:4]))
+
+    def test_unknown_model(self):
+        """
+        Sweeping a class without a runner fails straight away
+        """
+        with self.assertRaises(ValueError):
+            ParameterSweep(dict, {"a": [1]})
@@ -0,0 +1,120 @@
+"""
+Conduct unit tests for `TiledSmartAgentModel`
+"""
+import os
+import sys
+import unittest
+import numpy as np
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from tiling import TiledSmartAgentModel, max_tiles
+from smartagent import SmartAgentModel2D
+
+
+class TestTiledSmartAgentModel(unittest.TestCase):
+    """
+    Test the tiled, multi-process smart agent model
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        self.params = dict(
+            p=0.02,
+            q=0.04,
+            k=0.1,
+            size=1000,
+            fear_distance=0.05,
+            knowledge_distance=0.03,
+            initial_infect=20,
+        )
+
+    def test_halo_reaches_neighbor_tiles(self):
+        """
+        Without movement, fear, knowledge and (with `prob_infect=1`) infections are
+        deterministic; they must match the serial model's, including across tile borders
+        """
+        params = dict(self.params, p=0, k=0, prob_infect=1, size=3000)
+        serial = SmartAgentModel2D(rng=3, **params)
+        with TiledSmartAgentModel(rng=3, tiles=6, processes=1, **params) as tiled:
+            np.testing.assert_array_equal(serial.positions, tiled.positions)
+            for _ in range(3):
+                serial.step()
+                tiled.step()
+                np.testing.assert_array_equal(
+                    serial.status_codes(), tiled.status_codes()
+                )
+                np.testing.assert_array_equal(serial.scores, tiled.scores)
+            self.assertGreater(len(tiled.infected), 100)
+
+    def test_processes_do_not_change_results(self):
+        """
+        Every tile has its own random stream, so the number of processes does not matter
+        """
+        runs = []
+        for processes in [1, 2]:
+            with TiledSmartAgentModel(
+                rng=5, tiles=4, processes=processes, **self.params
+            ) as model:
+                summary = model.run_days(6)
+                runs.append((summary, model.positions.copy(), model.status_codes()))
+        for first, second in zip(*runs):
+            np.testing.assert_array_equal(first, second)
+
+    def test_matches_serial_in_distribution(self):
+        """
+        The mean epidemic size of the tiled model matches the serial model's
+        """
+        sizes = {}
+        for name, make in [
+            ("serial", lambda seed: SmartAgentModel2D(rng=seed, **self.params)),
+            (
+                "tiled",
+                lambda seed: TiledSmartAgentModel(
+                    rng=seed, tiles=3, processes=1, **self.params
+                ),
+            ),
+        ]:
+            sizes[name] = []
+            for seed in range(24):
+                model = make(seed)
+                model.step_t_days(10)
+                sizes[name].append(self.params["size"] - len(model.susceptible))
+        serial, tiled = np.array(sizes["serial"]), np.array(sizes["tiled"])
+        error = np.sqrt((serial.var() + tiled.var()) / len(serial))
+        self.assertLess(abs(serial.mean() - tiled.mean()), 4 * error)
+
+    def test_agents_migrate(self):
+        """
+        Agents keep to the unit square and change tiles, and the compartments stay
+        consistent
+        """
+        with TiledSmartAgentModel(rng=8, tiles=4, processes=1, **self.params) as model:
+            start = np.floor(model.positions * 4)
+            model.step_t_days(8)
+            self.assertTrue(np.all((model.positions >= 0) & (model.positions <= 1)))
+            self.assertTrue(np.any(np.floor(model.positions * 4) != start))
+            self.assertTrue(model.check_compartments())
+
+    def test_invalid(self):
+        """
+        Too many tiles for the halo, or a Verlet list, are rejected
+        """
+        limit = max_tiles(0.02, 0.04, 0.05, 0.03)
+        self.assertEqual(limit, 11)
+        with self.assertRaises(ValueError):
+            TiledSmartAgentModel(tiles=limit + 1, processes=1, **self.params)
+        with self.assertRaises(ValueError):
+            TiledSmartAgentModel(verlet_skin=0.1, processes=1, **self.params)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Conduct unit tests for `TrajectoryRecorder` and `Trajectory`
+"""
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+# Make an adjustment to where python will look for classes
+# Since this script can be run from within `/test`, a sibling
+# directory of `/sir`, or from the main project directory
+if os.getcwd().split("/")[-1] == "test":
+    sys.path.append("../sir")
+else:
+    sys.path.append("./sir")
+
+from trajectory import Trajectory, TrajectoryRecorder
+from smartagent import SmartAgentModel2D
+
+
+class TestTrajectory(unittest.TestCase):
+    """
+    Test the memory-mapped trajectory store
+    """
+
+    def setUp(self):
+        """
+        By convention
+        """
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "run")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_model(self):
+        return SmartAgentModel2D(0.05, 0.1, 0.1, 200, initial_infect=5, rng=4)
+
+    def test_matches_step_t_days(self):
+        """
+        The recorded trajectory matches the dense output of `step_t_days`
+        """
+        summary, locsX, locsY, status = self.make_model().step_t_days(20)
+        recorded = self.make_model().record_t_days(20, self.path, chunk_days=6)
+        self.assertTrue(np.array_equal(summary, recorded))
+
+        trajectory = Trajectory(self.path)
+        self.assertEqual(len(trajectory), 20)
+        for frame in [0, 5, 6, 19]:
+            positions = trajectory.positions(frame)
+            self.assertTrue(np.allclose(positions[:, 0], locsX[frame], atol=2e-5))
+            self.assertTrue(np.allclose(positions[:, 1], locsY[frame], atol=2e-5))
+            self.assertTrue(np.array_equal(trajectory.status(frame), status[frame]))
+        self.assertTrue(np.array_equal(trajectory.counts(), summary[:, 1:]))
+
+    def test_stride_and_float32(self):
+        """
+        Only every `stride`th day is kept, and float32 positions are stored as is
+        """
+        model = self.make_model()
+        model.record_t_days(10, self.path, stride=3, position_dtype="float32")
+        trajectory = Trajectory(self.path)
+        self.assertTrue(np.array_equal(trajectory.days, [0, 3, 6, 9]))
+        self.assertEqual(trajectory.frame_of(6), 2)
+        self.assertTrue(
+            np.array_equal(trajectory.positions(3), model.positions.astype(np.float32))
+        )
+        with self.assertRaises(KeyError):
+            trajectory.frame_of(4)
+        with self.assertRaises(IndexError):
+            trajectory.status(4)
+
+    def test_bad_dtype(self):
+        """
+        Unsupported storage types are rejected
+        """
+        with self.assertRaises(ValueError):
+            TrajectoryRecorder(self.path, 10, position_dtype="float16")
+
+
+if __name__ == "__main__":
+    unittest.main()